@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-import os
+import contadores
+import datas
+from armazenamento import obter_armazenamento
 
 # =====================================================
 # CONFIGURAÇÃO GERAL
@@ -11,8 +12,6 @@ st.set_page_config(
     layout="wide"
 )
 
-CAMINHO_USUARIOS = "data/usuarios.csv"
-
 # =====================================================
 # AJUSTES VISUAIS (FÁCIL DE PERSONALIZAR)
 # =====================================================
@@ -56,15 +55,9 @@ st.markdown(
 # =====================================================
 # FUNÇÕES
 # =====================================================
-def carregar_usuarios():
-    if not os.path.exists(CAMINHO_USUARIOS):
-        df = pd.DataFrame(columns=["usuario", "senha", "perfil", "setor"])
-        df.to_csv(CAMINHO_USUARIOS, index=False)
-    return pd.read_csv(CAMINHO_USUARIOS)
-
 def autenticar(usuario, senha):
-    df = carregar_usuarios()
-    user = df[(df["usuario"] == usuario) & (df["senha"] == senha)]
+    df = obter_armazenamento().consultar("usuarios", usuario=usuario)
+    user = df[df["senha"] == senha]
     if user.empty:
         return False, None
     return True, user.iloc[0]
@@ -120,6 +113,16 @@ if st.sidebar.button("🚪 Sair"):
 st.markdown('<div class="bloco-central">', unsafe_allow_html=True)
 st.markdown('<div class="titulo-central">Protocolo Interno</div>', unsafe_allow_html=True)
 
+# 📊 SITUAÇÃO ATUAL (contadores mantidos a cada gravação)
+por_status = contadores.valores("status")
+por_mes = contadores.valores("mes")
+
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("Em trâmite", int(por_status.get("Em Trâmite", 0)))
+k2.metric("Arquivados", int(por_status.get("Arquivado", 0)))
+k3.metric("Andamentos no mês", int(por_mes.get(f"{datas.agora():%Y-%m}", 0)))
+k4.metric("Meus andamentos", contadores.valor("servidor", st.session_state.usuario))
+
 # 🔔 AVISO DO FLUXO
 st.markdown("### 🔔 Antes de realizar andamentos")
 
@@ -0,0 +1,128 @@
+import pandas as pd
+import os
+
+# =====================================================
+# LOG DE ANDAMENTOS (SOMENTE ACRÉSCIMO)
+# =====================================================
+# Os andamentos são gravados em segmentos mensais:
+#   data/andamentos/AAAA-MM.csv
+# e o manifesto lista os segmentos em ordem. Um novo andamento só
+# altera o segmento do mês (e o manifesto quando o mês começa).
+# O antigo data/andamentos.csv continua sendo lido como o primeiro
+# segmento, mas não é mais reescrito.
+PASTA_LOG = "data/andamentos"
+CAMINHO_MANIFESTO = f"{PASTA_LOG}/manifesto.csv"
+CAMINHO_LEGADO = "data/andamentos.csv"
+
+COLUNAS = [
+    "id_andamento",
+    "id_processo",
+    "data",
+    "servidor",
+    "perfil",
+    "acao",
+    "observacao",
+    "setor_origem",
+    "setor_destino",
+    "data_ms"
+]
+
+
+def caminho_segmento(data):
+    return f"{PASTA_LOG}/{pd.Timestamp(data):%Y-%m}.csv"
+
+
+def listar_segmentos(ler_csv):
+    """
+    ler_csv(caminho) devolve o DataFrame do arquivo, ou None se ele
+    não existir.
+    """
+    manifesto = ler_csv(CAMINHO_MANIFESTO)
+    if manifesto is not None and not manifesto.empty:
+        return manifesto["segmento"].tolist()
+    return [CAMINHO_LEGADO] if ler_csv(CAMINHO_LEGADO) is not None else []
+
+
+def carregar_andamentos(ler_csv):
+    """Lê todos os segmentos como uma única tabela."""
+    partes = []
+    for segmento in listar_segmentos(ler_csv):
+        df = ler_csv(segmento)
+        if df is not None and not df.empty:
+            partes.append(df)
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+
+    df = pd.concat(partes, ignore_index=True)
+    for col in COLUNAS:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+
+def proximo_id_andamento(ler_csv):
+    """
+    Os ids crescem junto com o log: basta olhar o último segmento
+    que tiver linhas, sem ler o histórico inteiro.
+    """
+    for segmento in reversed(listar_segmentos(ler_csv)):
+        df = ler_csv(segmento)
+        if df is not None and not df["id_andamento"].dropna().empty:
+            return int(df["id_andamento"].dropna().max()) + 1
+    return 1
+
+
+def carregar_andamentos_desde(ler_csv, id_andamento):
+    """
+    Só os andamentos com id maior que `id_andamento`, lendo apenas os
+    segmentos finais que podem contê-los.
+    """
+    partes = []
+    for segmento in reversed(listar_segmentos(ler_csv)):
+        df = ler_csv(segmento)
+        if df is None or df.empty:
+            continue
+        partes.append(df[df["id_andamento"] > id_andamento])
+        if df["id_andamento"].min() <= id_andamento:
+            break
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    return pd.concat(reversed(partes), ignore_index=True)
+
+
+def preparar_anexo(ler_csv, linhas):
+    """
+    Monta os arquivos que mudam ao acrescentar `linhas` ao log:
+    {caminho: DataFrame} com o segmento do mês e, se um segmento
+    novo for aberto, o manifesto.
+    """
+    segmentos = listar_segmentos(ler_csv)
+    arquivos = {}
+
+    novas = pd.DataFrame(linhas, columns=COLUNAS)
+    for segmento, grupo in novas.groupby(
+        novas["data"].map(caminho_segmento), sort=False
+    ):
+        atual = ler_csv(segmento)
+        if atual is None:
+            atual = pd.DataFrame(columns=COLUNAS)
+        arquivos[segmento] = pd.concat([atual, grupo], ignore_index=True)
+
+        if segmento not in segmentos:
+            segmentos.append(segmento)
+            arquivos[CAMINHO_MANIFESTO] = pd.DataFrame({"segmento": segmentos})
+
+    return arquivos
+
+
+# =====================================================
+# LEITURA LOCAL (data/ do próprio servidor)
+# =====================================================
+def _ler_local(caminho):
+    return pd.read_csv(caminho) if os.path.exists(caminho) else None
+
+
+def carregar_andamentos_local():
+    return carregar_andamentos(_ler_local)
@@ -0,0 +1,773 @@
+import streamlit as st
+import pandas as pd
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import andamentos_log
+import datas
+from github_utils import carregar_csv_github, gravar_github
+
+# =====================================================
+# TABELAS
+# =====================================================
+# coluna, tipo SQLite. A primeira coluna é a chave.
+ESQUEMA = {
+    "processos": [
+        ("id_processo", "INTEGER"),
+        ("numero_protocolo", "TEXT"),
+        ("data_entrada", "TEXT"),
+        ("numero_referencia", "TEXT"),
+        ("setor_origem", "TEXT"),
+        ("assunto", "TEXT"),
+        ("descricao", "TEXT"),
+        ("setor_atual", "TEXT"),
+        ("status", "TEXT"),
+        ("id_setor_atual", "INTEGER"),
+        ("acao", "TEXT"),
+        ("data_entrada_ms", "INTEGER")
+    ],
+    "andamentos": [
+        ("id_andamento", "INTEGER"),
+        ("id_processo", "INTEGER"),
+        ("data", "TEXT"),
+        ("servidor", "TEXT"),
+        ("perfil", "TEXT"),
+        ("acao", "TEXT"),
+        ("observacao", "TEXT"),
+        ("setor_origem", "TEXT"),
+        ("setor_destino", "TEXT"),
+        ("data_ms", "INTEGER")
+    ],
+    "destinacoes": [
+        ("id_destinacao", "INTEGER"),
+        ("id_processo", "INTEGER"),
+        ("data_saida", "TEXT"),
+        ("protocolista", "TEXT"),
+        ("destino", "TEXT"),
+        ("observacao", "TEXT"),
+        ("data_saida_ms", "INTEGER")
+    ],
+    "setores": [
+        ("id_setor", "INTEGER"),
+        ("setor", "TEXT"),
+        ("ativo", "INTEGER")
+    ],
+    "setores_destinos": [
+        ("id_setor", "INTEGER"),
+        ("setor_destino", "TEXT"),
+        ("secretaria", "TEXT"),
+        ("ativo", "INTEGER")
+    ],
+    "usuarios": [
+        ("usuario", "TEXT"),
+        ("nome_completo", "TEXT"),
+        ("senha", "TEXT"),
+        ("perfil", "TEXT"),
+        ("setor", "TEXT")
+    ],
+    # Remessas de envio gravadas (o PDF é reimpresso a partir delas)
+    "remessas": [
+        ("id_remessa", "INTEGER"),
+        ("data", "TEXT"),
+        ("usuario", "TEXT"),
+        ("quantidade", "INTEGER"),
+        ("data_ms", "INTEGER")
+    ],
+    "remessa_itens": [
+        ("id_item", "INTEGER"),
+        ("id_remessa", "INTEGER"),
+        ("numero_processo", "TEXT"),
+        ("setor_destino", "TEXT"),
+        ("id_processo", "INTEGER"),
+        ("numero_referencia", "TEXT"),
+        ("assunto", "TEXT")
+    ],
+    # Índice derivado: onde cada processo está agora (último andamento)
+    "localizacao": [
+        ("id_processo", "INTEGER"),
+        ("id_andamento", "INTEGER"),
+        ("setor", "TEXT"),
+        ("data", "TEXT"),
+        ("data_ms", "INTEGER")
+    ],
+    # Último número entregue por sequência (ex.: protocolo_2026)
+    "sequencias": [
+        ("nome", "TEXT"),
+        ("valor", "INTEGER")
+    ],
+    # Índice derivado: processos abertos (não arquivados) por setor
+    "caixas": [
+        ("id_processo", "INTEGER"),
+        ("setor", "TEXT")
+    ],
+    # Índice derivado: contagens de processos por status e por setor
+    # atual, e de andamentos por mês e por servidor
+    "contadores": [
+        ("contador", "TEXT"),
+        ("grupo", "TEXT"),
+        ("chave", "TEXT"),
+        ("valor", "INTEGER")
+    ]
+}
+
+INDICES = {
+    "andamentos": ["id_processo", "setor_destino", "servidor", "data"],
+    "processos": ["setor_atual", "status"],
+    "destinacoes": ["id_processo"],
+    "remessa_itens": ["id_remessa"],
+    "localizacao": ["setor"],
+    "caixas": ["setor"]
+}
+
+CAMINHOS = {
+    tabela: f"data/{tabela}.csv"
+    for tabela in ESQUEMA
+    if tabela != "andamentos"  # andamentos fica no log (andamentos_log)
+}
+
+
+def colunas(tabela):
+    return [coluna for coluna, _ in ESQUEMA[tabela]]
+
+
+def chave(tabela):
+    return ESQUEMA[tabela][0][0]
+
+
+def _completar_colunas(df, tabela):
+    for col in colunas(tabela):
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+
+# =====================================================
+# ALTERAÇÕES
+# =====================================================
+# Uma operação de gravação é uma função operacao(t) que lê pelo
+# objeto t (t.ler(tabela), t.proximo_id(tabela), t.reservar(nome)) e devolve
+# {tabela: alteração}, onde a alteração é:
+#   - um DataFrame: a tabela inteira passa a ser ele
+#   - Anexar(linhas): acrescenta linhas
+#   - Atualizar(chave, ids, valores): altera colunas de algumas linhas
+#   - Remover(chave, ids): apaga linhas
+#   - Substituir(chave, linhas): grava as linhas no lugar das que têm
+#     a mesma chave, ou acrescenta se ainda não existirem
+#   - uma lista dessas alterações, aplicadas em ordem
+# Tudo o que a operação devolve é gravado junto (um commit no
+# GitHub, uma transação no SQLite). Se houver conflito no GitHub,
+# a operação é executada de novo sobre os dados atuais.
+class Anexar:
+    def __init__(self, linhas):
+        self.linhas = pd.DataFrame(linhas)
+
+    def aplicar(self, df):
+        if df.empty:
+            return self.linhas.copy()
+        return pd.concat([df, self.linhas], ignore_index=True)
+
+
+class Atualizar:
+    def __init__(self, chave, ids, valores):
+        self.chave = chave
+        self.ids = list(ids)
+        self.valores = valores
+
+    def aplicar(self, df):
+        filtro = df[self.chave].isin(self.ids)
+        df.loc[filtro, list(self.valores)] = list(self.valores.values())
+        return df
+
+
+class Remover:
+    def __init__(self, chave, ids):
+        self.chave = chave
+        self.ids = list(ids)
+
+    def aplicar(self, df):
+        return df[~df[self.chave].isin(self.ids)]
+
+
+class Substituir:
+    def __init__(self, chave, linhas):
+        self.chave = chave
+        self.linhas = pd.DataFrame(linhas)
+
+    def aplicar(self, df):
+        restantes = df[~df[self.chave].isin(self.linhas[self.chave])]
+        if restantes.empty:
+            return self.linhas.copy()
+        return pd.concat([restantes, self.linhas], ignore_index=True)
+
+
+def _aplicar(alteracao, df):
+    if isinstance(alteracao, list):
+        for item in alteracao:
+            df = _aplicar(item, df)
+        return df
+    if isinstance(alteracao, pd.DataFrame):
+        return alteracao
+    return alteracao.aplicar(df)
+
+
+def _filtrar(df, filtros):
+    for coluna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set)):
+            df = df[df[coluna].isin(valor)]
+        else:
+            df = df[df[coluna] == valor]
+    return df
+
+
+# =====================================================
+# ÍNDICES DERIVADOS
+# =====================================================
+# Mantidos pelo próprio armazenamento a cada gravação, na mesma
+# transação/commit dos andamentos que os alteram.
+def _localizacao(andamentos):
+    """Último andamento de cada processo (os ids crescem com o tempo)."""
+    andamentos = _completar_colunas(andamentos.copy(), "andamentos")
+    ultimos = (
+        andamentos.dropna(subset=["id_andamento"])
+        .sort_values("id_andamento")
+        .groupby("id_processo")
+        .tail(1)
+    )
+    return pd.DataFrame({
+        "id_processo": ultimos["id_processo"].values,
+        "id_andamento": ultimos["id_andamento"].values,
+        "setor": ultimos["setor_destino"].values,
+        "data": ultimos["data"].values,
+        "data_ms": ultimos["data_ms"].values
+    })
+
+
+def _caixas(t):
+    abertos = t.ler("processos")
+    abertos = abertos.loc[abertos["status"] != "Arquivado", "id_processo"]
+    local = t.ler("localizacao")
+    return local.loc[
+        local["id_processo"].isin(abertos), ["id_processo", "setor"]
+    ].reset_index(drop=True)
+
+
+def contar(processos=None, andamentos=None):
+    """
+    Contadores (contador, grupo, chave, valor) das linhas dadas:
+    status e setor dos processos, mês e servidor dos andamentos.
+    """
+    series = []
+    if processos is not None:
+        series.append(("status", processos["status"]))
+        series.append(("setor", processos["setor_atual"]))
+    if andamentos is not None:
+        series.append(("mes", datas.formatar(datas.converter(andamentos, "data"), "%Y-%m")))
+        series.append(("servidor", andamentos["servidor"]))
+
+    partes = []
+    for grupo, serie in series:
+        serie = serie.dropna().astype(str)
+        contagem = serie[serie != ""].value_counts()
+        partes.append(pd.DataFrame({
+            "contador": grupo + ":" + contagem.index,
+            "grupo": grupo,
+            "chave": contagem.index,
+            "valor": contagem.values
+        }))
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=colunas("contadores"))
+    return pd.concat(partes, ignore_index=True)
+
+
+def _contadores(t):
+    return contar(t.ler("processos"), t.ler("andamentos"))
+
+
+# Como reconstruir um índice que ainda não existe
+RECONSTRUIR = {
+    "localizacao": lambda t: _localizacao(t.ler("andamentos")),
+    "caixas": _caixas,
+    "contadores": _contadores
+}
+
+
+def _derivar(alteracoes, t):
+    entrar = pd.DataFrame(columns=["id_processo", "setor"])
+    sair = []
+
+    # Andamento novo: o processo passa para a caixa do setor de destino
+    anexo = alteracoes.get("andamentos")
+    if isinstance(anexo, Anexar) and not anexo.linhas.empty:
+        local = _localizacao(anexo.linhas)
+        alteracoes["localizacao"] = Substituir("id_processo", local)
+        entrar = local[["id_processo", "setor"]]
+
+    # Arquivamento tira o processo da caixa; desarquivamento o devolve
+    # ao setor em que ele estava
+    processos = alteracoes.get("processos")
+    if isinstance(processos, Atualizar) and "status" in processos.valores:
+        if processos.valores["status"] == "Arquivado":
+            sair = processos.ids
+        else:
+            ja_entram = set(entrar["id_processo"])
+            faltando = [i for i in processos.ids if i not in ja_entram]
+            if faltando:
+                local = t.ler("localizacao")
+                entrar = pd.concat([
+                    entrar,
+                    local.loc[local["id_processo"].isin(faltando), ["id_processo", "setor"]]
+                ], ignore_index=True)
+
+    caixas = []
+    if sair:
+        caixas.append(Remover("id_processo", sair))
+        entrar = entrar[~entrar["id_processo"].isin(sair)]
+    if not entrar.empty:
+        caixas.append(Substituir("id_processo", entrar))
+    if caixas:
+        alteracoes["caixas"] = caixas
+    return alteracoes
+
+
+def _derivar_contadores(alteracoes, t):
+    """
+    Soma aos contadores só a diferença trazida pela operação: as
+    linhas novas e, nos processos alterados, os valores de antes e de
+    depois. Só as linhas desses contadores são lidas e regravadas.
+    """
+    entram, saem = [], []
+
+    anexo = alteracoes.get("andamentos")
+    if isinstance(anexo, Anexar) and not anexo.linhas.empty:
+        entram.append(contar(andamentos=anexo.linhas))
+
+    processos = alteracoes.get("processos")
+    if isinstance(processos, Anexar):
+        entram.append(contar(processos=processos.linhas))
+    elif isinstance(processos, Atualizar):
+        mudam = {"status", "setor_atual"} & set(processos.valores)
+        if mudam:
+            antes = t.ler_chaves("processos", processos.ids)
+            depois = antes.copy()
+            for coluna in mudam:
+                depois[coluna] = processos.valores[coluna]
+            entram.append(contar(processos=depois))
+            saem.append(contar(processos=antes))
+    elif processos is not None:
+        # Remoção, substituição ou tabela inteira: compara a tabela
+        # antes e depois
+        antes = t.ler("processos")
+        entram.append(contar(processos=_aplicar(processos, antes.copy())))
+        saem.append(contar(processos=antes))
+
+    if not entram:
+        return alteracoes
+
+    diferenca = pd.concat(
+        entram + [p.assign(valor=-p["valor"]) for p in saem], ignore_index=True
+    ).groupby(["contador", "grupo", "chave"], as_index=False)["valor"].sum()
+    diferenca = diferenca[diferenca["valor"] != 0]
+    if diferenca.empty:
+        return alteracoes
+
+    atuais = t.ler_chaves("contadores", diferenca["contador"].tolist())
+    valores = diferenca.merge(
+        atuais[["contador", "valor"]].rename(columns={"valor": "atual"}),
+        on="contador",
+        how="left"
+    )
+    valores["valor"] = (
+        pd.to_numeric(valores["atual"], errors="coerce").fillna(0) + valores["valor"]
+    ).astype(int)
+    valores = valores[colunas("contadores")]
+
+    contadores = []
+    zerados = valores.loc[valores["valor"] <= 0, "contador"].tolist()
+    if zerados:
+        contadores.append(Remover("contador", zerados))
+    if (valores["valor"] > 0).any():
+        contadores.append(Substituir("contador", valores[valores["valor"] > 0]))
+    alteracoes["contadores"] = contadores
+    return alteracoes
+
+
+# =====================================================
+# SEQUÊNCIAS
+# =====================================================
+# Números entregues em ordem, sem buracos e sem repetição: a
+# reserva é gravada na mesma transação/commit da operação que usa o
+# número. Se dois usuários reservarem ao mesmo tempo, um deles
+# conflita e refaz a operação com o valor novo (GitHub), ou espera a
+# trava de escrita (SQLite).
+class _Transacao(ABC):
+    def __init__(self):
+        self.reservados = {}  # nome -> último número reservado
+
+    def reservar(self, nome, quantidade=1, inicial=None):
+        """
+        Reserva `quantidade` números seguidos da sequência `nome` e
+        devolve o primeiro. Se a sequência ainda não existir,
+        inicial() informa o último número já usado (padrão 0).
+        """
+        if nome in self.reservados:
+            atual = self.reservados[nome]
+        else:
+            atual = self._valor_sequencia(nome)
+            if atual is None:
+                atual = int(inicial()) if inicial else 0
+        self.reservados[nome] = atual + quantidade
+        return atual + 1
+
+    def proximo_id(self, tabela, quantidade=1):
+        """
+        Reserva `quantidade` ids seguidos da tabela e devolve o primeiro.
+        O maior id existente só é procurado uma vez, para iniciar a
+        sequência id_<tabela>.
+        """
+        return self.reservar(
+            f"id_{tabela}", quantidade, inicial=lambda: self._maior_id(tabela)
+        )
+
+    def ler_chaves(self, tabela, ids):
+        """Só as linhas da tabela com essas chaves."""
+        df = self.ler(tabela)
+        return df[df[chave(tabela)].isin(list(ids))]
+
+    @abstractmethod
+    def ler(self, tabela):
+        """Tabela inteira, como está dentro da transação."""
+
+    @abstractmethod
+    def _valor_sequencia(self, nome):
+        """Último número gravado da sequência, ou None se não existir."""
+
+    @abstractmethod
+    def _maior_id(self, tabela):
+        """Maior chave existente na tabela (0 se vazia)."""
+
+
+def _gravar_sequencias(alteracoes, t):
+    if t.reservados:
+        alteracoes["sequencias"] = Substituir("nome", [
+            {"nome": nome, "valor": valor}
+            for nome, valor in t.reservados.items()
+        ])
+    return alteracoes
+
+
+# =====================================================
+# BACKEND GITHUB (CSV NO REPOSITÓRIO)
+# =====================================================
+class _TransacaoCSV(_Transacao):
+    def __init__(self, ler_arquivo):
+        super().__init__()
+        self._ler_arquivo = ler_arquivo
+
+    def ler(self, tabela):
+        if tabela == "andamentos":
+            df = andamentos_log.carregar_andamentos(self._ler_arquivo)
+        else:
+            df = self._ler_arquivo(CAMINHOS[tabela])
+            if df is None and tabela in RECONSTRUIR:
+                df = RECONSTRUIR[tabela](self)
+            if df is None:
+                df = pd.DataFrame(columns=colunas(tabela))
+        return datas.preencher_ms(_completar_colunas(df, tabela))
+
+    def _maior_id(self, tabela):
+        if tabela == "andamentos":
+            return andamentos_log.proximo_id_andamento(self._ler_arquivo) - 1
+        ids = self.ler(tabela)[chave(tabela)].dropna()
+        return 0 if ids.empty else int(ids.max())
+
+    def _valor_sequencia(self, nome):
+        df = self.ler("sequencias")
+        valor = df.loc[df["nome"] == nome, "valor"]
+        return None if valor.empty else int(valor.iloc[0])
+
+
+class ArmazenamentoGitHub:
+    """
+    CSVs em data/ no repositório do GitHub, lidos com cache por SHA e
+    gravados em um único commit por operação.
+    """
+
+    def _ler_arquivo(self, caminho):
+        df = carregar_csv_github(caminho)
+        return df if len(df.columns) else None
+
+    def carregar(self, tabela):
+        return _TransacaoCSV(self._ler_arquivo).ler(tabela)
+
+    def consultar(self, tabela, **filtros):
+        return _filtrar(self.carregar(tabela), filtros)
+
+    def posteriores(self, tabela, ultimo_id):
+        """Linhas com chave maior que `ultimo_id`."""
+        if tabela == "andamentos":
+            df = andamentos_log.carregar_andamentos_desde(self._ler_arquivo, ultimo_id)
+            return datas.preencher_ms(_completar_colunas(df, tabela))
+        df = self.carregar(tabela)
+        return df[df[chave(tabela)] > ultimo_id]
+
+    def gravar(self, operacao, mensagem):
+        def operacao_arquivos(ler_arquivo):
+            t = _TransacaoCSV(ler_arquivo)
+            arquivos = {}
+            alteracoes = _gravar_sequencias(_derivar_contadores(_derivar(operacao(t), t), t), t)
+            for tabela, alteracao in alteracoes.items():
+                if tabela == "andamentos":
+                    if not isinstance(alteracao, Anexar):
+                        raise ValueError("Andamentos só aceitam novas linhas (Anexar).")
+                    arquivos.update(andamentos_log.preparar_anexo(
+                        ler_arquivo, alteracao.linhas.to_dict("records")
+                    ))
+                else:
+                    arquivos[CAMINHOS[tabela]] = _aplicar(alteracao, t.ler(tabela))
+            return arquivos
+
+        gravar_github(operacao_arquivos, mensagem)
+
+
+# =====================================================
+# BACKEND SQLITE (LOCAL, COM ÍNDICES)
+# =====================================================
+def _valor_sql(valor):
+    if valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+class _TransacaoSQLite(_Transacao):
+    def __init__(self, con):
+        super().__init__()
+        self._con = con
+
+    def ler(self, tabela):
+        return pd.read_sql_query(
+            f"SELECT * FROM {tabela} ORDER BY {chave(tabela)}", self._con
+        )
+
+    def ler_chaves(self, tabela, ids):
+        ids = [_valor_sql(i) for i in ids]
+        if not ids:
+            return pd.DataFrame(columns=colunas(tabela))
+        return pd.read_sql_query(
+            f"SELECT * FROM {tabela} WHERE {chave(tabela)} IN ({', '.join('?' * len(ids))})",
+            self._con,
+            params=ids
+        )
+
+    def _maior_id(self, tabela):
+        # MAX da chave primária: resolvido pelo índice, sem varrer a tabela
+        (maior,) = self._con.execute(
+            f"SELECT MAX({chave(tabela)}) FROM {tabela}"
+        ).fetchone()
+        return 0 if maior is None else int(maior)
+
+    def _valor_sequencia(self, nome):
+        linha = self._con.execute(
+            "SELECT valor FROM sequencias WHERE nome = ?", [nome]
+        ).fetchone()
+        return None if linha is None else int(linha[0])
+
+
+class ArmazenamentoSQLite:
+    """
+    Banco SQLite local. Na primeira abertura importa os CSVs de data/.
+    Não depende de rede; consultas por id_processo, setor_destino,
+    servidor e data usam índices.
+    """
+
+    def __init__(self, caminho="data/protocolo.db"):
+        self.caminho = caminho
+        self._criar()
+
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def _criar(self):
+        con = self._conectar()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            existentes = {
+                nome for (nome,) in con.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'"
+                )
+            }
+            for tabela, definicao in ESQUEMA.items():
+                if tabela in existentes:
+                    self._acrescentar_colunas(con, tabela)
+                    continue
+                cols = ", ".join(f"{c} {tipo}" for c, tipo in definicao)
+                con.execute(f"CREATE TABLE {tabela} ({cols}, PRIMARY KEY ({chave(tabela)}))")
+                for coluna in INDICES.get(tabela, []):
+                    con.execute(
+                        f"CREATE INDEX idx_{tabela}_{coluna} ON {tabela} ({coluna})"
+                    )
+                self._importar_csv(con, tabela)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def _acrescentar_colunas(self, con, tabela):
+        atuais = {linha[1] for linha in con.execute(f"PRAGMA table_info({tabela})")}
+        novas = [coluna for coluna, _ in ESQUEMA[tabela] if coluna not in atuais]
+        for coluna, tipo in ESQUEMA[tabela]:
+            if coluna in novas:
+                con.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+
+        # Coluna _ms nova: preenchida uma vez a partir do texto da data
+        for coluna_ms in [c for c in novas if c.endswith("_ms") and c[:-3] in atuais]:
+            df = pd.read_sql_query(
+                f"SELECT {chave(tabela)}, {coluna_ms[:-3]}, {coluna_ms} FROM {tabela}", con
+            )
+            df = datas.preencher_ms(df).dropna(subset=[coluna_ms])
+            con.executemany(
+                f"UPDATE {tabela} SET {coluna_ms} = ? WHERE {chave(tabela)} = ?",
+                [[int(ms), _valor_sql(i)] for i, ms in zip(df[chave(tabela)], df[coluna_ms])]
+            )
+
+    def _importar_csv(self, con, tabela):
+        if tabela in RECONSTRUIR:
+            df = RECONSTRUIR[tabela](_TransacaoSQLite(con))
+        elif tabela == "andamentos":
+            df = andamentos_log.carregar_andamentos_local()
+        elif os.path.exists(CAMINHOS[tabela]):
+            df = pd.read_csv(CAMINHOS[tabela])
+        else:
+            return
+        self._inserir(con, tabela, datas.preencher_ms(_completar_colunas(df, tabela)))
+
+    def _inserir(self, con, tabela, df, substituir=False):
+        if df.empty:
+            return
+        # executemany em vez de to_sql: o pandas faria o próprio COMMIT
+        # no meio da transação
+        df = _completar_colunas(df.copy(), tabela)[colunas(tabela)]
+        marcadores = ", ".join("?" * len(df.columns))
+        con.executemany(
+            f"INSERT {'OR REPLACE ' if substituir else ''}INTO {tabela} "
+            f"({', '.join(df.columns)}) VALUES ({marcadores})",
+            [[_valor_sql(v) for v in linha] for linha in df.itertuples(index=False)]
+        )
+
+    def carregar(self, tabela):
+        con = self._conectar()
+        try:
+            return _TransacaoSQLite(con).ler(tabela)
+        finally:
+            con.close()
+
+    def consultar(self, tabela, **filtros):
+        condicoes, parametros = [], []
+        for coluna, valor in filtros.items():
+            if isinstance(valor, (list, tuple, set)):
+                valor = list(valor)
+                if not valor:
+                    return pd.DataFrame(columns=colunas(tabela))
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valor))})")
+                parametros.extend(_valor_sql(v) for v in valor)
+            else:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(_valor_sql(valor))
+
+        sql = f"SELECT * FROM {tabela}"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+
+        con = self._conectar()
+        try:
+            return pd.read_sql_query(sql, con, params=parametros)
+        finally:
+            con.close()
+
+    def posteriores(self, tabela, ultimo_id):
+        """Linhas com chave maior que `ultimo_id`."""
+        con = self._conectar()
+        try:
+            return pd.read_sql_query(
+                f"SELECT * FROM {tabela} WHERE {chave(tabela)} > ? ORDER BY {chave(tabela)}",
+                con,
+                params=[_valor_sql(ultimo_id)]
+            )
+        finally:
+            con.close()
+
+    def gravar(self, operacao, mensagem):
+        con = self._conectar()
+        try:
+            # Trava de escrita desde a leitura: sem conflito a resolver
+            con.execute("BEGIN IMMEDIATE")
+            t = _TransacaoSQLite(con)
+            alteracoes = _gravar_sequencias(_derivar_contadores(_derivar(operacao(t), t), t), t)
+            for tabela, alteracao in alteracoes.items():
+                self._gravar_alteracao(con, tabela, alteracao)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def _gravar_alteracao(self, con, tabela, alteracao):
+        if isinstance(alteracao, list):
+            for item in alteracao:
+                self._gravar_alteracao(con, tabela, item)
+        elif isinstance(alteracao, Anexar):
+            self._inserir(con, tabela, alteracao.linhas)
+        elif isinstance(alteracao, Substituir):
+            self._inserir(con, tabela, alteracao.linhas, substituir=True)
+        elif isinstance(alteracao, Atualizar):
+            atribuicoes = ", ".join(f"{c} = ?" for c in alteracao.valores)
+            marcadores = ", ".join("?" * len(alteracao.ids))
+            con.execute(
+                f"UPDATE {tabela} SET {atribuicoes} "
+                f"WHERE {alteracao.chave} IN ({marcadores})",
+                [_valor_sql(v) for v in alteracao.valores.values()]
+                + [_valor_sql(i) for i in alteracao.ids]
+            )
+        elif isinstance(alteracao, Remover):
+            marcadores = ", ".join("?" * len(alteracao.ids))
+            con.execute(
+                f"DELETE FROM {tabela} WHERE {alteracao.chave} IN ({marcadores})",
+                [_valor_sql(i) for i in alteracao.ids]
+            )
+        else:
+            con.execute(f"DELETE FROM {tabela}")
+            self._inserir(con, tabela, alteracao)
+
+
+# =====================================================
+# BACKEND EM USO
+# =====================================================
+@st.cache_resource(show_spinner=False)
+def obter_armazenamento():
+    """
+    Escolhido em st.secrets["ARMAZENAMENTO"]: "github" (padrão) ou
+    "sqlite" (caminho do banco em st.secrets["SQLITE_CAMINHO"]).
+    Sem secrets não há padrão: um banco local novo, importado dos CSVs
+    do checkout, passaria por produção (ex.: contadores.py --corrigir
+    "corrigindo" uma cópia descartável).
+    """
+    try:
+        tipo = st.secrets.get("ARMAZENAMENTO", "github")
+        caminho_db = st.secrets.get("SQLITE_CAMINHO", "data/protocolo.db")
+    except Exception as e:
+        raise RuntimeError(
+            "Não foi possível ler .streamlit/secrets.toml para escolher o "
+            "armazenamento. Para usar um banco local, defina "
+            'ARMAZENAMENTO = "sqlite".'
+        ) from e
+
+    if tipo == "sqlite":
+        return ArmazenamentoSQLite(caminho_db)
+    if tipo == "github":
+        return ArmazenamentoGitHub()
+    raise ValueError(f'ARMAZENAMENTO inválido: "{tipo}" (use "github" ou "sqlite").')
@@ -0,0 +1,221 @@
+import streamlit as st
+import pandas as pd
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+import snapshots
+from armazenamento import obter_armazenamento
+
+# =====================================================
+# BUSCA POR PALAVRAS (ÍNDICE INVERTIDO)
+# =====================================================
+# termo -> {id_processo: peso}. O texto de assunto, descricao e das
+# observações dos andamentos é normalizado (minúsculas, sem acentos)
+# e quebrado em palavras. Uma palavra da busca casa com o termo igual
+# ou, com peso menor, com os termos que começam com ela.
+#
+# O índice é montado uma vez por processo do servidor e, a cada
+# busca, recebe só os processos e andamentos gravados depois da
+# última atualização.
+
+# Peso de cada ocorrência, por campo
+PESOS = {
+    "assunto": 3.0,
+    "descricao": 2.0,
+    "observacao": 1.0
+}
+
+# Fator aplicado quando a palavra só casa pelo começo do termo
+PESO_PREFIXO = 0.6
+
+TAMANHO_MINIMO = 2
+
+PALAVRAS_VAZIAS = {
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e",
+    "em", "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela",
+    "pelas", "pelo", "pelos", "por", "que", "se", "um", "uma"
+}
+
+_PALAVRA = re.compile(r"[0-9a-z]+")
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "Solicitação" -> "solicitacao"."""
+    texto = unicodedata.normalize("NFKD", str(texto).casefold())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def palavras(texto):
+    if texto is None or (isinstance(texto, float) and math.isnan(texto)):
+        return []
+    return [
+        p for p in _PALAVRA.findall(normalizar(texto))
+        if len(p) >= TAMANHO_MINIMO and p not in PALAVRAS_VAZIAS
+    ]
+
+
+def _termos_da_coluna(ids, textos, campo):
+    """
+    (termo, id_processo, peso) de uma coluna inteira, normalizada de
+    uma vez pelo pandas em vez de texto a texto.
+    """
+    palavras_por_linha = (
+        textos.fillna("").astype(str)
+        .str.casefold()
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.findall(_PALAVRA)
+    )
+    df = pd.DataFrame({
+        "id_processo": ids.to_numpy(),
+        "termo": palavras_por_linha.to_numpy()
+    }).explode("termo").dropna()
+    df = df[(df["termo"].str.len() >= TAMANHO_MINIMO) & ~df["termo"].isin(PALAVRAS_VAZIAS)]
+    return df.assign(peso=PESOS[campo])
+
+
+class IndiceBusca:
+
+    def __init__(self):
+        self._pesos = defaultdict(lambda: defaultdict(float))
+        self._termos = []           # ordenados, para a busca por prefixo
+        self._documentos = set()
+        self.ultimo_processo = 0
+        self.ultimo_andamento = 0
+        self._trava = threading.Lock()
+
+    def acrescentar(self, processos=None, andamentos=None):
+        """
+        Indexa linhas novas de processos e/ou andamentos. Linhas que o
+        índice já tem (id até o último indexado) são ignoradas.
+        """
+        with self._trava:
+            if processos is not None:
+                processos = processos[
+                    pd.to_numeric(processos["id_processo"], errors="coerce") > self.ultimo_processo
+                ]
+            if andamentos is not None:
+                andamentos = andamentos[
+                    pd.to_numeric(andamentos["id_andamento"], errors="coerce") > self.ultimo_andamento
+                ]
+
+            partes = []
+            if processos is not None and not processos.empty:
+                ids = processos["id_processo"].astype(int)
+                partes.append(_termos_da_coluna(ids, processos["assunto"], "assunto"))
+                partes.append(_termos_da_coluna(ids, processos["descricao"], "descricao"))
+                self.ultimo_processo = max(self.ultimo_processo, int(ids.max()))
+
+            if andamentos is not None and not andamentos.empty:
+                self.ultimo_andamento = max(
+                    self.ultimo_andamento, int(andamentos["id_andamento"].max())
+                )
+                andamentos = andamentos.dropna(subset=["id_processo"])
+                partes.append(_termos_da_coluna(
+                    andamentos["id_processo"].astype(int), andamentos["observacao"], "observacao"
+                ))
+
+            if not partes:
+                return
+            termos = pd.concat(partes).groupby(["termo", "id_processo"])["peso"].sum()
+
+            novos = []
+            for (termo, id_processo), peso in termos.items():
+                postagens = self._pesos.get(termo)
+                if postagens is None:
+                    postagens = self._pesos[termo]
+                    novos.append(termo)
+                postagens[int(id_processo)] += peso
+            self._documentos.update(
+                termos.index.get_level_values("id_processo").astype(int).tolist()
+            )
+
+            if novos:
+                # Uma ordenação por lote em vez de uma inserção por termo
+                self._termos.extend(novos)
+                self._termos.sort()
+
+    def _casamentos(self, palavra):
+        """{termo: fator} dos termos que casam com a palavra."""
+        casamentos = {}
+        i = bisect.bisect_left(self._termos, palavra)
+        while i < len(self._termos) and self._termos[i].startswith(palavra):
+            termo = self._termos[i]
+            casamentos[termo] = 1.0 if termo == palavra else PESO_PREFIXO
+            i += 1
+        return casamentos
+
+    def buscar(self, texto, deslocamento=0, limite=None, entre_ids=None):
+        """
+        Processos com todas as palavras do texto, do mais relevante
+        para o menos. Devolve (ids da página, total encontrado).
+        entre_ids restringe a busca a esses processos.
+        """
+        consulta = list(dict.fromkeys(palavras(texto)))
+        if not consulta:
+            return [], 0
+
+        with self._trava:
+            total_documentos = max(len(self._documentos), 1)
+            pontuacao = None
+
+            for palavra in consulta:
+                da_palavra = defaultdict(float)
+                for termo, fator in self._casamentos(palavra).items():
+                    postagens = self._pesos[termo]
+                    idf = math.log(1 + total_documentos / len(postagens))
+                    for id_processo, peso in postagens.items():
+                        valor = fator * peso * idf
+                        if valor > da_palavra[id_processo]:
+                            da_palavra[id_processo] = valor
+
+                if pontuacao is None:
+                    pontuacao = da_palavra
+                else:
+                    pontuacao = {
+                        i: pontos + da_palavra[i]
+                        for i, pontos in pontuacao.items()
+                        if i in da_palavra
+                    }
+                if not pontuacao:
+                    return [], 0
+
+        if entre_ids is not None:
+            entre_ids = set(entre_ids)
+            pontuacao = {i: p for i, p in pontuacao.items() if i in entre_ids}
+
+        ordem = sorted(pontuacao, key=lambda i: (-pontuacao[i], -i))
+        fim = None if limite is None else deslocamento + limite
+        return ordem[deslocamento:fim], len(ordem)
+
+
+def _atualizar(indice):
+    armazenamento = obter_armazenamento()
+    indice.acrescentar(
+        processos=armazenamento.posteriores("processos", indice.ultimo_processo),
+        andamentos=armazenamento.posteriores("andamentos", indice.ultimo_andamento)
+    )
+
+
+@st.cache_resource(show_spinner="Montando o índice de busca...")
+def _indice_inicial():
+    indice = IndiceBusca()
+    indice.acrescentar(
+        processos=obter_armazenamento().carregar("processos"),
+        # Só as colunas usadas, direto do snapshot colunar
+        andamentos=snapshots.ler(
+            "andamentos", colunas_lidas=["id_andamento", "id_processo", "observacao"]
+        )
+    )
+    return indice
+
+
+def obter_indice():
+    """Índice compartilhado, já com o que foi gravado até agora."""
+    indice = _indice_inicial()
+    _atualizar(indice)
+    return indice
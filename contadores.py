@@ -0,0 +1,74 @@
+import pandas as pd
+import sys
+from armazenamento import RECONSTRUIR, contar, obter_armazenamento
+
+# =====================================================
+# CONTADORES AGREGADOS
+# =====================================================
+# A tabela "contadores" é um índice derivado do armazenamento: cada
+# gravação soma a ela a diferença que trouxe (processos por status e
+# por setor atual, andamentos por mês e por servidor), na mesma
+# transação/commit. Ler um indicador é ler algumas linhas, sem varrer
+# processos e andamentos.
+#
+# Verificação pela linha de comando:
+#   python contadores.py             mostra as diferenças
+#   python contadores.py --corrigir  e regrava a tabela recalculada
+def valores(grupo):
+    """Série chave -> valor de um grupo de contadores."""
+    df = obter_armazenamento().consultar("contadores", grupo=grupo)
+    return pd.Series(
+        pd.to_numeric(df["valor"]).astype(int).values,
+        index=df["chave"].astype(str).values,
+        name=grupo
+    ).sort_index()
+
+
+def valor(grupo, chave):
+    return int(valores(grupo).get(chave, 0))
+
+
+def _recalcular():
+    armazenamento = obter_armazenamento()
+    return contar(armazenamento.carregar("processos"), armazenamento.carregar("andamentos"))
+
+
+def verificar():
+    """
+    Compara os contadores gravados com os recalculados do zero.
+    Devolve só as linhas diferentes (gravado, recalculado).
+    """
+    gravados = obter_armazenamento().carregar("contadores")
+    comparacao = pd.merge(
+        gravados[["contador", "valor"]].rename(columns={"valor": "gravado"}),
+        _recalcular()[["contador", "valor"]].rename(columns={"valor": "recalculado"}),
+        on="contador",
+        how="outer"
+    )
+    for coluna in ["gravado", "recalculado"]:
+        comparacao[coluna] = pd.to_numeric(comparacao[coluna]).fillna(0).astype(int)
+    return comparacao[
+        comparacao["gravado"] != comparacao["recalculado"]
+    ].sort_values("contador").reset_index(drop=True)
+
+
+def reconstruir():
+    """Regrava a tabela inteira com os contadores recalculados."""
+    obter_armazenamento().gravar(
+        lambda t: {"contadores": RECONSTRUIR["contadores"](t)},
+        "Reconstrução dos contadores"
+    )
+
+
+if __name__ == "__main__":
+    diferencas = verificar()
+    if diferencas.empty:
+        print("Contadores conferem.")
+        sys.exit(0)
+
+    print(diferencas.to_string(index=False))
+    if "--corrigir" in sys.argv[1:]:
+        reconstruir()
+        print("Contadores reconstruídos.")
+    else:
+        sys.exit(1)
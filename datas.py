@@ -0,0 +1,126 @@
+import pandas as pd
+
+# =====================================================
+# DATAS E HORÁRIOS
+# =====================================================
+# Toda data gravada tem duas colunas:
+#   <coluna>     texto ISO com fuso, para leitura humana no CSV
+#   <coluna>_ms  instante em milissegundos desde 1970 (UTC)
+# A leitura usa a coluna _ms (inteiro, sem análise de texto) e só
+# recorre ao texto nos registros antigos que não a têm.
+FUSO = "America/Sao_Paulo"
+FORMATO_EXIBICAO = "%d/%m/%Y %H:%M"
+_UTC = "datetime64[ns, UTC]"
+
+# Registros antigos sem fuso no texto: data_entrada era gravada no
+# horário de Brasília; data e data_saida, no horário do servidor (UTC)
+FUSO_LEGADO = {
+    "data_entrada": FUSO
+}
+
+
+def agora():
+    return pd.Timestamp.now(tz=FUSO)
+
+
+def _no_fuso(momento):
+    momento = pd.Timestamp(momento)
+    if momento.tzinfo is None:
+        momento = momento.tz_localize(FUSO)
+    return momento.tz_convert(FUSO)
+
+
+def para_ms(momento):
+    """Milissegundos de uma data (sem fuso = horário de Brasília)."""
+    return _no_fuso(momento).value // 10**6
+
+
+def de_ms(ms):
+    return pd.to_datetime(
+        pd.to_numeric(ms, errors="coerce"), unit="ms", utc=True
+    ).dt.tz_convert(FUSO)
+
+
+def carimbo(coluna, momento=None):
+    """
+    Valores de uma data para gravar: {coluna: texto, coluna_ms: int}.
+    Sem `momento`, usa o horário atual.
+    """
+    momento = _no_fuso(agora() if momento is None else momento)
+    return {
+        coluna: momento.isoformat(sep=" ", timespec="seconds"),
+        f"{coluna}_ms": para_ms(momento)
+    }
+
+
+def _de_texto(textos, fuso_ingenuo):
+    textos = textos.astype("string").str.strip()
+    com_fuso = textos.str.contains(r"(?:[+-]\d{2}:?\d{2}|Z)$", na=False)
+
+    resultado = pd.Series(pd.NaT, index=textos.index, dtype=_UTC)
+    if com_fuso.any():
+        resultado[com_fuso] = pd.to_datetime(
+            textos[com_fuso], utc=True, format="ISO8601", errors="coerce"
+        ).astype(_UTC)
+    sem_fuso = ~com_fuso & textos.notna()
+    if sem_fuso.any():
+        resultado[sem_fuso] = pd.to_datetime(
+            textos[sem_fuso], format="ISO8601", errors="coerce"
+        ).dt.tz_localize(
+            fuso_ingenuo, ambiguous="NaT", nonexistent="NaT"
+        ).dt.tz_convert("UTC").astype(_UTC)
+    return resultado
+
+
+def converter(df, coluna):
+    """
+    Série de datas no fuso de Brasília, convertida de uma vez para a
+    tabela inteira.
+    """
+    if df.empty:
+        return pd.Series(pd.NaT, index=df.index, dtype=f"datetime64[ns, {FUSO}]")
+
+    if f"{coluna}_ms" in df.columns:
+        ms = pd.to_numeric(df[f"{coluna}_ms"], errors="coerce")
+    else:
+        ms = pd.Series(float("nan"), index=df.index)
+
+    resultado = pd.to_datetime(ms, unit="ms", utc=True).astype(_UTC)
+    faltando = ms.isna()
+    if faltando.any():
+        resultado[faltando] = _de_texto(
+            df.loc[faltando, coluna], FUSO_LEGADO.get(coluna, "UTC")
+        )
+    return resultado.dt.tz_convert(FUSO)
+
+
+def preencher_ms(df):
+    """
+    Completa as colunas _ms vazias (registros antigos) a partir do
+    texto da data. A tabela passa a ter o valor em memória e o grava
+    na próxima vez que for regravada.
+    """
+    for coluna_ms in [c for c in df.columns if c.endswith("_ms")]:
+        coluna = coluna_ms[:-3]
+        if coluna not in df.columns:
+            continue
+        ms = pd.to_numeric(df[coluna_ms], errors="coerce")
+        faltando = ms.isna() & df[coluna].notna()
+        if faltando.any():
+            convertidas = converter(df.loc[faltando, [coluna]], coluna)
+            ms[faltando] = (
+                convertidas - pd.Timestamp(0, tz="UTC")
+            ) // pd.Timedelta(milliseconds=1)
+        df[coluna_ms] = ms.astype("Int64")
+    return df
+
+
+def formatar(datas, formato=FORMATO_EXIBICAO):
+    return datas.dt.strftime(formato).fillna("")
+
+
+def formatar_coluna(df, coluna, formato=FORMATO_EXIBICAO):
+    """Formata a coluna, já convertida ou ainda como foi gravada."""
+    if pd.api.types.is_datetime64_any_dtype(df[coluna]):
+        return formatar(df[coluna], formato)
+    return formatar(converter(df, coluna), formato)
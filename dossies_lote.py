@@ -0,0 +1,252 @@
+import streamlit as st
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from io import BytesIO
+from fila_relatorios import chave_conteudo
+from pdf_utils import gerar_pdf_processo, obter_nomes
+
+# =====================================================
+# DOSSIÊS EM LOTE (ZIP)
+# =====================================================
+# Os PDFs de vários processos são gerados em paralelo, em processos
+# separados do servidor (o reportlab é só CPU), e cada um entra no ZIP
+# assim que fica pronto: nada é gravado em disco e só os PDFs em
+# andamento ficam em memória fora do ZIP.
+#
+# Os processos são um pool único, criado na primeira exportação e
+# compartilhado por todas as sessões: exportações simultâneas dividem
+# os mesmos processos em vez de cada uma abrir os seus. Eles são
+# iniciados com "spawn" (interpretador novo), não copiados por fork
+# do servidor, que tem várias threads rodando.
+#
+# O "spawn" reimporta o __main__ em cada processo novo, e durante a
+# execução de uma página o Streamlit põe o script da página como
+# __main__: os processos do pool rodariam a página. Por isso eles são
+# criados (no submit) com um __main__ vazio, sem arquivo.
+#
+# Se a exportação for cancelada ou falhar, o ZIP parcial é guardado;
+# pedir de novo o mesmo lote continua de onde parou. Parciais não
+# retomados são descartados depois de PARCIAIS_MINUTOS, e os mais
+# antigos saem antes se juntos passarem de PARCIAIS_MB.
+
+# Processos do pool.
+# Configurável em st.secrets["DOSSIES_PROCESSOS"].
+PROCESSOS_PARALELOS = min(2, os.cpu_count() or 1)
+
+# PDFs encomendados por processo de cada vez
+PENDENTES_POR_PROCESSO = 2
+
+PARCIAIS_MINUTOS = 60
+PARCIAIS_MB = 200
+
+# chave do lote -> {"buffer": BytesIO do ZIP, "feitos": nomes já no ZIP,
+#                   "usado": time.monotonic(), "tamanho": bytes do ZIP}
+_parciais = {}
+_trava = threading.Lock()
+
+_pool = None
+_trava_pool = threading.Lock()
+_trava_main = threading.Lock()
+
+
+class LoteDossies:
+    def __init__(self, conteudo, quantidade, retomados, segundos):
+        self.conteudo = conteudo
+        self.quantidade = quantidade
+        self.retomados = retomados
+        self.segundos = segundos
+
+    @property
+    def por_segundo(self):
+        gerados = self.quantidade - self.retomados
+        return gerados / self.segundos if self.segundos else 0.0
+
+
+def _paralelos():
+    try:
+        return max(1, int(st.secrets.get("DOSSIES_PROCESSOS", PROCESSOS_PARALELOS)))
+    except Exception:
+        return PROCESSOS_PARALELOS
+
+
+def _obter_pool():
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_paralelos(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+@contextmanager
+def _main_vazio():
+    with _trava_main:
+        anterior = sys.modules["__main__"]
+        vazio = types.ModuleType("__main__")
+        sys.modules["__main__"] = vazio
+        try:
+            yield
+        finally:
+            # Outra sessão pode ter começado a rodar a página nesse meio
+            # tempo e instalado o próprio __main__: esse fica
+            if sys.modules["__main__"] is vazio:
+                sys.modules["__main__"] = anterior
+
+
+def _descartar_pool(pool):
+    # Um processo morreu (ex.: falta de memória): o pool não aceita
+    # mais tarefas e o próximo lote cria outro
+    global _pool
+    with _trava_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _podar_parciais():
+    # Chamada com _trava adquirida
+    agora = time.monotonic()
+    for chave in [
+        c for c, p in _parciais.items()
+        if agora - p["usado"] > PARCIAIS_MINUTOS * 60
+    ]:
+        del _parciais[chave]
+
+    total = sum(p["tamanho"] for p in _parciais.values())
+    for chave in sorted(_parciais, key=lambda c: _parciais[c]["usado"]):
+        if total <= PARCIAIS_MB * 1024 * 1024:
+            break
+        total -= _parciais.pop(chave)["tamanho"]
+
+
+def nome_dossie(processo):
+    return f"processo_{str(processo['numero_protocolo']).replace('/', '-')}.pdf"
+
+
+def _renderizar(processo, historico, destinacoes, nomes, usuario_emissor, emitido_em):
+    # Roda em outro processo: recebe tudo pronto, sem consultar o
+    # armazenamento
+    return gerar_pdf_processo(
+        processo=processo,
+        historico=historico,
+        usuario_emissor=usuario_emissor,
+        emitido_em=emitido_em,
+        nomes=nomes,
+        destinacoes=destinacoes
+    )
+
+
+def gerar_dossies_zip(
+    *, processos, historico, destinacoes, usuario_emissor, emitido_em,
+    progresso=None
+):
+    """
+    ZIP com o PDF de cada processo de `processos`. historico e
+    destinacoes trazem as linhas de todos eles (andamentos com a data
+    já convertida). emitido_em: data impressa em todos os PDFs.
+    Devolve um LoteDossies.
+    """
+    inicio = time.perf_counter()
+
+    chave = chave_conteudo(gerar_dossies_zip, {
+        "processos": processos,
+        "historico": historico,
+        "destinacoes": destinacoes,
+        "usuario_emissor": usuario_emissor,
+        "emitido_em": emitido_em
+    })
+    with _trava:
+        _podar_parciais()
+        parcial = _parciais.setdefault(chave, {
+            "buffer": BytesIO(),
+            "feitos": set(),
+            "usado": time.monotonic(),
+            "tamanho": 0
+        })
+    feitos = parcial["feitos"]
+    retomados = len(feitos)
+
+    nomes = obter_nomes(
+        historico["servidor"].tolist() + destinacoes["protocolista"].tolist()
+    )
+    historico_por_processo = dict(tuple(historico.groupby("id_processo", sort=False)))
+    destinacoes_por_processo = dict(tuple(destinacoes.groupby("id_processo", sort=False)))
+    sem_historico = historico.iloc[0:0]
+    sem_destinacao = destinacoes.iloc[0:0]
+
+    registros = processos.to_dict("records")
+    pendentes = iter([p for p in registros if nome_dossie(p) not in feitos])
+
+    pool = _obter_pool()
+    # Cada lote mantém no máximo este número de PDFs na fila do pool
+    pendentes_no_pool = _paralelos() * PENDENTES_POR_PROCESSO
+    em_andamento = {}
+
+    try:
+        with zipfile.ZipFile(parcial["buffer"], "a", zipfile.ZIP_STORED) as arquivo_zip:
+
+            def encomendar():
+                processo = next(pendentes, None)
+                if processo is None:
+                    return False
+                with _main_vazio():
+                    futuro = pool.submit(
+                        _renderizar,
+                        processo,
+                        historico_por_processo.get(processo["id_processo"], sem_historico),
+                        destinacoes_por_processo.get(processo["id_processo"], sem_destinacao),
+                        nomes,
+                        usuario_emissor,
+                        emitido_em
+                    )
+                em_andamento[futuro] = nome_dossie(processo)
+                return True
+
+            try:
+                for _ in range(pendentes_no_pool):
+                    if not encomendar():
+                        break
+
+                while em_andamento:
+                    prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        nome = em_andamento.pop(futuro)
+                        # PDF já é comprimido: vai para o ZIP sem recompressão
+                        arquivo_zip.writestr(nome, futuro.result())
+                        feitos.add(nome)
+                        encomendar()
+
+                    if progresso is not None:
+                        progresso(len(feitos) / max(len(registros), 1))
+            finally:
+                # Cancelado ou com erro: não espera o que ainda não começou
+                for futuro in em_andamento:
+                    futuro.cancel()
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        raise
+    finally:
+        with _trava:
+            with parcial["buffer"].getbuffer() as memoria:
+                parcial["tamanho"] = memoria.nbytes
+            parcial["usado"] = time.monotonic()
+
+    with _trava:
+        _parciais.pop(chave, None)
+
+    return LoteDossies(
+        conteudo=parcial["buffer"].getvalue(),
+        quantidade=len(feitos),
+        retomados=retomados,
+        segundos=time.perf_counter() - inicio
+    )
@@ -0,0 +1,283 @@
+import streamlit as st
+import pandas as pd
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# =====================================================
+# FILA DE RELATÓRIOS
+# =====================================================
+# Os PDFs são gerados fora da execução da página, em threads do
+# servidor. A página recebe um id de trabalho, acompanha o progresso a
+# cada segundo e pode cancelar. O resultado fica guardado pelo hash do
+# conteúdo de entrada: gerar de novo com os mesmos dados devolve o PDF
+# pronto, sem passar pelo reportlab.
+
+# Relatórios gerados ao mesmo tempo.
+# Configurável em st.secrets["RELATORIOS_SIMULTANEOS"].
+TRABALHADORES = 2
+
+# PDFs prontos mantidos em memória (o menos usado sai primeiro)
+MAX_RESULTADOS_CACHE = 20
+
+# Trabalhos encerrados lembrados para a página buscar o resultado
+MAX_TRABALHOS = 100
+
+INTERVALO_ATUALIZACAO = 1  # segundos entre consultas de progresso
+
+NA_FILA = "na_fila"
+GERANDO = "gerando"
+CONCLUIDO = "concluido"
+CANCELADO = "cancelado"
+ERRO = "erro"
+
+ATIVOS = (NA_FILA, GERANDO)
+
+
+class Cancelado(Exception):
+    pass
+
+
+_trava = threading.Lock()
+_trabalhos = OrderedDict()
+_resultados = OrderedDict()
+_contador = itertools.count(1)
+_executor = None
+
+
+def _obter_executor():
+    global _executor
+    with _trava:
+        if _executor is None:
+            try:
+                n = int(st.secrets.get("RELATORIOS_SIMULTANEOS", TRABALHADORES))
+            except Exception:
+                n = TRABALHADORES
+            _executor = ThreadPoolExecutor(
+                max_workers=n, thread_name_prefix="relatorio"
+            )
+        return _executor
+
+
+# =====================================================
+# HASH DAS ENTRADAS
+# =====================================================
+def _alimentar(h, valor):
+    if isinstance(valor, pd.DataFrame):
+        h.update(repr(list(valor.columns)).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=False).values.tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(pd.util.hash_pandas_object(valor, index=False).values.tobytes())
+    elif isinstance(valor, dict):
+        for k in sorted(valor, key=str):
+            h.update(repr(k).encode())
+            _alimentar(h, valor[k])
+    elif isinstance(valor, (list, tuple)):
+        h.update(f"[{len(valor)}".encode())
+        for item in valor:
+            _alimentar(h, item)
+    else:
+        h.update(repr(valor).encode())
+    h.update(b"|")
+
+
+def chave_conteudo(funcao, parametros):
+    """
+    Hash da função e dos parâmetros (DataFrames pelo conteúdo). Tudo o
+    que o documento imprime precisa vir nos parâmetros: a data de
+    emissão é passada pela página (emitido_em), nunca lida do relógio
+    dentro do gerador, senão um PDF em cache sairia com a hora antiga.
+    """
+    h = hashlib.sha256()
+    h.update(f"{funcao.__module__}.{funcao.__qualname__}".encode())
+    _alimentar(h, parametros)
+    return h.hexdigest()
+
+
+# =====================================================
+# TRABALHOS
+# =====================================================
+def _lembrar_resultado(chave, resultado):
+    with _trava:
+        _resultados[chave] = resultado
+        _resultados.move_to_end(chave)
+        while len(_resultados) > MAX_RESULTADOS_CACHE:
+            _resultados.popitem(last=False)
+
+
+def _esquecer_antigos():
+    encerrados = [
+        i for i, t in _trabalhos.items() if t["estado"] not in ATIVOS
+    ]
+    while len(_trabalhos) > MAX_TRABALHOS and encerrados:
+        _trabalhos.pop(encerrados.pop(0))
+
+
+def _executar(trabalho, funcao, parametros):
+    def progresso(fracao):
+        if trabalho["cancelar"]:
+            raise Cancelado()
+        trabalho["progresso"] = min(max(float(fracao), 0.0), 1.0)
+
+    if trabalho["cancelar"]:
+        trabalho["estado"] = CANCELADO
+        return
+
+    trabalho["estado"] = GERANDO
+    trabalho["iniciado_em"] = time.monotonic()
+    try:
+        resultado = funcao(**parametros, progresso=progresso)
+    except Cancelado:
+        trabalho["estado"] = CANCELADO
+        return
+    except Exception as e:
+        trabalho["erro"] = str(e)
+        trabalho["estado"] = ERRO
+        return
+
+    _lembrar_resultado(trabalho["chave"], resultado)
+    trabalho["resultado"] = resultado
+    trabalho["progresso"] = 1.0
+    trabalho["estado"] = CONCLUIDO
+
+
+def enviar(funcao, **parametros):
+    """
+    Agenda funcao(**parametros, progresso=...) e devolve o id do
+    trabalho. progresso(fracao) informa o andamento (0 a 1) e
+    interrompe a geração se o trabalho tiver sido cancelado.
+
+    Se o mesmo relatório já estiver pronto, o trabalho nasce concluído;
+    se já estiver sendo gerado, o id existente é devolvido.
+    """
+    chave = chave_conteudo(funcao, parametros)
+
+    with _trava:
+        for id_trabalho, t in _trabalhos.items():
+            if t["chave"] == chave and t["estado"] in ATIVOS:
+                return id_trabalho
+
+        id_trabalho = next(_contador)
+        trabalho = {
+            "id": id_trabalho,
+            "chave": chave,
+            "estado": NA_FILA,
+            "progresso": 0.0,
+            "resultado": None,
+            "erro": None,
+            "cancelar": False,
+            "criado_em": time.monotonic(),
+            "iniciado_em": None,
+            "futuro": None
+        }
+
+        if chave in _resultados:
+            _resultados.move_to_end(chave)
+            trabalho.update(
+                estado=CONCLUIDO, progresso=1.0, resultado=_resultados[chave]
+            )
+
+        _trabalhos[id_trabalho] = trabalho
+        _esquecer_antigos()
+
+    if trabalho["estado"] == NA_FILA:
+        trabalho["futuro"] = _obter_executor().submit(
+            _executar, trabalho, funcao, parametros
+        )
+    return id_trabalho
+
+
+def situacao(id_trabalho):
+    """Cópia do estado do trabalho, ou None se ele não existir mais."""
+    with _trava:
+        trabalho = _trabalhos.get(id_trabalho)
+        return None if trabalho is None else dict(trabalho)
+
+
+def cancelar(id_trabalho):
+    with _trava:
+        trabalho = _trabalhos.get(id_trabalho)
+    if trabalho is None or trabalho["estado"] not in ATIVOS:
+        return
+    trabalho["cancelar"] = True
+    futuro = trabalho["futuro"]
+    if futuro is not None and futuro.cancel():
+        trabalho["estado"] = CANCELADO
+
+
+def medir_build(doc, total, progresso):
+    """
+    Liga o progresso ao doc.build do reportlab: conta os flowables já
+    desenhados em relação ao total esperado.
+    """
+    if progresso is None:
+        return
+    desenhados = itertools.count(1)
+    doc.afterFlowable = lambda flowable: progresso(
+        next(desenhados) / max(total, 1)
+    )
+
+
+# =====================================================
+# ACOMPANHAMENTO NA PÁGINA
+# =====================================================
+def acompanhar(
+    chave_sessao, nome_arquivo, rotulo="⬇️ Baixar PDF", mime="application/pdf"
+):
+    """
+    Mostra o trabalho guardado em st.session_state[chave_sessao]:
+    barra de progresso com botão de cancelar enquanto gera e botão de
+    download quando termina. Devolve o resultado quando pronto.
+    """
+    id_trabalho = st.session_state.get(chave_sessao)
+    if id_trabalho is None:
+        return None
+
+    trabalho = situacao(id_trabalho)
+    if trabalho is None:
+        st.session_state.pop(chave_sessao, None)
+        return None
+
+    if trabalho["estado"] in ATIVOS:
+        _em_andamento(chave_sessao, id_trabalho)
+        return None
+
+    if trabalho["estado"] == CANCELADO:
+        st.info("Geração cancelada.")
+        return None
+
+    if trabalho["estado"] == ERRO:
+        st.error(f"Erro na geração: {trabalho['erro']}")
+        return None
+
+    resultado = trabalho["resultado"]
+    st.download_button(
+        rotulo,
+        data=getattr(resultado, "conteudo", resultado),
+        file_name=nome_arquivo,
+        mime=mime,
+        key=f"{chave_sessao}_download"
+    )
+    return resultado
+
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def _em_andamento(chave_sessao, id_trabalho):
+    trabalho = situacao(id_trabalho)
+    if trabalho is None or trabalho["estado"] not in ATIVOS:
+        # Terminou: a página inteira é refeita para mostrar o resultado
+        st.rerun()
+
+    texto = (
+        "Aguardando na fila..."
+        if trabalho["estado"] == NA_FILA
+        else f"Gerando... {trabalho['progresso']:.0%}"
+    )
+    st.progress(trabalho["progresso"], text=texto)
+
+    if st.button("Cancelar", key=f"{chave_sessao}_cancelar"):
+        cancelar(id_trabalho)
+        st.rerun()
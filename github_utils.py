@@ -0,0 +1,358 @@
+import streamlit as st
+import pandas as pd
+import base64
+import hashlib
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from io import StringIO
+import datas
+from github import Github, GithubException, InputGitTreeElement, UnknownObjectException
+
+# =====================================================
+# GITHUB CONFIG
+# =====================================================
+BRANCH = "main"
+
+# Conexões HTTP mantidas abertas (keep-alive) e reaproveitadas
+# por todas as sessões do servidor
+TAMANHO_POOL = 10
+
+# Tempo (s) em que um CSV em cache é usado sem consultar o GitHub.
+# Depois disso o arquivo é revalidado com requisição condicional
+# (If-None-Match); um 304 não baixa nada nem gasta limite da API.
+# Configurável em st.secrets["CACHE_TTL_SEGUNDOS"].
+TTL_LEITURA = 30
+
+# Máximo de arquivos mantidos em memória (o menos usado sai primeiro).
+# Configurável em st.secrets["CACHE_MAX_ARQUIVOS"].
+MAX_ARQUIVOS_CACHE = 32
+
+
+# Gravação otimista: se outro usuário gravar entre a leitura e o
+# commit, a operação é refeita sobre os dados novos
+TENTATIVAS_GRAVACAO = 5
+ESPERA_BASE = 0.5  # segundos; dobra a cada nova tentativa
+
+
+def _config(chave, padrao):
+    try:
+        return type(padrao)(st.secrets.get(chave, padrao))
+    except Exception:
+        return padrao
+
+
+@st.cache_resource(show_spinner=False)
+def obter_repo():
+    """
+    Cliente GitHub único por processo do servidor.
+    O Streamlit reexecuta as páginas a cada clique; o cliente e o
+    repositório são criados uma única vez e compartilhados.
+    """
+    # Sem espera artificial entre requisições: uma gravação já é um
+    # único commit (árvore + commit + ref), não uma rajada de escritas
+    g = Github(
+        st.secrets["GITHUB_TOKEN"],
+        pool_size=TAMANHO_POOL,
+        seconds_between_requests=None,
+        seconds_between_writes=None
+    )
+    # lazy=True: não faz o GET /repos/... só para obter o objeto
+    return g.get_repo(st.secrets["REPO_NAME"], lazy=True)
+
+
+# =====================================================
+# CACHE DE LEITURA (CAMINHO + SHA DO BLOB)
+# =====================================================
+# caminho -> {"arquivo", "sha", "df", "verificado_em"}; arquivo
+# ausente: sha e df None
+_cache = OrderedDict()
+_trava_cache = threading.Lock()
+
+
+def _decodificar(repo, arquivo):
+    if arquivo.encoding == "base64":
+        conteudo = arquivo.decoded_content
+    else:
+        # Acima de 1 MB a API de conteúdo não devolve o arquivo
+        blob = repo.get_git_blob(arquivo.sha)
+        conteudo = base64.b64decode(blob.content)
+    return pd.read_csv(StringIO(conteudo.decode("utf-8")))
+
+
+def _guardar_no_cache(caminho, arquivo, sha, df):
+    with _trava_cache:
+        _cache[caminho] = {
+            "arquivo": arquivo,
+            "sha": sha,
+            "df": df,
+            "verificado_em": time.monotonic()
+        }
+        _cache.move_to_end(caminho)
+        while len(_cache) > _config("CACHE_MAX_ARQUIVOS", MAX_ARQUIVOS_CACHE):
+            _cache.popitem(last=False)
+
+
+def _ler_blob(repo, sha):
+    blob = repo.get_git_blob(sha)
+    return pd.read_csv(StringIO(base64.b64decode(blob.content).decode("utf-8")))
+
+
+def _ler_csv(caminho):
+    """
+    Devolve o DataFrame de um CSV do repositório, ou None se ele não
+    existir. Dentro do TTL não há chamada à API; depois dele o arquivo é
+    revalidado e só é baixado e reprocessado se o SHA do blob mudou.
+    """
+    with _trava_cache:
+        item = _cache.get(caminho)
+        if item is not None:
+            _cache.move_to_end(caminho)
+            idade = time.monotonic() - item["verificado_em"]
+            if idade < _config("CACHE_TTL_SEGUNDOS", TTL_LEITURA):
+                return item["df"]
+
+    repo = obter_repo()
+
+    if item is not None and item["arquivo"] is None:
+        # Gravado, lido na base de uma gravação (sem o ContentFile) ou
+        # ausente: revalidado pelo SHA na árvore da branch
+        sha = _shas_da_branch(repo).get(caminho)
+        if sha is None:
+            df = None
+        elif sha == item["sha"]:
+            df = item["df"]
+        else:
+            df = _ler_blob(repo, sha)
+        _guardar_no_cache(caminho, None, sha, df)
+        return df
+
+    if item is not None:
+        arquivo = item["arquivo"]
+        mudou = arquivo.update()  # 304 -> False
+    else:
+        try:
+            arquivo = repo.get_contents(caminho, ref=BRANCH)
+        except UnknownObjectException:
+            # Arquivo que não existe (ex.: manifesto ainda não criado)
+            # também fica em cache, para não ser pedido a cada leitura
+            _guardar_no_cache(caminho, None, None, None)
+            return None
+        mudou = True
+
+    if item is not None and (not mudou or arquivo.sha == item["sha"]):
+        df = item["df"]
+    else:
+        df = _decodificar(repo, arquivo)
+
+    _guardar_no_cache(caminho, arquivo, arquivo.sha, df)
+    return df
+
+
+# =====================================================
+# LEITURA
+# =====================================================
+def carregar_csv_github(caminho, colunas=None):
+    """
+    Lê um CSV do repositório. Reexecuções sem alteração nos dados
+    não baixam nem reprocessam o arquivo.
+    """
+    try:
+        df = _ler_csv(caminho)
+    except Exception:
+        df = None
+    if df is None:
+        return pd.DataFrame(columns=colunas if colunas else [])
+    df = df.copy()
+
+    if colunas:
+        for col in colunas:
+            if col not in df.columns:
+                df[col] = None
+    return df
+
+
+# =====================================================
+# ESCRITA
+# =====================================================
+# Último commit conhecido por este processo e o SHA de cada arquivo
+# nele: se a branch ainda aponta para ele, nada precisa ser buscado
+_ultimo_commit = {}
+
+# Referência da branch já lida, para revalidar com If-None-Match
+_ref_branch = {}
+_trava_ref = threading.Lock()
+
+_estatisticas = {
+    "gravacoes": 0,
+    "tentativas": 0,
+    "conflitos": 0,
+    "falhas": 0,
+    "conflitos_por_hora": Counter()
+}
+_trava_estatisticas = threading.Lock()
+
+
+def _contar(chave):
+    with _trava_estatisticas:
+        _estatisticas[chave] += 1
+        if chave == "conflitos":
+            hora = datas.agora().hour
+            _estatisticas["conflitos_por_hora"][hora] += 1
+
+
+def estatisticas_concorrencia():
+    """
+    Contadores de gravação deste processo, para acompanhar a
+    disputa entre setores nos horários de pico.
+    """
+    with _trava_estatisticas:
+        copia = dict(_estatisticas)
+        copia["conflitos_por_hora"] = dict(_estatisticas["conflitos_por_hora"])
+    return copia
+
+
+def _sha_blob(conteudo):
+    cabecalho = f"blob {len(conteudo)}\0".encode("utf-8")
+    return hashlib.sha1(cabecalho + conteudo).hexdigest()
+
+
+def _base_da_branch(repo, sha_commit):
+    base = _ultimo_commit.get(sha_commit)
+    if base is not None:
+        return base
+
+    commit = repo.get_git_commit(sha_commit)
+    arvore = repo.get_git_tree(commit.tree.sha, recursive=True)
+    shas = {
+        item.path: item.sha
+        for item in arvore.tree
+        if item.type == "blob"
+    }
+    _ultimo_commit.clear()
+    _ultimo_commit[sha_commit] = (commit, shas)
+    return commit, shas
+
+
+def _shas_da_branch(repo):
+    """
+    SHA de cada arquivo na ponta da branch. A referência é revalidada
+    com requisição condicional (304 se a branch não andou) e a árvore
+    só é buscada quando o commit muda.
+    """
+    with _trava_ref:
+        ref = _ref_branch.get(BRANCH)
+        if ref is None:
+            ref = repo.get_git_ref(f"heads/{BRANCH}")
+            _ref_branch[BRANCH] = ref
+        else:
+            ref.update()
+        sha_commit = ref.object.sha
+    return _base_da_branch(repo, sha_commit)[1]
+
+
+def _ler_na_base(repo, caminho, shas, desatualizados):
+    """
+    Lê o arquivo exatamente como está no commit base. O cache só é
+    aproveitado se o SHA com que o arquivo foi lido for o mesmo.
+    """
+    sha = shas.get(caminho)
+    if sha is None:
+        return None
+
+    with _trava_cache:
+        item = _cache.get(caminho)
+
+    if item is not None and item["sha"] == sha:
+        return item["df"].copy()
+
+    if item is not None:
+        # A página trabalhou com uma versão que já foi alterada
+        desatualizados.append(caminho)
+
+    df = _ler_blob(repo, sha)
+    _guardar_no_cache(caminho, None, sha, df)
+    return df.copy()
+
+
+def gravar_github(operacao, mensagem):
+    """
+    Grava uma operação em um único commit, pela Git Data API.
+
+    operacao(ler) recebe uma função ler(caminho) -> DataFrame (ou
+    None se o arquivo não existir) e devolve {caminho: DataFrame}
+    com os arquivos alterados. Todos entram na mesma árvore e no
+    mesmo commit: ou a branch passa a ter todos, ou fica como estava.
+
+    Se outro usuário gravar antes (GitHub responde 409/422), a
+    operação é executada de novo sobre os dados atuais, com espera
+    crescente, até TENTATIVAS_GRAVACAO vezes.
+
+    mensagem pode ser texto ou uma função chamada depois da operação
+    (para usar números gerados por ela).
+    """
+    repo = obter_repo()
+    tentativas = _config("TENTATIVAS_GRAVACAO", TENTATIVAS_GRAVACAO)
+
+    for tentativa in range(tentativas):
+        _contar("tentativas")
+
+        ref = repo.get_git_ref(f"heads/{BRANCH}")
+        base, shas = _base_da_branch(repo, ref.object.sha)
+
+        desatualizados = []
+        arquivos = operacao(
+            lambda caminho: _ler_na_base(repo, caminho, shas, desatualizados)
+        )
+        if desatualizados and tentativa == 0:
+            _contar("conflitos")
+
+        textos = {
+            caminho: df.to_csv(index=False)
+            for caminho, df in arquivos.items()
+        }
+        if not textos:
+            return
+
+        elementos = [
+            InputGitTreeElement(caminho, "100644", "blob", content=texto)
+            for caminho, texto in textos.items()
+        ]
+
+        try:
+            arvore = repo.create_git_tree(elementos, base.tree)
+            commit = repo.create_git_commit(
+                mensagem() if callable(mensagem) else mensagem,
+                arvore,
+                [base]
+            )
+            # Sem force: falha se a branch andou desde a leitura
+            ref.edit(commit.sha)
+        except GithubException as e:
+            if e.status not in (409, 422):
+                raise
+            _contar("conflitos")
+            if tentativa == tentativas - 1:
+                _contar("falhas")
+                raise
+            time.sleep(ESPERA_BASE * 2 ** tentativa + random.uniform(0, ESPERA_BASE))
+            continue
+
+        break
+
+    _contar("gravacoes")
+
+    # Próximas leituras e gravações já enxergam os arquivos gravados
+    shas = dict(shas)
+    for caminho, texto in textos.items():
+        shas[caminho] = _sha_blob(texto.encode("utf-8"))
+        _guardar_no_cache(
+            caminho,
+            None,
+            shas[caminho],
+            pd.read_csv(StringIO(texto))
+        )
+
+    _ultimo_commit.clear()
+    _ultimo_commit[commit.sha] = (commit, shas)
@@ -0,0 +1,274 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.lib import colors
+from reportlab.platypus import Flowable, TableStyle
+from functools import lru_cache
+import os
+
+# =====================================================
+# MODELOS DOS RELATÓRIOS EM PDF
+# =====================================================
+# Estilos de parágrafo, estilos de tabela e logo montados uma única vez
+# por processo do servidor e reaproveitados por todos os PDFs.
+# Nenhum deles é alterado durante a geração, então podem ser usados
+# por vários relatórios ao mesmo tempo.
+CAMINHO_LOGO = os.path.join("assets", "logo.png")
+
+
+# ===============================
+# RODAPÉ
+# ===============================
+def rodape(canvas, doc, usuario_emissor):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 8)
+    canvas.setFillColor(colors.grey)
+
+    texto = f"Emitido por: {usuario_emissor}"
+    largura_pagina, _ = A4
+
+    canvas.drawRightString(
+        largura_pagina - 50,  # margem direita
+        30,                   # altura do rodapé
+        texto
+    )
+
+    canvas.restoreState()
+
+
+# ===============================
+# ESTILOS DE TABELA
+# ===============================
+# Cartão do PDF do processo (título destacado)
+ESTILO_CARD_PROCESSO = TableStyle([
+    ("BOX", (0, 0), (-1, -1), 0.75, colors.lightgrey),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("TOPPADDING", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+])
+
+# Cartão do histórico do servidor (fundo inteiro)
+ESTILO_CARD_HISTORICO = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
+    ("BOX", (0, 0), (-1, -1), 0.75, colors.lightgrey),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("TOPPADDING", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+])
+
+ESTILO_QUADRO_PROCESSO = TableStyle([
+    ("BOX", (0, 0), (-1, -1), 0.75, colors.grey),
+    ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ("FONT", (0, 0), (0, -1), "Helvetica-Bold"),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+])
+
+ESTILO_TABELA_REMESSA = TableStyle([
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("ALIGN", (1, 1), (-1, -1), "LEFT"),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+])
+
+
+# ===============================
+# ESTILOS DE PARÁGRAFO
+# ===============================
+@lru_cache(maxsize=None)
+def estilos_processo():
+    styles = getSampleStyleSheet()
+
+    styles.add(ParagraphStyle(
+        name="Titulo",
+        fontSize=14,
+        leading=18,
+        alignment=1,
+        fontName="Helvetica-Bold"
+    ))
+
+    styles.add(ParagraphStyle(
+        name="DataRelatorio",
+        fontSize=10,
+        leading=12,
+        alignment=2,
+        textColor=colors.grey
+    ))
+
+    styles.add(ParagraphStyle(
+        name="Subtitulo",
+        fontSize=11,
+        leading=14,
+        spaceAfter=10,
+        fontName="Helvetica-Bold"
+    ))
+
+    styles.add(ParagraphStyle(
+        name="CardTitulo",
+        fontSize=11,
+        leading=14,
+        fontName="Helvetica-Bold"
+    ))
+
+    styles.add(ParagraphStyle(
+        name="CardTexto",
+        fontSize=11,
+        leading=6,
+        spaceAfter=6
+    ))
+
+    styles.add(ParagraphStyle(
+        name="CardObservacao",
+        fontSize=11,
+        leading=16,
+        spaceBefore=6,
+        spaceAfter=4
+    ))
+
+    return styles
+
+
+@lru_cache(maxsize=None)
+def estilos_historico():
+    styles = getSampleStyleSheet()
+
+    styles.add(ParagraphStyle(
+        name="Titulo",
+        fontSize=16,
+        leading=20,
+        alignment=1,
+        fontName="Helvetica-Bold"
+    ))
+
+    styles.add(ParagraphStyle(
+        name="Subtitulo",
+        fontSize=12,
+        leading=14,
+        spaceBefore=14,
+        spaceAfter=12,
+        fontName="Helvetica-Bold"
+    ))
+
+    styles.add(ParagraphStyle(
+        name="DataRelatorio",
+        fontSize=9,
+        leading=12,
+        alignment=2,
+        textColor=colors.grey
+    ))
+
+    styles.add(ParagraphStyle(
+        name="CardTexto",
+        fontSize=10,
+        leading=14
+    ))
+
+    return styles
+
+
+@lru_cache(maxsize=None)
+def estilos_remessa():
+    styles = getSampleStyleSheet()
+
+    styles.add(ParagraphStyle(
+        name="TituloRemessa",
+        fontName="Helvetica-Bold",
+        fontSize=14,
+        alignment=1,  # centro
+        spaceAfter=10
+    ))
+
+    styles.add(ParagraphStyle(
+        name="DataDireita",
+        fontName="Helvetica",
+        fontSize=9,
+        alignment=2,  # direita
+        spaceAfter=10
+    ))
+
+    styles.add(ParagraphStyle(
+        name="SetorTitulo",
+        fontName="Helvetica-Bold",
+        fontSize=12,
+        spaceBefore=10,
+        spaceAfter=6
+    ))
+
+    return styles
+
+
+# ===============================
+# CONTEÚDO SOB DEMANDA
+# ===============================
+class FlowablesSobDemanda(list):
+    """
+    Lista de flowables que se reabastece com o próximo lote do
+    gerador quando fica curta. O documento inteiro nunca fica montado
+    em memória, só o lote corrente.
+    """
+
+    def __init__(self, iniciais, lotes, minimo):
+        super().__init__(iniciais)
+        self._lotes = lotes
+        self._minimo = minimo
+
+    def __len__(self):
+        while self._lotes is not None and super().__len__() < self._minimo:
+            lote = next(self._lotes, None)
+            if lote is None:
+                self._lotes = None
+            else:
+                self.extend(lote)
+        return super().__len__()
+
+
+# ===============================
+# LOGO
+# ===============================
+@lru_cache(maxsize=8)
+def _imagem(caminho):
+    """
+    Imagem lida uma vez por processo: o ImageReader guarda os pixels
+    já decodificados, e cada PDF só os comprime de novo.
+    """
+    return ImageReader(caminho)
+
+
+class Logo(Flowable):
+
+    def __init__(self, caminho, largura, altura):
+        super().__init__()
+        self.caminho = caminho
+        self.largura = largura
+        self.altura = altura
+        self.hAlign = "CENTER"
+
+    def wrap(self, largura_disponivel, altura_disponivel):
+        return self.largura, self.altura
+
+    def draw(self):
+        self.canv.drawImage(
+            _imagem(self.caminho), 0, 0, self.largura, self.altura, mask="auto"
+        )
+
+
+def logo(caminho=None, largura=500, altura=50):
+    """
+    Flowable do logo, ou None se o arquivo não existir. Sem caminho
+    (ou com um que não existe), usa o logo institucional.
+    """
+    if not caminho or not os.path.exists(caminho):
+        caminho = CAMINHO_LOGO
+    if not os.path.exists(caminho):
+        return None
+    return Logo(os.path.abspath(caminho), largura, altura)
@@ -1,19 +1,8 @@
 import streamlit as st
 import pandas as pd
-from io import StringIO
-from github import Github
-from datetime import datetime
-import pytz  # <- import necessário para fuso horário
-
-# =====================================================
-# FUNÇÃO DE HORÁRIO BRASÍLIA
-# =====================================================
-def agora_brasilia():
-    """
-    Retorna a data e hora atuais no fuso de Brasília (UTC-3)
-    """
-    fuso = pytz.timezone("America/Sao_Paulo")
-    return datetime.now(fuso)
+import hashlib
+import datas
+from armazenamento import Anexar, obter_armazenamento
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -31,43 +20,31 @@ usuario_logado = st.session_state["usuario"]
 perfil_logado = st.session_state.get("perfil", "Servidor")
 setor_logado = st.session_state.get("setor", "Protocolo")
 
-st.title("📄 Registro de Protocolo")
-st.markdown("Preencha os dados do documento recebido para iniciar o processo.")
-
 # =====================================================
-# GITHUB CONFIG
+# NUMERAÇÃO
 # =====================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
+def ultimo_numero_do_ano(t, ano):
+    """
+    Maior número de protocolo já usado no ano. Só é chamada na
+    primeira vez do ano, antes de a sequência existir.
+    """
+    df_proc = t.ler("processos")
+    df_ano = df_proc[
+        df_proc["numero_protocolo"]
+        .astype(str)
+        .str.endswith(f"/{ano}", na=False)
+    ]
+    return 0 if df_ano.empty else (
+        df_ano["numero_protocolo"]
+        .str.split("/")
+        .str[0]
+        .astype(int)
+        .max()
+    )
 
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
 
-def salvar_csv_github(df, caminho, mensagem):
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    try:
-        arquivo = repo.get_contents(caminho, ref=BRANCH)
-        repo.update_file(
-            path=arquivo.path,
-            message=mensagem,
-            content=csv_bytes,
-            sha=arquivo.sha,
-            branch=BRANCH
-        )
-    except:
-        repo.create_file(
-            path=caminho,
-            message=mensagem,
-            content=csv_bytes,
-            branch=BRANCH
-        )
-
-# =====================================================
-# CAMINHOS
-# =====================================================
-CAMINHO_PROC = "data/processos.csv"
-CAMINHO_AND = "data/andamentos.csv"
+st.title("📄 Registro de Protocolo")
+st.markdown("Preencha os dados do documento recebido para iniciar o processo.")
 
 # =====================================================
 # FORMULÁRIO
@@ -91,114 +68,242 @@ with st.form("form_protocolo"):
 # =====================================================
 if registrar:
 
-    ano_atual = agora_brasilia().year  # <- usa hora de Brasília
+    agora = datas.agora()  # <- horário de Brasília
+    ano_atual = agora.year
+    registro = {}
 
-    # =====================================================
-    # PROCESSOS
-    # =====================================================
-    try:
-        arquivo_proc = repo.get_contents(CAMINHO_PROC, ref=BRANCH)
-        conteudo = arquivo_proc.decoded_content.decode("utf-8")
-        df_proc = pd.read_csv(StringIO(conteudo))
-    except Exception as e:
-        st.warning(f"processos.csv não encontrado, criando novo. Detalhe: {e}")
-        df_proc = pd.DataFrame(columns=[
-            "id_processo",
-            "numero_protocolo",
-            "data_entrada",
-            "numero_referencia",
-            "setor_origem",
-            "assunto",
-            "descricao",
-            "setor_atual",
-            "status",
-            "id_setor_atual"
-        ])
-
-    novo_id = 1 if df_proc.empty else int(df_proc["id_processo"].max()) + 1
+    def registrar_protocolo(t):
+        """
+        Executada de novo sobre os dados atuais se outro usuário
+        gravar antes: id e número nunca se repetem.
+        """
+        # =====================================================
+        # PROCESSOS
+        # =====================================================
+        novo_id = t.proximo_id("processos")
 
-    df_ano = df_proc[
-        df_proc["numero_protocolo"]
-        .astype(str)
-        .str.endswith(f"/{ano_atual}", na=False)
-    ]
+        # Contador do ano: sem varrer os processos e sem repetir número
+        sequencial = t.reservar(
+            f"protocolo_{ano_atual}",
+            inicial=lambda: ultimo_numero_do_ano(t, ano_atual)
+        )
 
-    sequencial = 1 if df_ano.empty else (
-        df_ano["numero_protocolo"]
-        .str.split("/")
-        .str[0]
-        .astype(int)
-        .max() + 1
-    )
+        numero_protocolo = f"{sequencial:03d}/{ano_atual}"
+        registro["numero_protocolo"] = numero_protocolo
 
-    numero_protocolo = f"{sequencial:03d}/{ano_atual}"
-
-    novo_processo = {
-        "id_processo": novo_id,
-        "numero_protocolo": numero_protocolo,
-        "data_entrada": agora_brasilia().strftime("%Y-%m-%d %H:%M:%S"),  # <- horário Brasília
-        "numero_referencia": numero_referencia,
-        "setor_origem": setor_origem,
-        "assunto": assunto,
-        "descricao": descricao,
-        "setor_atual": "Protocolo",
-        "status": "Em Trâmite",
-        "id_setor_atual": 1
-    }
-
-    df_proc = pd.concat([df_proc, pd.DataFrame([novo_processo])], ignore_index=True)
-
-    salvar_csv_github(
-        df_proc,
-        CAMINHO_PROC,
-        f"Novo protocolo {numero_protocolo}"
-    )
+        novo_processo = {
+            "id_processo": novo_id,
+            "numero_protocolo": numero_protocolo,
+            **datas.carimbo("data_entrada", agora),
+            "numero_referencia": numero_referencia,
+            "setor_origem": setor_origem,
+            "assunto": assunto,
+            "descricao": descricao,
+            "setor_atual": "Protocolo",
+            "status": "Em Trâmite",
+            "id_setor_atual": 1
+        }
+
+        # =====================================================
+        # ANDAMENTOS
+        # =====================================================
+        novo_andamento = {
+            "id_andamento": t.proximo_id("andamentos"),
+            "id_processo": novo_id,
+            **datas.carimbo("data", agora),
+            "servidor": usuario_logado,
+            "perfil": perfil_logado,
+            "acao": "Protocolo Inicial",
+            "observacao": descricao,
+            "setor_origem": setor_origem if setor_origem else "Externo",
+            "setor_destino": setor_logado
+        }
+
+        return {
+            "processos": Anexar([novo_processo]),
+            "andamentos": Anexar([novo_andamento])
+        }
 
     # =====================================================
-    # ANDAMENTOS
+    # GRAVAÇÃO (PROCESSO + ANDAMENTO JUNTOS)
     # =====================================================
-    try:
-        arquivo_and = repo.get_contents(CAMINHO_AND, ref=BRANCH)
-        conteudo_and = arquivo_and.decoded_content.decode("utf-8")
-        df_and = pd.read_csv(StringIO(conteudo_and))
-    except Exception as e:
-        st.warning(f"andamentos.csv não encontrado, criando novo. Detalhe: {e}")
-        df_and = pd.DataFrame(columns=[
-            "id_andamento",
-            "id_processo",
-            "data",
-            "servidor",
-            "perfil",
-            "acao",
-            "observacao",
-            "setor_origem",
-            "setor_destino"
-        ])
-
-    novo_and_id = 1 if df_and.empty else int(df_and["id_andamento"].max()) + 1
-
-    novo_andamento = {
-        "id_andamento": novo_and_id,
-        "id_processo": novo_id,
-        "data": agora_brasilia().strftime("%Y-%m-%d %H:%M:%S"),  # <- horário Brasília
-        "servidor": usuario_logado,
-        "perfil": perfil_logado,
-        "acao": "Protocolo Inicial",
-        "observacao": descricao,
-        "setor_origem": setor_origem if setor_origem else "Externo",
-        "setor_destino": setor_logado
-    }
-
-    df_and = pd.concat([df_and, pd.DataFrame([novo_andamento])], ignore_index=True)
-
-    salvar_csv_github(
-        df_and,
-        CAMINHO_AND,
-        f"Andamento inicial do processo {numero_protocolo}"
+    obter_armazenamento().gravar(
+        registrar_protocolo,
+        lambda: f"Novo protocolo {registro['numero_protocolo']}"
     )
+    numero_protocolo = registro["numero_protocolo"]
 
     # =====================================================
     # FEEDBACK
     # =====================================================
     st.success(f"✅ Protocolo nº {numero_protocolo} criado com sucesso!")
     st.info("O processo já está disponível para tramitação.")
+
+# =====================================================
+# REGISTRO EM LOTE (PLANILHA)
+# =====================================================
+st.divider()
+st.subheader("📥 Registro em lote")
+st.markdown(
+    "Envie uma planilha (CSV ou Excel) com as colunas "
+    "**numero_referencia**, **setor_origem**, **assunto** e, "
+    "opcionalmente, **descricao**. Todos os documentos válidos são "
+    "registrados de uma vez, com números de protocolo seguidos."
+)
+
+COLUNAS_LOTE = ["numero_referencia", "setor_origem", "assunto", "descricao"]
+OBRIGATORIAS_LOTE = ["numero_referencia", "assunto"]
+
+
+def ler_planilha(arquivo):
+    if arquivo.name.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(arquivo, dtype=str)
+    return pd.read_csv(arquivo, dtype=str, sep=None, engine="python")
+
+
+def validar_lote(df):
+    """
+    Devolve (linhas válidas, erros). Os erros indicam a linha da
+    planilha (contando o cabeçalho como linha 1).
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    faltando = [c for c in OBRIGATORIAS_LOTE if c not in df.columns]
+    if faltando:
+        return None, pd.DataFrame([{
+            "Linha": "-",
+            "Erro": "Colunas obrigatórias ausentes: " + ", ".join(faltando)
+        }])
+
+    for col in COLUNAS_LOTE:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[COLUNAS_LOTE].fillna("").apply(lambda c: c.str.strip())
+    df["linha"] = df.index + 2
+
+    erros = []
+    for col in OBRIGATORIAS_LOTE:
+        vazias = df[df[col] == ""]
+        erros += [
+            {"Linha": linha, "Erro": f"{col} não informado"}
+            for linha in vazias["linha"]
+        ]
+
+    repetidas = df[
+        (df["numero_referencia"] != "")
+        & df["numero_referencia"].duplicated(keep="first")
+    ]
+    erros += [
+        {"Linha": linha, "Erro": f"numero_referencia repetido ({ref})"}
+        for linha, ref in zip(repetidas["linha"], repetidas["numero_referencia"])
+    ]
+
+    erros = pd.DataFrame(erros, columns=["Linha", "Erro"]).sort_values("Linha")
+    validas = df[~df["linha"].isin(erros["Linha"])]
+    return validas, erros
+
+
+planilha = st.file_uploader(
+    "Planilha de documentos",
+    type=["csv", "xlsx", "xls"],
+    key="planilha_lote"
+)
+
+if planilha is not None:
+    try:
+        lote, erros_lote = validar_lote(ler_planilha(planilha))
+    except Exception as e:
+        st.error(f"Não foi possível ler a planilha: {e}")
+        st.stop()
+
+    if not erros_lote.empty:
+        st.warning(f"⚠️ {len(erros_lote)} problema(s) encontrado(s); essas linhas não serão registradas.")
+        st.dataframe(erros_lote, use_container_width=True, hide_index=True)
+
+    # Mesma planilha já registrada nesta sessão (ex.: botão clicado duas
+    # vezes ou página recarregada): não registra de novo
+    hash_planilha = hashlib.sha256(planilha.getvalue()).hexdigest()
+    ja_registrado = st.session_state.get("lote_registrado", {})
+
+    if ja_registrado.get("hash") == hash_planilha:
+        numeros = ja_registrado["numeros"]
+        st.success(
+            f"✅ Planilha já registrada: {len(numeros)} protocolos, "
+            f"nº {numeros[0]} a {numeros[-1]}."
+        )
+    elif lote is None or lote.empty:
+        st.info("Nenhuma linha válida para registrar.")
+    else:
+        st.markdown(f"**{len(lote)} documento(s) prontos para registro.**")
+        st.dataframe(
+            lote.drop(columns=["linha"]),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        if st.button("📌 Registrar todos"):
+            agora = datas.agora()
+            ano_atual = agora.year
+            registro = {}
+
+            def registrar_lote(t):
+                n = len(lote)
+
+                # Faixas contínuas de ids e números, reservadas de uma vez
+                primeiro_id = t.proximo_id("processos", n)
+                primeiro_andamento = t.proximo_id("andamentos", n)
+                primeiro_numero = t.reservar(
+                    f"protocolo_{ano_atual}", n,
+                    inicial=lambda: ultimo_numero_do_ano(t, ano_atual)
+                )
+
+                ids = range(primeiro_id, primeiro_id + n)
+                numeros = [
+                    f"{seq:03d}/{ano_atual}"
+                    for seq in range(primeiro_numero, primeiro_numero + n)
+                ]
+                registro["numeros"] = numeros
+
+                processos = pd.DataFrame({
+                    "id_processo": ids,
+                    "numero_protocolo": numeros,
+                    **datas.carimbo("data_entrada", agora),
+                    "numero_referencia": lote["numero_referencia"].values,
+                    "setor_origem": lote["setor_origem"].values,
+                    "assunto": lote["assunto"].values,
+                    "descricao": lote["descricao"].values,
+                    "setor_atual": "Protocolo",
+                    "status": "Em Trâmite",
+                    "id_setor_atual": 1
+                })
+
+                andamentos = pd.DataFrame({
+                    "id_andamento": range(primeiro_andamento, primeiro_andamento + n),
+                    "id_processo": ids,
+                    **datas.carimbo("data", agora),
+                    "servidor": usuario_logado,
+                    "perfil": perfil_logado,
+                    "acao": "Protocolo Inicial",
+                    "observacao": lote["descricao"].values,
+                    "setor_origem": lote["setor_origem"].replace("", "Externo").values,
+                    "setor_destino": setor_logado
+                })
+
+                return {
+                    "processos": Anexar(processos),
+                    "andamentos": Anexar(andamentos)
+                }
+
+            # Um único commit/transação para o lote inteiro
+            obter_armazenamento().gravar(
+                registrar_lote,
+                lambda: f"Protocolos em lote {registro['numeros'][0]} a {registro['numeros'][-1]}"
+            )
+            st.session_state["lote_registrado"] = {
+                "hash": hash_planilha,
+                "numeros": registro["numeros"]
+            }
+
+            st.success(
+                f"✅ {len(registro['numeros'])} protocolos criados: "
+                f"nº {registro['numeros'][0]} a {registro['numeros'][-1]}."
+            )
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from io import StringIO
-from github import Github
-from datetime import datetime
+from armazenamento import Anexar, Atualizar, obter_armazenamento
+import datas
+import sugestoes
 
 # =========================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -22,104 +22,112 @@ setor_usuario = st.session_state.get("setor", "Não informado")
 st.title("🧭 Tramitação de Processos")
 
 # =========================================================
-# GITHUB CONFIG
+# CARREGAR BASES
 # =========================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
+armazenamento = obter_armazenamento()
 
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
+df_setores = armazenamento.carregar("setores")
 
-def salvar_csv_github(df, caminho, mensagem):
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    try:
-        arquivo = repo.get_contents(caminho, ref=BRANCH)
-        repo.update_file(
-            path=arquivo.path,
-            message=mensagem,
-            content=csv_bytes,
-            sha=arquivo.sha,
-            branch=BRANCH
-        )
-    except:
-        repo.create_file(
-            path=caminho,
-            message=mensagem,
-            content=csv_bytes,
-            branch=BRANCH
-        )
+ACOES = ["Análise","Parecer","Atualização","Encaminhamento","Conclusão"]
 
 # =========================================================
-# CAMINHOS DOS ARQUIVOS
-# =========================================================
-CAMINHO_PROC = "data/processos.csv"
-CAMINHO_AND = "data/andamentos.csv"
-CAMINHO_SET = "data/setores.csv"
-
-# =========================================================
-# CARREGAR BASES
+# PROCESSOS NO SETOR DO USUÁRIO
 # =========================================================
-try:
-    arquivo_proc = repo.get_contents(CAMINHO_PROC, ref=BRANCH)
-    df_proc = pd.read_csv(StringIO(arquivo_proc.decoded_content.decode("utf-8")))
-except:
-    df_proc = pd.DataFrame()
+# A caixa do setor (índice mantido a cada tramitação, arquivamento e
+# desarquivamento) lista só os processos abertos que estão nele;
+# os dados dos processos são lidos apenas para a página exibida
+PROCESSOS_POR_PAGINA = 20
 
-try:
-    arquivo_and = repo.get_contents(CAMINHO_AND, ref=BRANCH)
-    df_and = pd.read_csv(StringIO(arquivo_and.decoded_content.decode("utf-8")))
-except:
-    df_and = pd.DataFrame(columns=[
-        "id_andamento","id_processo","data","servidor","perfil",
-        "acao","observacao","setor_origem","setor_destino"
-    ])
+caixa = armazenamento.consultar("caixas", setor=setor_usuario)
+ids_caixa = sorted(caixa["id_processo"].tolist(), reverse=True)
 
-try:
-    arquivo_set = repo.get_contents(CAMINHO_SET, ref=BRANCH)
-    df_setores = pd.read_csv(StringIO(arquivo_set.decoded_content.decode("utf-8")))
-except:
-    df_setores = pd.DataFrame(columns=["id_setor","setor","ativo"])
+st.subheader(f"📌 Processos no setor {setor_usuario}")
+if not ids_caixa:
+    st.info("Nenhum processo no seu setor no momento.")
+    st.stop()
 
 # =========================================================
-# AJUSTE DE FUSO HORÁRIO PARA BRASÍLIA
-# =========================================================
-# Converte strings para datetime
-df_and["data"] = pd.to_datetime(df_and["data"], errors="coerce")
-
-# Preenche valores vazios com o horário atual de SP
-df_and["data"] = df_and["data"].fillna(pd.Timestamp.now(tz="America/Sao_Paulo"))
-
-# Ajusta fuso horário para Brasília
-# Se a coluna já for tz-aware, converte; se tz-naive, localiza
-if df_and["data"].dt.tz is not None:
-    df_and["data"] = df_and["data"].dt.tz_convert("America/Sao_Paulo")
-else:
-    df_and["data"] = df_and["data"].dt.tz_localize("America/Sao_Paulo")
+# TRAMITAÇÃO EM LOTE
+# =========================================================
+if st.toggle("Tramitar vários processos de uma vez"):
+    # Só as sugestões que casam com o texto digitado vão para o widget
+    ids_lote = sugestoes.escolher_varios(
+        "Processos a tramitar",
+        sugestoes.protocolos(),
+        "ids_lote",
+        entre=set(ids_caixa)
+    )
+    acao_lote = st.selectbox("Ação realizada", ACOES, key="acao_lote")
+    observacao_lote = st.text_area("Observações / Parecer", key="observacao_lote")
+    destino_lote = sugestoes.escolher("Setor de destino", sugestoes.setores(), "destino_lote")
+
+    if ids_lote and destino_lote and st.button(f"📤 Tramitar {len(ids_lote)} processo(s)"):
+        id_destino_lote = df_setores.loc[df_setores["setor"]==destino_lote,"id_setor"].values[0]
+        resultado = {}
+
+        def tramitar_lote(t):
+            # Só os que ainda estão no setor (outro usuário pode ter
+            # tramitado algum depois que a página foi aberta)
+            caixa_atual = t.ler("caixas")
+            no_setor = set(caixa_atual.loc[caixa_atual["setor"] == setor_usuario, "id_processo"])
+            ids = [i for i in ids_lote if i in no_setor]
+            resultado["ids"] = ids
+            if not ids:
+                return {}
+
+            primeiro = t.proximo_id("andamentos", len(ids))
+            andamentos = pd.DataFrame({
+                "id_andamento": range(primeiro, primeiro + len(ids)),
+                "id_processo": ids,
+                **datas.carimbo("data"),
+                "servidor": usuario,
+                "perfil": st.session_state.get("perfil","Servidor"),
+                "acao": acao_lote,
+                "observacao": observacao_lote,
+                "setor_origem": setor_usuario,
+                "setor_destino": destino_lote
+            })
+
+            # N andamentos e uma única atualização para os N processos
+            return {
+                "andamentos": Anexar(andamentos),
+                "processos": Atualizar("id_processo", ids, {
+                    "acao": acao_lote,
+                    "setor_atual": destino_lote,
+                    "id_setor_atual": id_destino_lote,
+                    "status": "Em Trâmite"
+                })
+            }
+
+        armazenamento.gravar(
+            tramitar_lote,
+            lambda: f"Tramitação em lote de {len(resultado['ids'])} processos para {destino_lote}"
+        )
 
+        ignorados = len(ids_lote) - len(resultado["ids"])
+        if resultado["ids"]:
+            st.success(f"✅ {len(resultado['ids'])} processo(s) enviados para {destino_lote}")
+        if ignorados:
+            st.warning(f"⚠️ {ignorados} processo(s) já não estavam no setor e não foram tramitados.")
 
-# =========================================================
-# PROCESSOS NO SETOR DO USUÁRIO
-# =========================================================
-ultimos_andamentos = (
-    df_and.sort_values("data")
-    .groupby("id_processo")
-    .tail(1)
-)
+    st.stop()
 
-df_proc["setor_atual"] = df_proc["id_processo"].map(
-    ultimos_andamentos.set_index("id_processo")["setor_destino"]
-)
+total_paginas = (len(ids_caixa) - 1) // PROCESSOS_POR_PAGINA + 1
+if total_paginas > 1:
+    pagina = st.number_input(
+        f"Página (de {total_paginas}) — {len(ids_caixa)} processos no setor",
+        min_value=1,
+        max_value=total_paginas,
+        value=1
+    )
+else:
+    pagina = 1
 
-minha_mesa = df_proc[
-    (df_proc["setor_atual"] == setor_usuario) &
-    (df_proc["status"] != "Arquivado")
-]
+inicio = (pagina - 1) * PROCESSOS_POR_PAGINA
+ids_pagina = ids_caixa[inicio:inicio + PROCESSOS_POR_PAGINA]
 
-st.subheader(f"📌 Processos no setor {setor_usuario}")
-if minha_mesa.empty:
-    st.info("Nenhum processo no seu setor no momento.")
-    st.stop()
+minha_mesa = armazenamento.consultar("processos", id_processo=ids_pagina)
+minha_mesa = minha_mesa.sort_values("id_processo", ascending=False)
 
 # =========================================================
 # SELEÇÃO DO PROCESSO
@@ -134,8 +142,8 @@ opcoes = dict(zip(minha_mesa["label"], minha_mesa["id_processo"]))
 label_selecionado = st.selectbox("Selecione o processo", options=opcoes.keys())
 id_processo = opcoes[label_selecionado]
 
-status_processo = df_proc.loc[
-    df_proc["id_processo"] == id_processo, "status"
+status_processo = minha_mesa.loc[
+    minha_mesa["id_processo"] == id_processo, "status"
 ].values[0]
 
 if status_processo == "Arquivado":
@@ -146,12 +154,15 @@ if status_processo == "Arquivado":
 # HISTÓRICO
 # =========================================================
 st.subheader("📜 Histórico do Processo")
-hist = df_and[df_and["id_processo"] == id_processo].copy()
+hist = armazenamento.consultar("andamentos", id_processo=id_processo).copy()
+hist["data"] = datas.converter(hist, "data")  # horário de Brasília
+
 
 if hist.empty:
     st.info("Nenhum andamento registrado para este processo.")
 else:
-    hist["Data/Hora"] = hist["data"].dt.strftime("%d/%m/%Y %H:%M")
+    hist = hist.sort_values("data")
+    hist["Data/Hora"] = datas.formatar(hist["data"])
     hist_exibir = hist[[
         "Data/Hora","acao","observacao","setor_origem","setor_destino"
     ]].rename(columns={
@@ -160,7 +171,7 @@ else:
         "setor_origem":"Setor de Origem",
         "setor_destino":"Setor de Destino"
     })
-    st.dataframe(hist_exibir.sort_values("Data/Hora"), use_container_width=True, hide_index=True)
+    st.dataframe(hist_exibir, use_container_width=True, hide_index=True)
 
 st.divider()
 
@@ -169,47 +180,43 @@ st.divider()
 # =========================================================
 st.subheader("✍️ Registrar Andamento")
 
-acao = st.selectbox(
-    "Ação realizada",
-    ["Análise","Parecer","Atualização","Encaminhamento","Conclusão"]
-)
+acao = st.selectbox("Ação realizada", ACOES)
 
 observacao = st.text_area("Observações / Parecer")
 
-setores_ativos = df_setores[df_setores["ativo"]==1]["setor"].tolist()
-setor_destino = st.selectbox("Setor de destino", options=setores_ativos)
-
-setor_origem = ultimos_andamentos.loc[
-    ultimos_andamentos["id_processo"]==id_processo,"setor_destino"
-].values[0]
-
-if st.button("📤 Registrar andamento"):
-
-    # Novo id_andamento
-    novo_and_id = 1 if df_and.empty else int(df_and["id_andamento"].max()) + 1
+setor_destino = sugestoes.escolher("Setor de destino", sugestoes.setores(), "setor_destino")
 
-    novo_andamento = {
-        "id_andamento": novo_and_id,
-        "id_processo": id_processo,
-        "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "servidor": usuario,
-        "perfil": st.session_state.get("perfil","Servidor"),
-        "acao": acao,
-        "observacao": observacao,
-        "setor_origem": setor_origem,
-        "setor_destino": setor_destino
-    }
+setor_origem = setor_usuario
 
-    df_and = pd.concat([df_and, pd.DataFrame([novo_andamento])], ignore_index=True)
-    salvar_csv_github(df_and, CAMINHO_AND, f"Andamento {novo_and_id} do processo {id_processo}")
+if setor_destino and st.button("📤 Registrar andamento"):
 
-    # Atualiza processos
     id_setor_destino = df_setores.loc[df_setores["setor"]==setor_destino,"id_setor"].values[0]
-    df_proc.loc[
-        df_proc["id_processo"]==id_processo,
-        ["acao","setor_atual","id_setor_atual","status"]
-    ] = [acao,setor_destino,id_setor_destino,"Em Trâmite"]
-    salvar_csv_github(df_proc, CAMINHO_PROC, f"Atualização do processo {id_processo}")
 
-    st.success(f"✅ Andamento registrado e enviado para {setor_destino}")
+    def registrar_tramitacao(t):
+        # Novo id_andamento (refeito sobre os dados atuais a cada tentativa)
+        novo_andamento = {
+            "id_andamento": t.proximo_id("andamentos"),
+            "id_processo": id_processo,
+            **datas.carimbo("data"),
+            "servidor": usuario,
+            "perfil": st.session_state.get("perfil","Servidor"),
+            "acao": acao,
+            "observacao": observacao,
+            "setor_origem": setor_origem,
+            "setor_destino": setor_destino
+        }
+
+        # Andamento e atualização do processo gravados juntos
+        return {
+            "andamentos": Anexar([novo_andamento]),
+            "processos": Atualizar("id_processo", [id_processo], {
+                "acao": acao,
+                "setor_atual": setor_destino,
+                "id_setor_atual": id_setor_destino,
+                "status": "Em Trâmite"
+            })
+        }
+
+    armazenamento.gravar(registrar_tramitacao, f"Andamento do processo {id_processo}")
 
+    st.success(f"✅ Andamento registrado e enviado para {setor_destino}")
@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
-import os
 from pdf_utils import gerar_pdf_processo
+from dossies_lote import gerar_dossies_zip
+import datas
+import fila_relatorios
+import busca
+import sugestoes
+from armazenamento import obter_armazenamento
 
 st.set_page_config(page_title="Consulta de Protocolos", layout="wide")
 
@@ -19,60 +24,74 @@ st.title("🔍 Consulta de Protocolos e Andamentos")
 # =====================================================
 # 📂 BASES
 # =====================================================
-df_proc = pd.read_csv("data/processos.csv")
-df_and = pd.read_csv("data/andamentos.csv")
-
-CAMINHO_DESTINACOES = "data/destinacoes.csv"
-df_dest = pd.read_csv(CAMINHO_DESTINACOES) if os.path.exists(CAMINHO_DESTINACOES) else pd.DataFrame()
+armazenamento = obter_armazenamento()
 
+df_proc = armazenamento.carregar("processos")
 df_proc["id_processo"] = pd.to_numeric(df_proc["id_processo"], errors="coerce")
-df_and["id_processo"] = pd.to_numeric(df_and["id_processo"], errors="coerce")
-
-# =====================================================
-# AJUSTE DE HORÁRIO PARA BRASÍLIA
-# =====================================================
-df_and["data"] = pd.to_datetime(df_and["data"], errors="coerce")
-
-# Preenche valores ausentes com horário atual de Brasília
-df_and["data"] = df_and["data"].fillna(pd.Timestamp.now(tz="America/Sao_Paulo"))
-
-# Se tz-naive, localiza; se já tz-aware, converte
-if df_and["data"].dt.tz is not None:
-    df_and["data"] = df_and["data"].dt.tz_convert("America/Sao_Paulo")
-else:
-    df_and["data"] = df_and["data"].dt.tz_localize("America/Sao_Paulo")
-
 df_proc = df_proc.dropna(subset=["id_processo"])
 
 # =====================================================
-# 🔎 FILTRO POR NÚMERO DE REFERÊNCIA
+# 🔎 BUSCA E FILTRO POR NÚMERO DE REFERÊNCIA
 # =====================================================
 st.subheader("🔎 Filtro")
 
-referencias = sorted(df_proc["numero_referencia"].dropna().unique().tolist())
-referencias.insert(0, "Todos")
+PROCESSOS_POR_PAGINA = 20
 
-ref_sel = st.selectbox(
+texto_busca = st.text_input(
+    "Buscar por palavras",
+    placeholder="Palavras do assunto, da descrição ou das observações (ex.: solic orcament)"
+)
+
+ref_sel = sugestoes.escolher(
     "Referência",
-    referencias
+    sugestoes.referencias(),
+    "ref_sel",
+    primeira_opcao="Todos"
 )
 
 df_filtrado = df_proc if ref_sel == "Todos" else df_proc[df_proc["numero_referencia"] == ref_sel]
 
+if texto_busca.strip():
+    # Ranqueado pelo índice; a página só recebe os ids da página atual
+    ids_encontrados, total = busca.obter_indice().buscar(
+        texto_busca,
+        entre_ids=None if ref_sel == "Todos" else df_filtrado["id_processo"].astype(int)
+    )
+else:
+    ids_encontrados = df_filtrado["id_processo"].astype(int).sort_values(ascending=False).tolist()
+    total = len(ids_encontrados)
+
+if not total:
+    st.info("Nenhum processo encontrado para este filtro.")
+    st.stop()
+
+total_paginas = max(1, -(-total // PROCESSOS_POR_PAGINA))
+pagina = st.number_input(
+    f"Página (de {total_paginas}) · {total} processo(s)",
+    min_value=1,
+    max_value=total_paginas,
+    value=1
+)
+ids_pagina = ids_encontrados[
+    (pagina - 1) * PROCESSOS_POR_PAGINA:pagina * PROCESSOS_POR_PAGINA
+]
+
 # =====================================================
 # 🔽 SELECTBOX (PROTOCOLO + ASSUNTO)
 # =====================================================
-df_filtrado["label"] = (
-    df_filtrado["numero_protocolo"].astype(str)
+df_pagina = (
+    df_proc.set_index("id_processo")
+    .reindex(ids_pagina)
+    .dropna(how="all")
+    .reset_index()
+)
+df_pagina["label"] = (
+    df_pagina["numero_protocolo"].astype(str)
     + " - "
-    + df_filtrado["assunto"].astype(str)
+    + df_pagina["assunto"].astype(str)
 )
 
-opcoes = dict(zip(df_filtrado["label"], df_filtrado["id_processo"].astype(int)))
-
-if not opcoes:
-    st.info("Nenhum processo encontrado para este filtro.")
-    st.stop()
+opcoes = dict(zip(df_pagina["label"], df_pagina["id_processo"].astype(int)))
 
 label_escolhido = st.selectbox(
     "Selecione o processo",
@@ -87,17 +106,16 @@ proc = df_proc[df_proc["id_processo"] == id_processo].iloc[0]
 # =====================================================
 st.subheader("📜 Histórico do Processo")
 
-hist = (
-    df_and[df_and["id_processo"] == id_processo]
-    .sort_values("data")
-    .copy()
-)
+# Só os andamentos do processo escolhido (consulta por índice)
+hist = armazenamento.consultar("andamentos", id_processo=id_processo)
+hist["data"] = datas.converter(hist, "data")  # horário de Brasília
+hist = hist.sort_values("data")
 
 if hist.empty:
     st.info("Nenhum andamento interno registrado.")
 else:
     # Ajuste de exibição com fuso horário
-    hist["Data/Hora"] = hist["data"].dt.tz_convert("America/Sao_Paulo").dt.strftime("%d/%m/%Y %H:%M")
+    hist["Data/Hora"] = datas.formatar(hist["data"])
     hist["Referência"] = proc["numero_referencia"]
     hist["Assunto"] = proc["assunto"]
 
@@ -133,14 +151,12 @@ else:
 st.divider()
 st.subheader("📤 Encaminhamento Externo")
 
-dest = df_dest[df_dest["id_processo"] == id_processo].copy()
+dest = armazenamento.consultar("destinacoes", id_processo=id_processo)
 
 if dest.empty:
     st.info("Este processo não possui encaminhamento externo.")
 else:
-    dest["Data/Hora"] = pd.to_datetime(
-        dest["data_saida"], errors="coerce", dayfirst=True
-    ).dt.tz_localize("America/Sao_Paulo", ambiguous='NaT').dt.strftime("%d/%m/%Y %H:%M")
+    dest["Data/Hora"] = datas.formatar(datas.converter(dest, "data_saida"))
 
     dest_exibir = dest[[
         "Data/Hora",
@@ -168,20 +184,75 @@ else:
 st.divider()
 st.subheader("📄 Gerar PDF")
 
-if st.button("Gerar PDF"):
-    nome = f"processo_{proc['numero_protocolo'].replace('/', '-')}.pdf"
+nome = f"processo_{proc['numero_protocolo'].replace('/', '-')}.pdf"
 
-    caminho = gerar_pdf_processo(
-        processo=proc,
+if st.button("Gerar PDF"):
+    # Gerado em segundo plano, em memória: nada é gravado em disco
+    st.session_state["pdf_processo"] = fila_relatorios.enviar(
+        gerar_pdf_processo,
+        processo=dict(proc),
         historico=hist,
-        nome_arquivo=nome,
-        usuario_emissor=usuario_logado
+        usuario_emissor=usuario_logado,
+        emitido_em=datas.agora().date()
+    )
+
+fila_relatorios.acompanhar("pdf_processo", nome)
+
+# =====================================================
+# 📦 DOSSIÊS EM LOTE
+# =====================================================
+st.divider()
+st.subheader("📦 Exportar dossiês em lote")
+
+anos = df_proc["numero_protocolo"].astype(str).str.split("/").str[-1]
+
+criterio = st.radio(
+    "Exportar por",
+    ("Número de referência", "Ano"),
+    horizontal=True
+)
+
+if criterio == "Ano":
+    valor_lote = st.selectbox("Ano", sorted(anos.unique(), reverse=True))
+    df_lote = df_proc[anos == valor_lote]
+else:
+    valor_lote = sugestoes.escolher(
+        "Número de referência", sugestoes.referencias(), "ref_lote"
     )
+    df_lote = df_proc[df_proc["numero_referencia"] == valor_lote]
+
+st.caption(f"{len(df_lote)} processo(s) no lote.")
+
+if st.button("📦 Gerar ZIP dos dossiês", disabled=df_lote.empty):
+    ids_lote = df_lote["id_processo"].astype(int).tolist()
+
+    # Andamentos e destinações de todos os processos, numa consulta cada
+    hist_lote = armazenamento.consultar("andamentos", id_processo=ids_lote)
+    hist_lote["data"] = datas.converter(hist_lote, "data")
+    hist_lote = hist_lote.sort_values("data")
 
-    with open(caminho, "rb") as f:
-        st.download_button(
-            "⬇️ Baixar PDF",
-            data=f,
-            file_name=nome,
-            mime="application/pdf"
-        )
+    dest_lote = armazenamento.consultar("destinacoes", id_processo=ids_lote)
+
+    st.session_state["zip_dossies_nome"] = (
+        f"dossies_{str(valor_lote).replace('/', '-').replace(' ', '_')}.zip"
+    )
+    st.session_state["zip_dossies"] = fila_relatorios.enviar(
+        gerar_dossies_zip,
+        processos=df_lote,
+        historico=hist_lote,
+        destinacoes=dest_lote,
+        usuario_emissor=usuario_logado,
+        emitido_em=datas.agora().date()
+    )
+
+lote = fila_relatorios.acompanhar(
+    "zip_dossies",
+    st.session_state.get("zip_dossies_nome", "dossies.zip"),
+    "⬇️ Baixar ZIP",
+    mime="application/zip"
+)
+if lote is not None:
+    texto = f"{lote.quantidade} PDF(s) · {lote.por_segundo:.1f} PDFs/s"
+    if lote.retomados:
+        texto += f" · {lote.retomados} retomado(s) de uma exportação interrompida"
+    st.caption(texto)
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 from pdf4_utils import gerar_pdf_4
-import pytz
-from io import StringIO
-from github import Github
+import datas
+import fila_relatorios
+import produtividade
+import snapshots
+from armazenamento import obter_armazenamento
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -29,65 +30,111 @@ if st.session_state.get("perfil") not in ["Secretario", "Administrador"]:
 st.title("📊 Gestão de Servidores")
 
 # =====================================================
-# GITHUB CONFIG
+# CARREGAMENTO DAS BASES
 # =====================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
-
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
+# Andamentos vêm do snapshot colunar: cada leitura abre só as
+# colunas usadas e pula os blocos de outras datas
+armazenamento = obter_armazenamento()
 
-def carregar_csv_github(caminho, columns=None):
-    try:
-        arquivo = repo.get_contents(caminho, ref=BRANCH)
-        conteudo = arquivo.decoded_content.decode("utf-8")
-        df = pd.read_csv(StringIO(conteudo))
-        if columns:
-            for col in columns:
-                if col not in df.columns:
-                    df[col] = None
-        return df
-    except:
-        return pd.DataFrame(columns=columns if columns else [])
+COLUNAS_HISTORICO = [
+    "id_processo",
+    "data",
+    "data_ms",
+    "acao",
+    "observacao",
+    "setor_origem",
+    "setor_destino"
+]
 
 # =====================================================
-# CAMINHOS
+# VISÃO GERAL (TODOS OS SERVIDORES E SETORES)
 # =====================================================
-CAMINHO_PROC = "data/processos.csv"
-CAMINHO_AND = "data/andamentos.csv"
+st.subheader("📈 Visão Geral da SEPLAN")
 
-# =====================================================
-# CARREGAMENTO DAS BASES
-# =====================================================
-df_proc = carregar_csv_github(CAMINHO_PROC, columns=[
-    "id_processo","numero_protocolo","data_entrada","numero_referencia",
-    "setor_origem","assunto","descricao","setor_atual","status","id_setor_atual"
-])
-df_and = carregar_csv_github(CAMINHO_AND, columns=[
-    "id_andamento","id_processo","data","servidor","perfil",
-    "acao","observacao","setor_origem","setor_destino"
-])
+periodo = st.radio("Agrupar ações por", ("Dia", "Semana"), horizontal=True)
+frequencia, exibidos = ("D", 30) if periodo == "Dia" else ("W-MON", 26)
+geral = produtividade.indicadores(frequencia)
 
-# =====================================================
-# AJUSTE DE HORÁRIO
-# =====================================================
-fuso = pytz.timezone("America/Sao_Paulo")
-df_and["data"] = pd.to_datetime(df_and["data"], errors="coerce")
-# Apenas converte se não for tz-aware
-if df_and["data"].dt.tz is None:
-    df_and["data"] = df_and["data"].dt.tz_localize('UTC').dt.tz_convert(fuso)
+aba_acoes, aba_tempo, aba_fila = st.tabs(
+    ["Ações por servidor", "Tempo no setor", "Fila e idade"]
+)
+
+with aba_acoes:
+    acoes = geral["acoes"]
+    if acoes.empty:
+        st.info("Nenhum andamento registrado.")
+    else:
+        ultimos = acoes.tail(exibidos)
+        ultimos.index = ultimos.index.strftime("%d/%m/%Y")
+        st.caption(f"Últimos {len(ultimos)} período(s).")
+        st.bar_chart(ultimos.rename_axis(periodo))
+        st.dataframe(
+            pd.DataFrame({
+                "Ações no período exibido": ultimos.sum(),
+                f"Média por {periodo.lower()}": ultimos.mean().round(1),
+                "Total no histórico": acoes.sum()
+            }).rename_axis("Servidor").sort_values(
+                "Ações no período exibido", ascending=False
+            ),
+            use_container_width=True
+        )
 
-df_proc["data_entrada"] = pd.to_datetime(df_proc["data_entrada"], errors="coerce")
-if df_proc["data_entrada"].dt.tz is None:
-    df_proc["data_entrada"] = df_proc["data_entrada"].dt.tz_localize('UTC').dt.tz_convert(fuso)
+with aba_tempo:
+    tempo = geral["tempo_no_setor"]
+    if tempo.empty:
+        st.info("Nenhuma permanência encerrada.")
+    else:
+        st.caption(
+            "Dias entre a chegada do processo ao setor e o andamento "
+            "seguinte. p50 é a mediana; p90, o tempo que 90% das "
+            "permanências não passaram."
+        )
+        st.bar_chart(
+            tempo[["p50_dias", "p90_dias"]].rename(columns={
+                "p50_dias": "p50",
+                "p90_dias": "p90"
+            }).rename_axis("Setor"),
+            stack=False
+        )
+
+        colunas_tempo = {
+            "permanencias": "Permanências",
+            "media_dias": "Média",
+            "p50_dias": "p50",
+            "p75_dias": "p75",
+            "p90_dias": "p90",
+            "p95_dias": "p95"
+        }
+        st.markdown("**Por setor**")
+        st.dataframe(
+            tempo.round(1).rename_axis("Setor").rename(columns=colunas_tempo),
+            use_container_width=True
+        )
+        st.markdown("**Por ação que levou ao setor**")
+        st.dataframe(
+            geral["tempo_por_acao"].round(1).rename_axis("Ação").rename(columns=colunas_tempo),
+            use_container_width=True
+        )
+
+with aba_fila:
+    idade = geral["idade"]
+    if idade.empty:
+        st.info("Nenhum processo em trâmite.")
+    else:
+        st.bar_chart(idade.rename_axis("Setor"))
+        st.dataframe(
+            idade.assign(Total=geral["fila"]).rename_axis("Setor").sort_values(
+                "Total", ascending=False
+            ),
+            use_container_width=True
+        )
 
 # =====================================================
 # SERVIDORES (BASEADOS EM ANDAMENTOS)
 # =====================================================
-df_and["servidor"] = df_and["servidor"].astype(str)
-servidores_disponiveis = df_and["servidor"].dropna().unique()
-servidores_disponiveis.sort()
+servidores_disponiveis = sorted(
+    snapshots.ler("andamentos", ["servidor"])["servidor"].dropna().unique()
+)
 
 if len(servidores_disponiveis) == 0:
     st.warning("Nenhum servidor cadastrado para consulta.")
@@ -96,8 +143,10 @@ if len(servidores_disponiveis) == 0:
 st.subheader("🔍 Consulta por Servidor")
 servidor_sel = st.selectbox("Selecione o servidor", servidores_disponiveis)
 
-# Histórico do servidor selecionado
-hist_servidor = df_and[df_and["servidor"] == servidor_sel].copy()
+# Período de atuação do servidor (só a coluna de datas)
+momentos = datas.de_ms(
+    snapshots.ler("andamentos", ["data_ms"], servidor=servidor_sel)["data_ms"]
+)
 
 # =====================================================
 # FILTRO POR PERÍODO
@@ -107,26 +156,37 @@ col1, col2 = st.columns(2)
 
 data_inicio = col1.date_input(
     "Data de Início",
-    value=hist_servidor["data"].min().date() if not hist_servidor.empty else datetime.now().date(),
+    value=momentos.min().date() if momentos.notna().any() else datas.agora().date(),
     format="DD/MM/YYYY"
 )
 
 data_fim = col2.date_input(
     "Data Final",
-    value=hist_servidor["data"].max().date() if not hist_servidor.empty else datetime.now().date(),
+    value=momentos.max().date() if momentos.notna().any() else datas.agora().date(),
     format="DD/MM/YYYY"
 )
 
-hist_servidor = hist_servidor[
-    (hist_servidor["data"].dt.date >= data_inicio) &
-    (hist_servidor["data"].dt.date <= data_fim)
-]
+hist_servidor = snapshots.ler(
+    "andamentos",
+    COLUNAS_HISTORICO,
+    entre={"data_ms": (
+        datas.para_ms(data_inicio),
+        datas.para_ms(pd.Timestamp(data_fim) + pd.Timedelta(days=1)) - 1
+    )},
+    servidor=servidor_sel
+)
+hist_servidor["data"] = datas.converter(hist_servidor, "data")
 
 # =====================================================
 # VINCULAR STATUS DO PROCESSO
 # =====================================================
+status_processos = armazenamento.consultar(
+    "processos", id_processo=hist_servidor["id_processo"].dropna().unique().tolist()
+)[["id_processo", "status"]]
+status_processos["id_processo"] = status_processos["id_processo"].astype("Int64")
+
 hist_servidor = hist_servidor.merge(
-    df_proc[["id_processo", "status"]],
+    status_processos,
     on="id_processo",
     how="left"
 )
@@ -148,10 +208,11 @@ modo = "por_momento" if "momento" in tipo_relatorio else "por_processo"
 # EXIBIÇÃO
 # =====================================================
 hist_display = hist_servidor.copy()
-hist_display["data"] = hist_display["data"].dt.strftime("%d/%m/%Y %H:%M")
+hist_display = hist_display.sort_values("data")
+hist_display["data"] = datas.formatar(hist_display["data"])
 
 st.dataframe(
-    hist_display.sort_values("data")[
+    hist_display[
         [
             "id_processo",
             "data",
@@ -181,19 +242,19 @@ nome_pdf = f"historico_{servidor_sel}.pdf"
 logo_path = "logo.png"
 
 if st.button("📄 Gerar PDF"):
-    caminho_pdf = gerar_pdf_4(
+    st.session_state["pdf_gestao"] = fila_relatorios.enviar(
+        gerar_pdf_4,
         servidor=servidor_sel,
         historico=hist_servidor,
-        nome_arquivo=nome_pdf,
         tipo_relatorio=modo,
         logo_path=logo_path,
-        usuario_emissor=st.session_state["usuario"]
+        usuario_emissor=st.session_state["usuario"],
+        emitido_em=datas.agora().floor("min")
     )
 
-    with open(caminho_pdf, "rb") as f:
-        st.download_button(
-            label="⬇️ Baixar PDF",
-            data=f,
-            file_name=nome_pdf,
-            mime="application/pdf"
-        )
+relatorio = fila_relatorios.acompanhar("pdf_gestao", nome_pdf)
+if relatorio is not None:
+    st.caption(
+        f"{relatorio.linhas} movimentações · {relatorio.paginas} página(s) · "
+        f"gerado em {relatorio.segundos:.1f} s"
+    )
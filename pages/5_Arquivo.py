@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-from io import StringIO
-import tempfile
-from pdf6_utils import gerar_pdf_remessa_multi_setor
-from github import Github
+import datas
+import fila_relatorios
+import sugestoes
+from pdf6_utils import gerar_pdf_remessa
+from armazenamento import Anexar, Atualizar, obter_armazenamento
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -26,63 +26,13 @@ usuario_logado = st.session_state["usuario"]
 perfil_logado = st.session_state.get("perfil", "Servidor")
 setor_logado = st.session_state.get("setor", "Protocolo")
 
-# =====================================================
-# GITHUB CONFIG
-# =====================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
-
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
-
-def salvar_csv_github(df, caminho, mensagem):
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    try:
-        arquivo = repo.get_contents(caminho, ref=BRANCH)
-        repo.update_file(
-            path=arquivo.path,
-            message=mensagem,
-            content=csv_bytes,
-            sha=arquivo.sha,
-            branch=BRANCH
-        )
-    except:
-        repo.create_file(
-            path=caminho,
-            message=mensagem,
-            content=csv_bytes,
-            branch=BRANCH
-        )
-
-def carregar_csv_github(caminho, colunas):
-    try:
-        arquivo = repo.get_contents(caminho, ref=BRANCH)
-        conteudo = arquivo.decoded_content.decode("utf-8")
-        df = pd.read_csv(StringIO(conteudo))
-    except Exception:
-        st.warning(f"⚠️ Não conseguiu ler do GitHub: {caminho}, criando vazio.")
-        df = pd.DataFrame(columns=colunas)
-    return df
-
-# =====================================================
-# CAMINHOS
-# =====================================================
-CAMINHO_PROC = "data/processos.csv"
-CAMINHO_DESTINACOES = "data/destinacoes.csv"
-CAMINHO_SETOR_DESTINO = "data/setores_destinos.csv"
-
 # =====================================================
 # CARREGAR DADOS
 # =====================================================
-df_proc = carregar_csv_github(CAMINHO_PROC, [
-    "id_processo","numero_protocolo","data_entrada","numero_referencia",
-    "setor_origem","assunto","descricao","setor_atual","status","id_setor_atual","acao"
-])
-df_dest = carregar_csv_github(CAMINHO_DESTINACOES, [
-    "id_destinacao","id_processo","data_saida","protocolista","destino","observacao"
-])
-df_setores_destino = carregar_csv_github(CAMINHO_SETOR_DESTINO, ["setor_destino","ativo"])
+armazenamento = obter_armazenamento()
+
+df_proc = armazenamento.carregar("processos")
+df_dest = armazenamento.carregar("destinacoes")
 
 # =====================================================
 # PROCESSOS JÁ DESTINADOS
@@ -109,6 +59,17 @@ if not df_dest.empty:
 # =====================================================
 # REMESSA EM PDF
 # =====================================================
+def imprimir_remessa(id_remessa):
+    """
+    PDF a partir da remessa gravada. A mesma remessa dá as mesmas
+    entradas, então reimprimir sai do cache da fila de relatórios.
+    """
+    remessa = armazenamento.consultar("remessas", id_remessa=id_remessa).iloc[0].to_dict()
+    itens = armazenamento.consultar("remessa_itens", id_remessa=id_remessa).sort_values("id_item")
+    st.session_state["pdf_remessa_nome"] = f"remessa_{id_remessa}.pdf"
+    st.session_state["pdf_remessa"] = fila_relatorios.enviar(gerar_pdf_remessa, remessa=remessa, itens=itens)
+
+
 st.divider()
 st.markdown("## 📄 Remessa de Envio de Processos")
 
@@ -120,18 +81,72 @@ else:
         on="id_processo", how="inner"
     )
     df_remessa["label"] = df_remessa["numero_protocolo"].astype(str) + " - " + df_remessa["assunto"].astype(str) + " (" + df_remessa["destino"].astype(str) + ")"
-    ids_sel = st.multiselect(
+    rotulos_proc = dict(zip(df_remessa["id_processo"], df_remessa["label"]))
+    ids_sel = sugestoes.escolher_varios(
         "Selecione os processos para remessa",
-        df_remessa["id_processo"].tolist(),
-        format_func=lambda x: df_remessa.loc[df_remessa["id_processo"]==x,"label"].values[0]
+        sugestoes.protocolos(),
+        "ids_remessa",
+        entre=set(rotulos_proc),
+        format_func=rotulos_proc.get
     )
     if ids_sel and st.button("📄 Gerar Remessa em PDF"):
         df_sel = df_remessa[df_remessa["id_processo"].isin(ids_sel)]
-        processos_pdf = df_sel[["destino","numero_protocolo","numero_referencia","assunto"]].rename(columns={"destino":"setor_destino"}).to_dict("records")
-        caminho_pdf = tempfile.gettempdir() + "/remessa_envio_processos.pdf"
-        gerar_pdf_remessa_multi_setor(processos_pdf, caminho_pdf)
-        with open(caminho_pdf,"rb") as f:
-            st.download_button("⬇️ Baixar Remessa de Envio", f, file_name="remessa_envio_processos.pdf", mime="application/pdf")
+        registro = {}
+
+        def registrar_remessa(t):
+            id_remessa = t.proximo_id("remessas")
+            primeiro_item = t.proximo_id("remessa_itens", len(df_sel))
+            registro["id_remessa"] = id_remessa
+
+            itens = pd.DataFrame({
+                "id_item": range(primeiro_item, primeiro_item + len(df_sel)),
+                "id_remessa": id_remessa,
+                "numero_processo": df_sel["numero_protocolo"].values,
+                "setor_destino": df_sel["destino"].values,
+                "id_processo": df_sel["id_processo"].values,
+                "numero_referencia": df_sel["numero_referencia"].values,
+                "assunto": df_sel["assunto"].values
+            })
+
+            return {
+                "remessas": Anexar([{
+                    "id_remessa": id_remessa,
+                    **datas.carimbo("data"),
+                    "usuario": usuario_logado,
+                    "quantidade": len(df_sel)
+                }]),
+                "remessa_itens": Anexar(itens)
+            }
+
+        armazenamento.gravar(
+            registrar_remessa,
+            lambda: f"Registrar remessa {registro['id_remessa']}"
+        )
+        imprimir_remessa(registro["id_remessa"])
+
+    # Remessas já gravadas
+    df_remessas = armazenamento.carregar("remessas")
+    if not df_remessas.empty:
+        df_remessas = df_remessas.sort_values("id_remessa", ascending=False)
+        df_remessas["label"] = (
+            "Nº " + df_remessas["id_remessa"].astype(str)
+            + " — " + datas.formatar_coluna(df_remessas, "data")
+            + " — " + df_remessas["quantidade"].astype(str) + " processo(s)"
+        )
+        rotulos_remessa = dict(zip(df_remessas["id_remessa"], df_remessas["label"]))
+        id_reimprimir = st.selectbox(
+            "Reimprimir remessa",
+            list(rotulos_remessa),
+            format_func=rotulos_remessa.get
+        )
+        if st.button("🖨️ Reimprimir"):
+            imprimir_remessa(id_reimprimir)
+
+    fila_relatorios.acompanhar(
+        "pdf_remessa",
+        st.session_state.get("pdf_remessa_nome", "remessa_envio_processos.pdf"),
+        "⬇️ Baixar Remessa de Envio"
+    )
 
 # =====================================================
 # DESTINAÇÃO EXTERNA
@@ -149,21 +164,40 @@ df_disponiveis = df_proc[
 if df_disponiveis.empty:
     st.info("📭 Não há processos disponíveis para destinação externa.")
 else:
-    id_proc_sel = st.selectbox(
+    id_proc_sel = sugestoes.escolher(
         "Selecione o Processo",
-        df_disponiveis["id_processo"],
-        format_func=lambda x: f"{df_disponiveis.loc[df_disponiveis['id_processo']==x,'numero_protocolo'].values[0]} - {df_disponiveis.loc[df_disponiveis['id_processo']==x,'assunto'].values[0]}"
+        sugestoes.protocolos(),
+        "proc_destinar",
+        entre=set(df_disponiveis["id_processo"])
+    )
+    destino_sel = sugestoes.escolher(
+        "Setor de Destino", sugestoes.setores_destino(), "destino_sel"
     )
-    destinos_ativos = df_setores_destino[df_setores_destino["ativo"]==1]
-    destino_sel = st.selectbox("Setor de Destino", destinos_ativos["setor_destino"])
     observacao = st.text_area("Observação (opcional)")
-    if st.button("📦 Registrar Tramitação"):
-        novo_id = 1 if df_dest.empty else int(df_dest["id_destinacao"].max()) + 1
-        df_dest.loc[len(df_dest)] = [novo_id, id_proc_sel, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), usuario_logado, destino_sel, observacao]
-        salvar_csv_github(df_dest, CAMINHO_DESTINACOES, f"Registrar destinação externa do processo {id_proc_sel}")
-        df_proc.loc[df_proc["id_processo"]==id_proc_sel, ["status","acao"]] = ["Arquivado","Arquivado / Destinado"]
-        salvar_csv_github(df_proc, CAMINHO_PROC, f"Arquivar e destinar processo {id_proc_sel}")
-        st.success(f"✅ Processo arquivado e encaminhado ({novo_id})")
+    if id_proc_sel and destino_sel and st.button("📦 Registrar Tramitação"):
+        registro = {}
+
+        def destinar(t):
+            novo_id = t.proximo_id("destinacoes")
+            registro["id_destinacao"] = novo_id
+
+            return {
+                "destinacoes": Anexar([{
+                    "id_destinacao": novo_id,
+                    "id_processo": id_proc_sel,
+                    **datas.carimbo("data_saida"),
+                    "protocolista": usuario_logado,
+                    "destino": destino_sel,
+                    "observacao": observacao
+                }]),
+                "processos": Atualizar("id_processo", [id_proc_sel], {
+                    "status": "Arquivado",
+                    "acao": "Arquivado / Destinado"
+                })
+            }
+
+        armazenamento.gravar(destinar, f"Arquivar e destinar processo {id_proc_sel}")
+        st.success(f"✅ Processo arquivado e encaminhado ({registro['id_destinacao']})")
 
 # =====================================================
 # DESARQUIVAMENTO
@@ -174,12 +208,19 @@ df_arquivados = df_proc[df_proc["status"]=="Arquivado"]
 if df_arquivados.empty:
     st.info("📂 Não há processos arquivados disponíveis para desarquivamento.")
 else:
-    df_arquivados["label"] = df_arquivados["numero_protocolo"] + " - " + df_arquivados["assunto"]
-    mapa_proc = dict(zip(df_arquivados["label"], df_arquivados["id_processo"]))
-    proc_label = st.selectbox("Selecione o processo arquivado", options=mapa_proc.keys(), key="desarquivar_proc")
-    id_proc_des = mapa_proc[proc_label]
+    id_proc_des = sugestoes.escolher(
+        "Selecione o processo arquivado",
+        sugestoes.protocolos(),
+        "desarquivar_proc",
+        entre=set(df_arquivados["id_processo"])
+    )
     observacao_des = st.text_area("Observação do desarquivamento", value="Processo desarquivado para retomada da tramitação.")
-    if st.button("♻️ Desarquivar Processo"):
-        df_proc.loc[df_proc["id_processo"]==id_proc_des, ["status","acao"]] = ["Em Trâmite","Desarquivado"]
-        salvar_csv_github(df_proc, CAMINHO_PROC, f"Desarquivar processo {id_proc_des}")
+    if id_proc_des and st.button("♻️ Desarquivar Processo"):
+        armazenamento.gravar(
+            lambda t: {"processos": Atualizar("id_processo", [id_proc_des], {
+                "status": "Em Trâmite",
+                "acao": "Desarquivado"
+            })},
+            f"Desarquivar processo {id_proc_des}"
+        )
         st.success("✅ Processo desarquivado com sucesso e liberado para tramitação.")
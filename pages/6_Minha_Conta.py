@@ -1,7 +1,5 @@
 import streamlit as st
-import pandas as pd
-import os
-from github import Github
+from armazenamento import Atualizar, obter_armazenamento
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -19,51 +17,19 @@ st.title("⚙️ Minha Conta")
 st.subheader("Alterar senha")
 
 USUARIO_LOGADO = st.session_state["usuario"]
-CAMINHO_USUARIOS = "data/usuarios.csv"
-
-# =====================================================
-# GITHUB CONFIG (MESMO PADRÃO DO 7_)
-# =====================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
-
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
-
-def salvar_csv_github(df, caminho_github, mensagem_commit):
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    try:
-        arquivo = repo.get_contents(caminho_github, ref=BRANCH)
-        repo.update_file(
-            path=arquivo.path,
-            message=mensagem_commit,
-            content=csv_bytes,
-            sha=arquivo.sha,
-            branch=BRANCH
-        )
-    except:
-        repo.create_file(
-            path=caminho_github,
-            message=mensagem_commit,
-            content=csv_bytes,
-            branch=BRANCH
-        )
 
 # =====================================================
 # BASE DE USUÁRIOS
 # =====================================================
-if not os.path.exists(CAMINHO_USUARIOS):
-    st.error("Base de usuários não encontrada.")
-    st.stop()
+armazenamento = obter_armazenamento()
 
-df_users = pd.read_csv(CAMINHO_USUARIOS)
+df_users = armazenamento.consultar("usuarios", usuario=USUARIO_LOGADO)
 
-if USUARIO_LOGADO not in df_users["usuario"].values:
+if df_users.empty:
     st.error("Usuário não encontrado na base.")
     st.stop()
 
-dados_usuario = df_users[df_users["usuario"] == USUARIO_LOGADO].iloc[0]
+dados_usuario = df_users.iloc[0]
 
 # =====================================================
 # INFORMAÇÕES DO USUÁRIO
@@ -107,18 +73,11 @@ if st.button("Alterar senha"):
         st.warning("A nova senha não pode ser igual à senha atual.")
         st.stop()
 
-    # Atualiza senha no DataFrame
-    df_users.loc[
-        df_users["usuario"] == USUARIO_LOGADO, "senha"
-    ] = nova_senha
-
-    # Salva localmente (necessário para o Streamlit)
-    df_users.to_csv(CAMINHO_USUARIOS, index=False)
-
-    # Salva no GitHub
-    salvar_csv_github(
-        df_users,
-        CAMINHO_USUARIOS,
+    # Altera só a senha deste usuário, sobre a versão atual da base
+    armazenamento.gravar(
+        lambda t: {"usuarios": Atualizar("usuario", [USUARIO_LOGADO], {
+            "senha": nova_senha
+        })},
         f"Atualização de senha do usuário {USUARIO_LOGADO}"
     )
 
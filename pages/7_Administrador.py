@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-import os
-from github import Github
+import contadores
+from armazenamento import Anexar, Atualizar, Remover, obter_armazenamento
+from github_utils import estatisticas_concorrencia
 
 # =====================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -57,74 +58,20 @@ ROTULOS_DESTINOS = {
     "ativo": "Ativo"
 }
 
-# =====================================================
-# GITHUB CONFIG
-# =====================================================
-GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-REPO_NAME = st.secrets["REPO_NAME"]
-BRANCH = "main"
-
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
-
-def salvar_csv_github(df, caminho_github, mensagem_commit):
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    try:
-        arquivo = repo.get_contents(caminho_github, ref=BRANCH)
-        repo.update_file(
-            path=arquivo.path,
-            message=mensagem_commit,
-            content=csv_bytes,
-            sha=arquivo.sha,
-            branch=BRANCH
-        )
-    except:
-        repo.create_file(
-            path=caminho_github,
-            message=mensagem_commit,
-            content=csv_bytes,
-            branch=BRANCH
-        )
-
-# =====================================================
-# CAMINHOS
-# =====================================================
-CAMINHO_USUARIOS = "data/usuarios.csv"
-CAMINHO_SETORES = "data/setores.csv"
-CAMINHO_SETORES_DESTINO = "data/setores_destinos.csv"
-
-# =====================================================
-# FUNÇÃO BASE
-# =====================================================
-def carregar_base(caminho, colunas):
-    if not os.path.exists(caminho):
-        df = pd.DataFrame(columns=colunas)
-        df.to_csv(caminho, index=False)
-    return pd.read_csv(caminho)
-
 # =====================================================
 # BASES
 # =====================================================
-df_users = carregar_base(
-    CAMINHO_USUARIOS,
-    ["usuario", "nome_completo", "senha", "perfil", "setor"]
-)
+armazenamento = obter_armazenamento()
 
-df_setores = carregar_base(
-    CAMINHO_SETORES,
-    ["id_setor", "setor", "ativo"]
-)
-
-df_setores_destino = carregar_base(
-    CAMINHO_SETORES_DESTINO,
-    ["id_setor", "setor_destino", "secretaria", "ativo"]
-)
+df_users = armazenamento.carregar("usuarios")
+df_setores = armazenamento.carregar("setores")
+df_setores_destino = armazenamento.carregar("setores_destinos")
 
 # =====================================================
 # ABAS
 # =====================================================
-aba_usuarios, aba_setores, aba_destinos = st.tabs(
-    ["👤 Usuários", "🏢 Setores Internos", "📦 Setores de Destino"]
+aba_usuarios, aba_setores, aba_destinos, aba_gravacoes = st.tabs(
+    ["👤 Usuários", "🏢 Setores Internos", "📦 Setores de Destino", "📈 Gravações"]
 )
 
 # =====================================================
@@ -154,8 +101,16 @@ with aba_usuarios:
         if usuario in df_users["usuario"].values:
             st.error("Usuário já existe.")
         else:
-            df_users.loc[len(df_users)] = [usuario, nome, senha, perfil, setor]
-            salvar_csv_github(df_users, CAMINHO_USUARIOS, f"Cadastro usuário {usuario}")
+            armazenamento.gravar(
+                lambda t: {"usuarios": Anexar([{
+                    "usuario": usuario,
+                    "nome_completo": nome,
+                    "senha": senha,
+                    "perfil": perfil,
+                    "setor": setor
+                }])},
+                f"Cadastro usuário {usuario}"
+            )
             st.session_state.msg_usuario = "Usuário cadastrado com sucesso."
             st.rerun()
 
@@ -164,8 +119,10 @@ with aba_usuarios:
 
     usuario_exc = st.selectbox("Usuário", df_users["usuario"], key="exc_usuario")
     if st.button("Excluir usuário", key="btn_exc_usuario"):
-        df_users = df_users[df_users["usuario"] != usuario_exc]
-        salvar_csv_github(df_users, CAMINHO_USUARIOS, f"Exclusão usuário {usuario_exc}")
+        armazenamento.gravar(
+            lambda t: {"usuarios": Remover("usuario", [usuario_exc])},
+            f"Exclusão usuário {usuario_exc}"
+        )
         st.session_state.msg_usuario = "Usuário excluído com sucesso."
         st.rerun()
 
@@ -191,9 +148,14 @@ with aba_setores:
         if novo_setor.lower() in df_setores["setor"].str.lower().values:
             st.error("Setor já existe.")
         else:
-            novo_id = df_setores["id_setor"].max() + 1 if not df_setores.empty else 1
-            df_setores.loc[len(df_setores)] = [novo_id, novo_setor, 1]
-            salvar_csv_github(df_setores, CAMINHO_SETORES, f"Cadastro setor {novo_setor}")
+            armazenamento.gravar(
+                lambda t: {"setores": Anexar([{
+                    "id_setor": t.proximo_id("setores"),
+                    "setor": novo_setor,
+                    "ativo": 1
+                }])},
+                f"Cadastro setor {novo_setor}"
+            )
             st.session_state.msg_setor = "Setor interno cadastrado."
             st.rerun()
 
@@ -203,8 +165,12 @@ with aba_setores:
     setor_sel = st.selectbox("Setor", df_setores["setor"], key="alt_setor")
     novo_status = st.selectbox("Nova situação", ["Ativo", "Inativo"], key="alt_status_setor")
     if st.button("Atualizar setor", key="btn_alt_setor"):
-        df_setores.loc[df_setores["setor"] == setor_sel, "ativo"] = 1 if novo_status == "Ativo" else 0
-        salvar_csv_github(df_setores, CAMINHO_SETORES, f"Atualização setor {setor_sel}")
+        armazenamento.gravar(
+            lambda t: {"setores": Atualizar("setor", [setor_sel], {
+                "ativo": 1 if novo_status == "Ativo" else 0
+            })},
+            f"Atualização setor {setor_sel}"
+        )
         st.session_state.msg_setor = "Situação do setor atualizada."
         st.rerun()
 
@@ -213,8 +179,10 @@ with aba_setores:
 
     setor_exc = st.selectbox("Setor para excluir", df_setores["setor"], key="exc_setor")
     if st.button("Excluir setor interno", key="btn_exc_setor"):
-        df_setores = df_setores[df_setores["setor"] != setor_exc]
-        salvar_csv_github(df_setores, CAMINHO_SETORES, f"Exclusão setor {setor_exc}")
+        armazenamento.gravar(
+            lambda t: {"setores": Remover("setor", [setor_exc])},
+            f"Exclusão setor {setor_exc}"
+        )
         st.session_state.msg_setor = "Setor interno excluído."
         st.rerun()
 
@@ -247,11 +215,15 @@ with aba_destinos:
         elif novo_destino.lower() in df_setores_destino["setor_destino"].str.lower().values:
             st.error("Destino já existe.")
         else:
-            novo_id = df_setores_destino["id_setor"].max() + 1 if not df_setores_destino.empty else 1
-            df_setores_destino.loc[len(df_setores_destino)] = [
-                novo_id, novo_destino, secretaria, 1
-            ]
-            salvar_csv_github(df_setores_destino, CAMINHO_SETORES_DESTINO, f"Cadastro destino {novo_destino}")
+            armazenamento.gravar(
+                lambda t: {"setores_destinos": Anexar([{
+                    "id_setor": t.proximo_id("setores_destinos"),
+                    "setor_destino": novo_destino,
+                    "secretaria": secretaria,
+                    "ativo": 1
+                }])},
+                f"Cadastro destino {novo_destino}"
+            )
             st.session_state.msg_destino = "Setor de destino cadastrado com sucesso."
             st.rerun()
 
@@ -262,10 +234,12 @@ with aba_destinos:
     novo_status_dest = st.selectbox("Nova situação", ["Ativo", "Inativo"], key="alt_status_destino")
 
     if st.button("Atualizar destino", key="btn_alt_destino"):
-        df_setores_destino.loc[
-            df_setores_destino["setor_destino"] == destino_sel, "ativo"
-        ] = 1 if novo_status_dest == "Ativo" else 0
-        salvar_csv_github(df_setores_destino, CAMINHO_SETORES_DESTINO, f"Atualização destino {destino_sel}")
+        armazenamento.gravar(
+            lambda t: {"setores_destinos": Atualizar("setor_destino", [destino_sel], {
+                "ativo": 1 if novo_status_dest == "Ativo" else 0
+            })},
+            f"Atualização destino {destino_sel}"
+        )
         st.session_state.msg_destino = "Situação do destino atualizada."
         st.rerun()
 
@@ -274,10 +248,55 @@ with aba_destinos:
 
     destino_exc = st.selectbox("Destino para excluir", df_setores_destino["setor_destino"], key="exc_destino")
     if st.button("Excluir setor de destino", key="btn_exc_destino"):
-        df_setores_destino = df_setores_destino[
-            df_setores_destino["setor_destino"] != destino_exc
-        ]
-        salvar_csv_github(df_setores_destino, CAMINHO_SETORES_DESTINO, f"Exclusão destino {destino_exc}")
+        armazenamento.gravar(
+            lambda t: {"setores_destinos": Remover("setor_destino", [destino_exc])},
+            f"Exclusão destino {destino_exc}"
+        )
         st.session_state.msg_destino = "Setor de destino excluído."
         st.rerun()
 
+# =====================================================
+# ABA GRAVAÇÕES (CONCORRÊNCIA)
+# =====================================================
+with aba_gravacoes:
+    st.subheader("📈 Gravações no GitHub")
+    st.caption("Contadores deste servidor desde a última reinicialização.")
+
+    est = estatisticas_concorrencia()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Gravações", est["gravacoes"])
+    col2.metric("Tentativas", est["tentativas"])
+    col3.metric("Conflitos", est["conflitos"])
+    col4.metric("Falhas", est["falhas"])
+
+    if est["conflitos_por_hora"]:
+        st.markdown("### Conflitos por hora do dia")
+        st.bar_chart(
+            pd.Series(est["conflitos_por_hora"], name="Conflitos")
+            .sort_index()
+            .rename_axis("Hora")
+        )
+
+    # =====================================================
+    # CONTADORES AGREGADOS
+    # =====================================================
+    st.divider()
+    st.subheader("🔢 Contadores")
+    st.caption(
+        "Mantidos a cada gravação. A verificação recalcula tudo a partir "
+        "de processos e andamentos."
+    )
+
+    col_verificar, col_reconstruir = st.columns(2)
+    if col_verificar.button("Verificar contadores"):
+        diferencas = contadores.verificar()
+        if diferencas.empty:
+            st.success("Contadores conferem.")
+        else:
+            st.warning(f"{len(diferencas)} contador(es) divergente(s).")
+            st.dataframe(diferencas, use_container_width=True)
+
+    if col_reconstruir.button("Reconstruir contadores"):
+        contadores.reconstruir()
+        st.success("Contadores reconstruídos.")
@@ -1,103 +1,111 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+    SimpleDocTemplate, Paragraph, Spacer, Table
 )
-from reportlab.lib import colors
-from datetime import datetime
+from io import BytesIO
 import pandas as pd
-import os
+import time
+import datas
+from armazenamento import obter_armazenamento
+from fila_relatorios import medir_build
+from pdf_utils import obter_nomes
+from modelos_pdf import (
+    ESTILO_CARD_HISTORICO,
+    FlowablesSobDemanda,
+    estilos_historico,
+    logo,
+    rodape
+)
 
 # ===============================
-# BUSCAR NOME COMPLETO DO SERVIDOR
+# IDENTIFICAÇÃO DOS PROCESSOS
 # ===============================
-def obter_nome_completo(usuario):
+def identificar_processos(ids):
+    """
+    {id_processo: "número - assunto"} para todos os ids, numa única
+    consulta.
+    """
+    ids = [i for i in pd.unique(pd.Series(ids).dropna())]
+    rotulos = {i: str(i) for i in ids}
     try:
-        df_users = pd.read_csv("data/usuarios.csv")
-        nome = df_users.loc[
-            df_users["usuario"] == usuario, "nome_completo"
-        ]
-        return nome.iloc[0] if not nome.empty else usuario
+        dados = obter_armazenamento().consultar("processos", id_processo=ids)
     except Exception:
-        return usuario
+        return rotulos
+
+    numero = dados["numero_protocolo"].fillna("").astype(str).str.strip()
+    assunto = dados["assunto"].fillna("").astype(str).str.strip()
+    rotulo = (numero + " - " + assunto).where(
+        (numero != "") & (assunto != ""),
+        numero.where(numero != "", assunto)
+    )
+    rotulos.update({
+        i: r for i, r in zip(dados["id_processo"], rotulo) if r
+    })
+    return rotulos
 
 
 # ===============================
-# FORMATADOR DE DATA/HORA
+# CARD PADRÃO
 # ===============================
-def formatar_data_hora(data):
-    if not data or pd.isna(data):
-        return ""
-    try:
-        return pd.to_datetime(data).strftime("%d/%m/%Y %H:%M")
-    except Exception:
-        return str(data)
+def criar_card(conteudo, largura):
+    tabela = Table([[conteudo]], colWidths=[largura])
+
+    tabela.setStyle(ESTILO_CARD_HISTORICO)
+
+    return tabela
 
 
 # ===============================
-# BUSCAR DADOS DO PROCESSO
+# CONTEÚDO EM LOTES
 # ===============================
-def buscar_dados_processo(id_processo):
-    try:
-        df = pd.read_csv("data/processos.csv")
-        dados = df[df["id_processo"] == id_processo]
-
-        if dados.empty:
-            return str(id_processo)
+# Cartões criados por vez: o reportlab consome a lista do início e
+# só pede mais quando ela está acabando
+CARTOES_POR_LOTE = 200
 
-        row = dados.iloc[0]
-        numero = str(row.get("numero_protocolo", "")).strip()
-        assunto = str(row.get("assunto", "")).strip()
 
-        if numero and assunto:
-            return f"{numero} - {assunto}"
-        elif numero:
-            return numero
-        elif assunto:
-            return assunto
-        else:
-            return str(id_processo)
+class RelatorioPDF:
+    def __init__(self, conteudo, paginas, linhas, segundos):
+        self.conteudo = conteudo
+        self.paginas = paginas
+        self.linhas = linhas
+        self.segundos = segundos
 
-    except Exception:
-        return str(id_processo)
 
+def _lotes_de_cartoes(historico, tipo_relatorio, styles, largura_card):
+    processo_atual = None
 
-# ===============================
-# RODAPÉ
-# ===============================
-def rodape(canvas, doc, usuario_emissor):
-    canvas.saveState()
-    canvas.setFont("Helvetica", 8)
-    canvas.setFillColor(colors.grey)
-
-    texto = f"Emitido por: {usuario_emissor}"
-    largura_pagina, _ = A4
-
-    canvas.drawRightString(
-        largura_pagina - 50,
-        30,
-        texto
-    )
+    for inicio in range(0, len(historico), CARTOES_POR_LOTE):
+        lote = []
 
-    canvas.restoreState()
+        for row in historico.iloc[inicio:inicio + CARTOES_POR_LOTE].to_dict("records"):
 
+            if tipo_relatorio == "por_processo":
+                # Linhas já ordenadas por processo: título a cada troca
+                if row["id_processo"] != processo_atual:
+                    processo_atual = row["id_processo"]
+                    lote.append(
+                        Paragraph(f"Processo: {row['identificacao']}", styles["Subtitulo"])
+                    )
+                linha_processo = ""
+            else:
+                linha_processo = f"<b>Processo:</b> {row['identificacao']}<br/>"
 
-# ===============================
-# CARD PADRÃO
-# ===============================
-def criar_card(conteudo, largura):
-    tabela = Table([[conteudo]], colWidths=[largura])
+            conteudo = Paragraph(
+                f"""
+                <b>Data/Hora:</b> {row.get('data_hora')}<br/>
+                {linha_processo}
+                <b>Ação:</b> {row.get('acao','')}<br/>
+                <b>Observação:</b> {row.get('observacao','')}<br/>
+                <b>Setor anterior:</b> {row.get('setor_origem','')}<br/>
+                <b>Setor atual:</b> {row.get('setor_destino','')}
+                """,
+                styles["CardTexto"]
+            )
 
-    tabela.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
-        ("BOX", (0, 0), (-1, -1), 0.75, colors.lightgrey),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        ("TOPPADDING", (0, 0), (-1, -1), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-    ]))
+            lote.append(criar_card(conteudo, largura_card))
+            lote.append(Spacer(1, 10))
 
-    return tabela
+        yield lote
 
 
 # ===============================
@@ -106,17 +114,27 @@ def criar_card(conteudo, largura):
 def gerar_pdf_4(
     servidor,
     historico,
-    nome_arquivo,
     tipo_relatorio,
     logo_path,
     *,
-    usuario_emissor
+    usuario_emissor,
+    emitido_em,
+    progresso=None
 ):
+    """
+    Gera o relatório em memória. Devolve um RelatorioPDF com os bytes
+    (conteudo) e as contagens de páginas e linhas e o tempo gasto.
+    emitido_em: momento impresso como emissão (até o minuto).
+    progresso(fracao), se informado, acompanha a montagem das páginas.
+    """
+    inicio = time.perf_counter()
 
-    nome_completo_servidor = obter_nome_completo(servidor)
+    nome_completo_servidor = obter_nomes([servidor]).get(servidor, servidor)
+
+    buffer = BytesIO()
 
     doc = SimpleDocTemplate(
-        nome_arquivo,
+        buffer,
         pagesize=A4,
         rightMargin=50,
         leftMargin=50,
@@ -126,53 +144,16 @@ def gerar_pdf_4(
 
     largura_card = A4[0] - 100
 
-    styles = getSampleStyleSheet()
-
-    styles.add(ParagraphStyle(
-        name="Titulo",
-        fontSize=16,
-        leading=20,
-        alignment=1,
-        fontName="Helvetica-Bold"
-    ))
-
-    styles.add(ParagraphStyle(
-        name="Subtitulo",
-        fontSize=12,
-        leading=14,
-        spaceBefore=14,
-        spaceAfter=12,
-        fontName="Helvetica-Bold"
-    ))
-
-    styles.add(ParagraphStyle(
-        name="DataRelatorio",
-        fontSize=9,
-        leading=12,
-        alignment=2,
-        textColor=colors.grey
-    ))
-
-    styles.add(ParagraphStyle(
-        name="CardTexto",
-        fontSize=10,
-        leading=14
-    ))
+    styles = estilos_historico()
 
     elementos = []
 
     # ===============================
     # LOGO
     # ===============================
-    caminho_logo = logo_path
-
-    if not caminho_logo or not os.path.exists(caminho_logo):
-        caminho_logo = os.path.join("assets", "logo.png")
-
-    if os.path.exists(caminho_logo):
-        logo = Image(caminho_logo, width=500, height=50)
-        logo.hAlign = "CENTER"
-        elementos.append(logo)
+    logo_relatorio = logo(logo_path)
+    if logo_relatorio is not None:
+        elementos.append(logo_relatorio)
         elementos.append(Spacer(1, 12))
 
     # ===============================
@@ -188,7 +169,7 @@ def gerar_pdf_4(
         Paragraph(f"Servidor: {nome_completo_servidor}", styles["Subtitulo"])
     )
 
-    data_emissao = datetime.now().strftime("%d/%m/%Y %H:%M")
+    data_emissao = emitido_em.strftime("%d/%m/%Y %H:%M")
     elementos.append(
         Paragraph(f"Emitido em: {data_emissao}", styles["DataRelatorio"])
     )
@@ -201,68 +182,47 @@ def gerar_pdf_4(
     if tipo_relatorio == "por_momento":
         historico = historico.sort_values("data")
     elif tipo_relatorio == "por_processo":
-        historico = historico.sort_values(["id_processo", "data"])
+        historico = historico.dropna(subset=["id_processo"]).sort_values(
+            ["id_processo", "data"], kind="stable"
+        )
     else:
         raise ValueError("tipo_relatorio inválido")
 
-    # ===============================
-    # CONTEÚDO
-    # ===============================
-    if tipo_relatorio == "por_processo":
-
-        for proc in historico["id_processo"].dropna().unique():
-
-            dados_proc = historico[historico["id_processo"] == proc]
-            identificacao = buscar_dados_processo(proc)
-
-            elementos.append(
-                Paragraph(f"Processo: {identificacao}", styles["Subtitulo"])
-            )
-
-            for _, row in dados_proc.iterrows():
-
-                conteudo = Paragraph(
-                    f"""
-                    <b>Data/Hora:</b> {formatar_data_hora(row.get('data'))}<br/>
-                    <b>Ação:</b> {row.get('acao','')}<br/>
-                    <b>Observação:</b> {row.get('observacao','')}<br/>
-                    <b>Setor anterior:</b> {row.get('setor_origem','')}<br/>
-                    <b>Setor atual:</b> {row.get('setor_destino','')}
-                    """,
-                    styles["CardTexto"]
-                )
-
-                elementos.append(criar_card(conteudo, largura_card))
-                elementos.append(Spacer(1, 10))
-
-    else:
-
-        for _, row in historico.iterrows():
-
-            identificacao = buscar_dados_processo(row.get("id_processo"))
-
-            conteudo = Paragraph(
-                f"""
-                <b>Data/Hora:</b> {formatar_data_hora(row.get('data'))}<br/>
-                <b>Processo:</b> {identificacao}<br/>
-                <b>Ação:</b> {row.get('acao','')}<br/>
-                <b>Observação:</b> {row.get('observacao','')}<br/>
-                <b>Setor anterior:</b> {row.get('setor_origem','')}<br/>
-                <b>Setor atual:</b> {row.get('setor_destino','')}
-                """,
-                styles["CardTexto"]
-            )
+    # Datas formatadas de uma vez, depois da ordenação
+    historico = historico.assign(
+        data_hora=datas.formatar_coluna(historico, "data")
+    )
 
-            elementos.append(criar_card(conteudo, largura_card))
-            elementos.append(Spacer(1, 10))
+    # Processos identificados de uma vez (uma consulta só)
+    identificacoes = identificar_processos(historico["id_processo"])
+    historico = historico.assign(
+        identificacao=historico["id_processo"].map(identificacoes)
+    )
 
     # ===============================
     # BUILD
     # ===============================
-    doc.build(
+    # Cabeçalho + cartão e espaço por linha (+ título por processo)
+    total = len(elementos) + 2 * len(historico)
+    if tipo_relatorio == "por_processo":
+        total += historico["id_processo"].nunique()
+    medir_build(doc, total, progresso)
+
+    fila = FlowablesSobDemanda(
         elementos,
+        _lotes_de_cartoes(historico, tipo_relatorio, styles, largura_card),
+        minimo=CARTOES_POR_LOTE
+    )
+
+    doc.build(
+        fila,
         onFirstPage=lambda c, d: rodape(c, d, usuario_emissor),
         onLaterPages=lambda c, d: rodape(c, d, usuario_emissor)
     )
 
-    return nome_arquivo
+    return RelatorioPDF(
+        conteudo=buffer.getvalue(),
+        paginas=doc.page,
+        linhas=len(historico),
+        segundos=time.perf_counter() - inicio
+    )
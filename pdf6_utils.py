@@ -1,26 +1,79 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle,
-    Paragraph, Spacer, Image
+    SimpleDocTemplate, Table,
+    Paragraph, Spacer
 )
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from datetime import datetime
-from collections import defaultdict
-import os
+from io import BytesIO
+import math
+import pandas as pd
+import datas
+from fila_relatorios import medir_build
+from modelos_pdf import (
+    ESTILO_TABELA_REMESSA,
+    FlowablesSobDemanda,
+    estilos_remessa,
+    logo
+)
+
+# Linhas por tabela: cada pedaço cabe numa página, então o reportlab
+# nunca precisa medir e dividir uma tabela com a remessa inteira
+LINHAS_POR_TABELA = 30
+
+CABECALHO_TABELA = [
+    "Setor Destino",
+    "Processo",
+    "Referência",
+    "Assunto",
+    "Recebido por:",
+    "Data"
+]
 
+LARGURAS_TABELA = [80, 70, 90, 160, 80, 70]
 
-def gerar_pdf_remessa_multi_setor(processos, caminho_pdf, logo_path=None):
+
+def _tabelas_por_setor(itens, styles):
     """
-    processos: lista de dicionários com:
-        - setor_destino
-        - numero_protocolo
-        - numero_referencia
-        - assunto
+    Para cada setor destino, o título e as tabelas de até
+    LINHAS_POR_TABELA linhas, cada uma com o cabeçalho.
     """
+    for setor, grupo in itens.groupby("setor_destino", sort=False):
+        linhas = grupo.to_dict("records")
+
+        for inicio in range(0, len(linhas), LINHAS_POR_TABELA):
+            titulo = f"SETOR DESTINO: {setor}"
+            if inicio:
+                titulo += " (continuação)"
+
+            dados = [CABECALHO_TABELA]
+            for p in linhas[inicio:inicio + LINHAS_POR_TABELA]:
+                dados.append([
+                    setor,
+                    p["numero_processo"],
+                    p["numero_referencia"],
+                    p["assunto"],
+                    "",
+                    ""
+                ])
+
+            tabela = Table(dados, repeatRows=1, colWidths=LARGURAS_TABELA)
+            tabela.setStyle(ESTILO_TABELA_REMESSA)
+
+            yield [Paragraph(titulo, styles["SetorTitulo"]), tabela]
+
+
+def gerar_pdf_remessa(*, remessa, itens, logo_path=None, progresso=None):
+    """
+    remessa: cabeçalho gravado (id_remessa, data, data_ms, ...).
+    itens: DataFrame com setor_destino, numero_processo,
+    numero_referencia e assunto.
+
+    Gera o PDF em memória e devolve os bytes. O documento só depende da
+    remessa gravada, então reimprimir dá sempre o mesmo arquivo.
+    """
+    buffer = BytesIO()
 
     doc = SimpleDocTemplate(
-        caminho_pdf,
+        buffer,
         pagesize=A4,
         rightMargin=40,
         leftMargin=40,
@@ -28,120 +81,45 @@ def gerar_pdf_remessa_multi_setor(processos, caminho_pdf, logo_path=None):
         bottomMargin=30
     )
 
-    styles = getSampleStyleSheet()
-
-    # ===============================
-    # ESTILOS PERSONALIZADOS
-    # ===============================
-    styles.add(ParagraphStyle(
-        name="TituloRemessa",
-        fontName="Helvetica-Bold",
-        fontSize=14,
-        alignment=1,  # centro
-        spaceAfter=10
-    ))
-
-    styles.add(ParagraphStyle(
-        name="DataDireita",
-        fontName="Helvetica",
-        fontSize=9,
-        alignment=2,  # direita
-        spaceAfter=10
-    ))
-
-    styles.add(ParagraphStyle(
-        name="SetorTitulo",
-        fontName="Helvetica-Bold",
-        fontSize=12,
-        spaceBefore=10,
-        spaceAfter=6
-    ))
+    styles = estilos_remessa()
 
     elementos = []
 
     # ===============================
     # LOGO
     # ===============================
-    caminho_logo = logo_path
-
-    if not caminho_logo or not os.path.exists(caminho_logo):
-        caminho_logo = os.path.join("assets", "logo.png")
-
-    if os.path.exists(caminho_logo):
-        logo = Image(caminho_logo, width=500, height=50)
-        logo.hAlign = "CENTER"
-        elementos.append(logo)
+    logo_remessa = logo(logo_path)
+    if logo_remessa is not None:
+        elementos.append(logo_remessa)
         elementos.append(Spacer(1, 10))
 
     # ===============================
     # CABEÇALHO
     # ===============================
-    elementos.append(
-        Paragraph("REMESSA DE ENVIO DE PROCESSOS", styles["TituloRemessa"])
-    )
-
     elementos.append(
         Paragraph(
-            f"Data de Emissão: {datetime.now().strftime('%d/%m/%Y')}",
-            styles["DataDireita"]
+            f"REMESSA DE ENVIO DE PROCESSOS Nº {remessa['id_remessa']}",
+            styles["TituloRemessa"]
         )
     )
 
-    # ===============================
-    # AGRUPAMENTO POR SETOR
-    # ===============================
-    agrupados = defaultdict(list)
-    for p in processos:
-        agrupados[p["setor_destino"]].append(p)
+    data_remessa = datas.formatar_coluna(
+        pd.DataFrame([remessa]), "data", "%d/%m/%Y"
+    ).iloc[0]
+    elementos.append(
+        Paragraph(f"Data de Emissão: {data_remessa}", styles["DataDireita"])
+    )
 
     # ===============================
     # TABELAS POR SETOR
     # ===============================
-    for setor, itens in agrupados.items():
+    pedacos = itens.groupby("setor_destino", sort=False).size().map(
+        lambda n: math.ceil(n / LINHAS_POR_TABELA)
+    ).sum()
+    medir_build(doc, len(elementos) + 2 * pedacos, progresso)
 
-        elementos.append(
-            Paragraph(f"SETOR DESTINO: {setor}", styles["SetorTitulo"])
-        )
-
-        dados = [[
-            "Setor Destino",
-            "Processo",
-            "Referência",
-            "Assunto",
-            "Recebido por:",
-            "Data"
-        ]]
-
-        for p in itens:
-            dados.append([
-                setor,
-                p["numero_protocolo"],
-                p["numero_referencia"],
-                p["assunto"],
-                "",
-                ""
-            ])
-
-        tabela = Table(
-            dados,
-            repeatRows=1,
-            colWidths=[80, 70, 90, 160, 80, 70]
-        )
-
-        tabela.setStyle(TableStyle([
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("ALIGN", (1, 1), (-1, -1), "LEFT"),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ]))
-
-        elementos.append(tabela)
+    doc.build(
+        FlowablesSobDemanda(elementos, _tabelas_por_setor(itens, styles), minimo=4)
+    )
 
-    # ===============================
-    # BUILD
-    # ===============================
-    doc.build(elementos)
+    return buffer.getvalue()
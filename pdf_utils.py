@@ -1,83 +1,70 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate,
     Paragraph,
     Spacer,
-    Table,
-    TableStyle,
-    Image
+    Table
+)
+from io import BytesIO
+import datas
+from armazenamento import obter_armazenamento
+from fila_relatorios import medir_build
+from modelos_pdf import (
+    ESTILO_CARD_PROCESSO,
+    ESTILO_QUADRO_PROCESSO,
+    estilos_processo,
+    logo,
+    rodape
 )
-from reportlab.lib import colors
-from datetime import datetime
-import pandas as pd
-import os
 
 # ===============================
-# BUSCAR NOME COMPLETO DO SERVIDOR
+# BUSCAR NOMES COMPLETOS DOS SERVIDORES
 # ===============================
-
-def obter_nome_completo(usuario):
+def obter_nomes(usuarios):
+    """
+    {usuario: nome_completo} para vários usuários, numa única consulta.
+    Usuários sem cadastro ficam com o próprio login.
+    """
+    usuarios = [u for u in dict.fromkeys(usuarios) if isinstance(u, str) and u]
+    nomes = {u: u for u in usuarios}
     try:
-        df_users = pd.read_csv("data/usuarios.csv")
-        nome = df_users.loc[
-            df_users["usuario"] == usuario, "nome_completo"
-        ]
-        return nome.iloc[0] if not nome.empty else usuario
+        df_users = obter_armazenamento().consultar("usuarios", usuario=usuarios)
+        nomes.update(zip(df_users["usuario"], df_users["nome_completo"].fillna("")))
     except Exception:
-        return usuario
-
-
-# ===============================
-# FORMATADOR DE DATA
-# ===============================
+        pass
+    return {u: n or u for u, n in nomes.items()}
 
-def formatar_data(data):
-    if not data or pd.isna(data):
-        return ""
-    try:
-        return pd.to_datetime(data).strftime("%d/%m/%Y %H:%M")
-    except Exception:
-        return str(data)
 
 # ===============================
 # BUSCAR ENCAMINHAMENTO EXTERNO
 # ===============================
 def buscar_encaminhamento_externo(id_processo):
     try:
-        df = pd.read_csv("data/destinacoes.csv")
-        df = df[df["id_processo"] == id_processo]
+        df = obter_armazenamento().consultar("destinacoes", id_processo=id_processo)
         return df if not df.empty else None
     except Exception:
         return None
 
-# ===============================
-# RODAPÉ
-# ===============================
-def rodape(canvas, doc, usuario_emissor):
-    canvas.saveState()
-    canvas.setFont("Helvetica", 8)
-    canvas.setFillColor(colors.grey)
-
-    texto = f"Emitido por: {usuario_emissor}"
-    largura_pagina, _ = A4
-
-    canvas.drawRightString(
-        largura_pagina - 50,  # margem direita
-        30,                   # altura do rodapé
-        texto
-    )
-
-    canvas.restoreState()
-
 # ===============================
 # PDF DO PROCESSO
 # ===============================
-
-def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
+def gerar_pdf_processo(
+    *, processo, historico, usuario_emissor, emitido_em, nomes=None,
+    destinacoes=None, progresso=None
+):
+    """
+    Gera o PDF em memória e devolve os bytes (prontos para o
+    st.download_button). nomes: {usuario: nome_completo}; se não for
+    informado, é buscado uma única vez para todos os usuários do PDF.
+    destinacoes: linhas de destinação do processo, se já carregadas
+    (senão são consultadas no armazenamento). emitido_em: data
+    impressa como emissão.
+    progresso(fracao), se informado, acompanha a montagem das páginas.
+    """
+    buffer = BytesIO()
 
     doc = SimpleDocTemplate(
-        nome_arquivo,
+        buffer,
         pagesize=A4,
         rightMargin=50,
         leftMargin=50,
@@ -85,53 +72,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
         bottomMargin=50
     )
 
-    styles = getSampleStyleSheet()
-
-    styles.add(ParagraphStyle(
-        name="Titulo",
-        fontSize=14,
-        leading=18,
-        alignment=1,
-        fontName="Helvetica-Bold"
-    ))
-
-    styles.add(ParagraphStyle(
-        name="DataRelatorio",
-        fontSize=10,
-        leading=12,
-        alignment=2,
-        textColor=colors.grey
-    ))
-
-    styles.add(ParagraphStyle(
-        name="Subtitulo",
-        fontSize=11,
-        leading=14,
-        spaceAfter=10,
-        fontName="Helvetica-Bold"
-    ))
-
-    styles.add(ParagraphStyle(
-        name="CardTitulo",
-        fontSize=11,
-        leading=14,
-        fontName="Helvetica-Bold"
-    ))
-
-    styles.add(ParagraphStyle(
-        name="CardTexto",
-        fontSize=11,
-        leading=6,
-        spaceAfter=6
-    ))
-
-    styles.add(ParagraphStyle(
-        name="CardObservacao",
-        fontSize=11,
-        leading=16,
-        spaceBefore=6,
-        spaceAfter=4
-    ))
+    styles = estilos_processo()
 
     elementos = []
 
@@ -139,16 +80,9 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
     # LOGO INSTITUCIONAL
     # ===============================
 
-    caminho_logo = os.path.join("assets", "logo.png")
-
-    if os.path.exists(caminho_logo):
-        logo = Image(
-            caminho_logo,
-            width=500,
-            height=50
-        )
-        logo.hAlign = "CENTER"
-        elementos.append(logo)
+    logo_institucional = logo()
+    if logo_institucional is not None:
+        elementos.append(logo_institucional)
         elementos.append(Spacer(1, 12))
 
     # ===============================
@@ -159,7 +93,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
         Paragraph("PROTOCOLO INTERNO - SEPLAN", styles["Titulo"])
     )
 
-    data_emissao = datetime.now().strftime("%d/%m/%Y")
+    data_emissao = emitido_em.strftime("%d/%m/%Y")
     elementos.append(
         Paragraph(f"Emitido em: {data_emissao}", styles["DataRelatorio"])
     )
@@ -180,16 +114,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
 
     tabela_dados = Table(dados_table, colWidths=[160, 310])
 
-    tabela_dados.setStyle(TableStyle([
-        ("BOX", (0, 0), (-1, -1), 0.75, colors.grey),
-        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-        ("FONT", (0, 0), (0, -1), "Helvetica-Bold"),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-        ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-    ]))
+    tabela_dados.setStyle(ESTILO_QUADRO_PROCESSO)
 
     elementos.append(tabela_dados)
     elementos.append(Spacer(1, 24))
@@ -198,9 +123,16 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
     # ENCAMINHAMENTO EXTERNO
     # ===============================
 
-    dest_ext = buscar_encaminhamento_externo(
-        historico["id_processo"].iloc[0]
-    )
+    if destinacoes is None:
+        dest_ext = buscar_encaminhamento_externo(processo["id_processo"])
+    else:
+        dest_ext = destinacoes if not destinacoes.empty else None
+
+    if nomes is None:
+        nomes = obter_nomes(
+            historico["servidor"].tolist()
+            + ([] if dest_ext is None else dest_ext["protocolista"].tolist())
+        )
 
     elementos.append(
         Paragraph("ENCAMINHAMENTO EXTERNO", styles["Subtitulo"])
@@ -217,7 +149,11 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
         elementos.append(Spacer(1, 16))
 
     else:
-        for idx, (_, row) in enumerate(dest_ext.iterrows(), start=1):
+        # Datas formatadas de uma vez para todas as linhas
+        dest_ext = dest_ext.assign(
+            data_saida=datas.formatar_coluna(dest_ext, "data_saida")
+        )
+        for idx, row in enumerate(dest_ext.to_dict("records"), start=1):
 
             card_ext = Table(
                 [
@@ -226,7 +162,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
                         styles["CardTitulo"]
                     )],
                     [Paragraph(
-                        f"<b>Data de Saída:</b> {formatar_data(row.get('data_saida'))}",
+                        f"<b>Data de Saída:</b> {row.get('data_saida')}",
                         styles["CardTexto"]
                     )],
                     [Paragraph(
@@ -234,7 +170,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
                         styles["CardTexto"]
                     )],
                     [Paragraph(
-                        f"<b>Responsável:</b> {obter_nome_completo(row.get('protocolista',''))}",
+                        f"<b>Responsável:</b> {nomes.get(row.get('protocolista',''), row.get('protocolista',''))}",
                         styles["CardTexto"]
                     )],
                     [Paragraph(
@@ -245,14 +181,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
                 colWidths=[470]
             )
 
-            card_ext.setStyle(TableStyle([
-                ("BOX", (0, 0), (-1, -1), 0.75, colors.lightgrey),
-                ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
-                ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                ("TOPPADDING", (0, 0), (-1, -1), 8),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-            ]))
+            card_ext.setStyle(ESTILO_CARD_PROCESSO)
 
             elementos.append(card_ext)
             elementos.append(Spacer(1, 14))
@@ -267,9 +196,10 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
         Paragraph("HISTÓRICO DE TRAMITAÇÃO", styles["Subtitulo"])
     )
 
-    for idx, (_, row) in enumerate(historico.iterrows(), start=1):
+    historico = historico.assign(data=datas.formatar_coluna(historico, "data"))
+    for idx, row in enumerate(historico.to_dict("records"), start=1):
 
-        nome_servidor = obter_nome_completo(row.get("servidor", ""))
+        nome_servidor = nomes.get(row.get("servidor", ""), row.get("servidor", ""))
 
         card = Table(
             [
@@ -282,7 +212,7 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
                     styles["CardTexto"]
                 )],
                 [Paragraph(
-                    f"<b>Data:</b> {formatar_data(row.get('data'))}",
+                    f"<b>Data:</b> {row.get('data')}",
                     styles["CardTexto"]
                 )],
                 [Paragraph(
@@ -297,24 +227,18 @@ def gerar_pdf_processo(*, processo, historico, nome_arquivo, usuario_emissor):
             colWidths=[470]
         )
 
-        card.setStyle(TableStyle([
-            ("BOX", (0, 0), (-1, -1), 0.75, colors.lightgrey),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
-            ("LEFTPADDING", (0, 0), (-1, -1), 10),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-            ("TOPPADDING", (0, 0), (-1, -1), 8),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-        ]))
+        card.setStyle(ESTILO_CARD_PROCESSO)
 
         elementos.append(card)
         elementos.append(Spacer(1, 14))
 
 
+    medir_build(doc, len(elementos), progresso)
+
     doc.build(
         elementos,
         onFirstPage=lambda c, d: rodape(c, d, usuario_emissor),
         onLaterPages=lambda c, d: rodape(c, d, usuario_emissor)
     )
 
-
-    return nome_arquivo
\ No newline at end of file
+    return buffer.getvalue()
\ No newline at end of file
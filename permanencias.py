@@ -0,0 +1,123 @@
+import pandas as pd
+import threading
+
+# =====================================================
+# PERMANÊNCIAS NOS SETORES (TEMPO PARADO)
+# =====================================================
+# Cada andamento coloca o processo no setor de destino; a permanência
+# termina no andamento seguinte do mesmo processo. A tabela de
+# permanências tem uma linha por andamento:
+#   id_andamento, id_processo, setor, acao, entrada_ms, saida_ms, dias
+# e saida_ms/dias vazios enquanto o processo continua no setor (ou
+# depois de arquivado nele).
+#
+# Andamentos novos só encerram a permanência aberta de cada processo
+# que movimentam e abrem as suas; o histórico não é recalculado.
+PERCENTIS = (0.5, 0.75, 0.9, 0.95)
+
+MS_POR_DIA = 24 * 60 * 60 * 1000
+
+
+def _intervalos(andamentos):
+    """
+    Permanências de um lote de andamentos, numa passada: ordena por
+    processo e data e usa a data do andamento seguinte como saída.
+    andamentos: id_andamento, id_processo, setor_destino, acao, data_ms.
+    """
+    a = andamentos.dropna(subset=["id_andamento", "id_processo", "data_ms"])
+    a = a.sort_values(["id_processo", "data_ms", "id_andamento"], kind="stable")
+
+    entrada = a["data_ms"].astype("float64")
+    saida = entrada.groupby(a["id_processo"]).shift(-1)
+    return pd.DataFrame({
+        "id_andamento": a["id_andamento"].astype("int64").to_numpy(),
+        "id_processo": a["id_processo"].astype("int64").to_numpy(),
+        "setor": a["setor_destino"].astype("string").to_numpy(),
+        "acao": a["acao"].astype("string").to_numpy(),
+        "entrada_ms": entrada.to_numpy(),
+        "saida_ms": saida.to_numpy(),
+        "dias": ((saida - entrada) / MS_POR_DIA).to_numpy()
+    })
+
+
+class Permanencias:
+
+    def __init__(self):
+        self.df = pd.DataFrame({
+            "id_andamento": pd.Series(dtype="int64"),
+            "id_processo": pd.Series(dtype="int64"),
+            "setor": pd.Series(dtype="string"),
+            "acao": pd.Series(dtype="string"),
+            "entrada_ms": pd.Series(dtype="float64"),
+            "saida_ms": pd.Series(dtype="float64"),
+            "dias": pd.Series(dtype="float64")
+        })
+        self.ultimo_andamento = 0
+        # id_processo -> posição (em df) da permanência em aberto
+        self._abertas = pd.Series(dtype="int64")
+        self._resumos = {}
+        self._trava = threading.Lock()
+
+    def acrescentar(self, andamentos):
+        """
+        Incorpora andamentos novos (id maior que o último incorporado;
+        os demais são ignorados).
+        """
+        with self._trava:
+            ids = pd.to_numeric(andamentos["id_andamento"], errors="coerce")
+            novos = _intervalos(andamentos[ids > self.ultimo_andamento])
+            if novos.empty:
+                return
+
+            # Primeiro andamento novo de cada processo encerra a
+            # permanência que estava aberta
+            primeiros = novos.groupby("id_processo", sort=False).first()
+            encerrar = self._abertas.reindex(primeiros.index).dropna().astype("int64")
+            if not encerrar.empty:
+                saida = primeiros.loc[encerrar.index, "entrada_ms"].to_numpy()
+                posicoes = encerrar.to_numpy()
+                self.df.iloc[posicoes, self.df.columns.get_loc("saida_ms")] = saida
+                self.df.iloc[posicoes, self.df.columns.get_loc("dias")] = (
+                    saida - self.df["entrada_ms"].to_numpy()[posicoes]
+                ) / MS_POR_DIA
+
+            inicio = len(self.df)
+            self.df = novos if self.df.empty else pd.concat([self.df, novos], ignore_index=True)
+
+            ultimas = novos.groupby("id_processo", sort=False).tail(1)
+            self._abertas = pd.concat([
+                self._abertas.drop(ultimas["id_processo"], errors="ignore"),
+                pd.Series(inicio + ultimas.index.to_numpy(), index=ultimas["id_processo"].to_numpy())
+            ])
+
+            self.ultimo_andamento = max(self.ultimo_andamento, int(novos["id_andamento"].max()))
+            self._resumos = {}
+
+    def percentis(self, por="setor", percentis=PERCENTIS):
+        """
+        Dias de permanência por setor ou por acao (a ação do andamento
+        que levou o processo ao setor): quantidade encerrada, média e
+        percentis. Guardado até o próximo acrescentar().
+        """
+        chave = (por, tuple(percentis))
+        with self._trava:
+            if chave not in self._resumos:
+                self._resumos[chave] = self._calcular_percentis(por, percentis)
+            return self._resumos[chave]
+
+    def _calcular_percentis(self, por, percentis):
+        encerradas = self.df[self.df["dias"].notna()]
+        if encerradas.empty:
+            return pd.DataFrame()
+        grupos = encerradas.groupby(por)["dias"]
+
+        resumo = pd.concat([
+            grupos.size().rename("permanencias"),
+            grupos.mean().rename("media_dias"),
+            grupos.quantile(list(percentis)).unstack().rename(
+                columns=lambda p: f"p{int(round(p * 100))}_dias"
+            )
+        ], axis=1)
+
+        ordem = f"p{int(round(percentis[0] * 100))}_dias" if percentis else "media_dias"
+        return resumo.rename_axis(por).sort_values(ordem, ascending=False)
@@ -0,0 +1,168 @@
+import streamlit as st
+import pandas as pd
+import threading
+import datas
+import snapshots
+from permanencias import Permanencias
+from armazenamento import obter_armazenamento
+
+# =====================================================
+# INDICADORES DE PRODUTIVIDADE (SEPLAN INTEIRA)
+# =====================================================
+# Calculados para todos os servidores e setores de uma vez, com
+# groupby/resample sobre o histórico inteiro, e guardados em cache
+# pela versão dos dados: o último andamento gravado, os contadores de
+# processos por status e por setor (mudam sempre que as caixas mudam)
+# e o dia, por causa da idade.
+#
+# O histórico é lido do snapshot uma vez por processo do servidor e
+# depois só recebe os andamentos gravados desde a última consulta; as
+# permanências nos setores (módulo permanencias) são mantidas junto.
+COLUNAS_HISTORICO = [
+    "id_andamento",
+    "id_processo",
+    "data",
+    "data_ms",
+    "servidor",
+    "acao",
+    "setor_destino"
+]
+
+# Dias desde a chegada ao setor atual
+FAIXAS_IDADE = [0, 7, 15, 30, 60, float("inf")]
+ROTULOS_IDADE = [
+    "Até 7 dias",
+    "8 a 15 dias",
+    "16 a 30 dias",
+    "31 a 60 dias",
+    "Mais de 60 dias"
+]
+
+
+# =====================================================
+# CÁLCULOS (VETORIZADOS)
+# =====================================================
+def acoes_por_servidor(historico, frequencia="D"):
+    """
+    Andamentos por servidor e período (frequencia do pandas: "D" ou
+    "W-MON", semanas de segunda a domingo). Linhas: início do período;
+    colunas: servidores.
+    """
+    if historico.empty:
+        return pd.DataFrame()
+    return (
+        historico.dropna(subset=["data", "servidor"])
+        .set_index("data")
+        .groupby("servidor")
+        .resample(frequencia, label="left", closed="left")
+        .size()
+        .unstack("servidor", fill_value=0)
+        .fillna(0)
+        .astype(int)
+    )
+
+
+def fila_por_setor(caixas):
+    """Processos abertos em cada setor."""
+    return caixas["setor"].value_counts().rename("processos").rename_axis("setor")
+
+
+def idade_da_fila(caixas, localizacao, dia):
+    """
+    Processos abertos por setor e faixa de dias (de calendário, até
+    `dia`) desde a chegada ao setor atual, a data do último andamento.
+    """
+    abertos = caixas[["id_processo", "setor"]].merge(
+        localizacao[["id_processo", "data", "data_ms"]], on="id_processo", how="left"
+    )
+    chegada = datas.converter(abertos, "data").dt.tz_localize(None).dt.normalize()
+    dias = (pd.Timestamp(dia) - chegada).dt.days
+    faixa = pd.cut(dias, FAIXAS_IDADE, labels=ROTULOS_IDADE, include_lowest=True)
+    return pd.crosstab(abertos["setor"], faixa.rename("idade")).reindex(
+        columns=ROTULOS_IDADE, fill_value=0
+    )
+
+
+# =====================================================
+# HISTÓRICO COMPARTILHADO
+# =====================================================
+class _Historico:
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.df = self._preparar(
+            snapshots.ler("andamentos", colunas_lidas=COLUNAS_HISTORICO)
+        )
+        ids = self.df["id_andamento"].dropna()
+        self.ultimo_andamento = int(ids.max()) if not ids.empty else 0
+        self.permanencias = Permanencias()
+        self.permanencias.acrescentar(self.df)
+
+    @staticmethod
+    def _preparar(df):
+        df = df[COLUNAS_HISTORICO].copy()
+        df["data"] = datas.converter(df, "data")
+        for coluna in ["id_andamento", "id_processo", "data_ms"]:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce")
+        # data_ms ausente em registros antigos: vem do texto convertido
+        df["data_ms"] = df["data_ms"].astype("float64").fillna(
+            (df["data"] - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(milliseconds=1)
+        )
+        return df
+
+    def atualizar(self):
+        with self._trava:
+            novos = obter_armazenamento().posteriores("andamentos", self.ultimo_andamento)
+            novos = novos.dropna(subset=["id_andamento"])
+            if novos.empty:
+                return
+            novos = self._preparar(novos)
+            self.df = pd.concat([self.df, novos], ignore_index=True)
+            self.permanencias.acrescentar(novos)
+            self.ultimo_andamento = int(pd.to_numeric(novos["id_andamento"]).max())
+
+
+@st.cache_resource(show_spinner="Carregando o histórico de andamentos...")
+def _historico():
+    return _Historico()
+
+
+@st.cache_data(show_spinner="Calculando indicadores...", max_entries=8)
+def _indicadores(versao, frequencia):
+    # versao só entra na chave do cache; os dados vêm do histórico
+    # compartilhado e das tabelas derivadas
+    _, _, dia = versao
+    historico = _historico().df
+    armazenamento = obter_armazenamento()
+    caixas = armazenamento.carregar("caixas")
+    localizacao = armazenamento.carregar("localizacao")
+
+    return {
+        "acoes": acoes_por_servidor(historico, frequencia),
+        "fila": fila_por_setor(caixas),
+        "idade": idade_da_fila(caixas, localizacao, dia)
+    }
+
+
+def indicadores(frequencia="D"):
+    """
+    Indicadores da SEPLAN inteira: {"acoes", "fila", "idade",
+    "tempo_no_setor", "tempo_por_acao"}. Recalculados só quando os
+    dados mudam.
+    """
+    historico = _historico()
+    historico.atualizar()
+    contadores = obter_armazenamento().consultar("contadores", grupo=["status", "setor"])
+    versao = (
+        historico.ultimo_andamento,
+        tuple(sorted(zip(
+            contadores["contador"].astype(str),
+            pd.to_numeric(contadores["valor"]).astype(int)
+        ))),
+        datas.agora().date().isoformat()
+    )
+    return {
+        **_indicadores(versao, frequencia),
+        "tempo_no_setor": historico.permanencias.percentis("setor"),
+        "tempo_por_acao": historico.permanencias.percentis("acao")
+    }
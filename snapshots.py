@@ -0,0 +1,205 @@
+import streamlit as st
+import pandas as pd
+import os
+import threading
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from armazenamento import ESQUEMA, chave, colunas, obter_armazenamento
+
+# =====================================================
+# SNAPSHOTS COLUNARES (PARQUET)
+# =====================================================
+# Cópia compactada das tabelas só de acréscimo, para leituras
+# analíticas: colunas tipadas, textos repetidos em dicionário e linhas
+# ordenadas por data, em grupos com estatísticas de mínimo/máximo.
+# Uma leitura abre só as colunas pedidas e pula os grupos fora do
+# filtro. O CSV continua sendo a cópia de referência; o que foi
+# gravado depois do snapshot é lido do armazenamento e somado.
+PASTA_SNAPSHOTS = "data/snapshots"
+
+# Tabelas em que linhas só são acrescentadas (as demais mudam no lugar
+# e são lidas direto do armazenamento)
+TABELAS = {
+    "andamentos": "data_ms",
+    "destinacoes": "data_saida_ms"
+}
+
+COLUNAS_DICIONARIO = [
+    "servidor",
+    "perfil",
+    "acao",
+    "setor_origem",
+    "setor_destino",
+    "protocolista",
+    "destino"
+]
+
+LINHAS_POR_GRUPO = 5000
+
+# Minutos até o snapshot ser refeito com as linhas novas.
+# Configurável em st.secrets["SNAPSHOT_INTERVALO_MIN"].
+# A compactação roda numa thread à parte: enquanto isso as leituras
+# usam o snapshot antigo mais as linhas posteriores. Só a primeira,
+# quando ainda não há arquivo, é feita durante a leitura.
+INTERVALO_COMPACTACAO = 15
+
+# Uma compactação por vez (no servidor todo)
+_trava = threading.Lock()
+
+
+def _intervalo():
+    try:
+        return float(st.secrets.get("SNAPSHOT_INTERVALO_MIN", INTERVALO_COMPACTACAO))
+    except Exception:
+        return INTERVALO_COMPACTACAO
+
+
+def _caminho(tabela):
+    return f"{PASTA_SNAPSHOTS}/{tabela}.parquet"
+
+
+def _tipar(df, tabela):
+    df = df[colunas(tabela)].copy()
+    for coluna, tipo in ESQUEMA[tabela]:
+        if tipo == "INTEGER":
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype("Int64")
+        else:
+            df[coluna] = df[coluna].astype("string")
+    return df
+
+
+def compactar(tabela):
+    """Regrava o snapshot da tabela com todas as linhas atuais."""
+    df = obter_armazenamento().carregar(tabela)
+    df = _tipar(df, tabela).sort_values([TABELAS[tabela], chave(tabela)])
+
+    tabela_arrow = pa.Table.from_pandas(df, preserve_index=False)
+    for coluna in COLUNAS_DICIONARIO:
+        if coluna in tabela_arrow.column_names:
+            i = tabela_arrow.column_names.index(coluna)
+            tabela_arrow = tabela_arrow.set_column(
+                i, coluna, pc.dictionary_encode(tabela_arrow[coluna])
+            )
+    ultimo = df[chave(tabela)].max() if not df.empty else 0
+    tabela_arrow = tabela_arrow.replace_schema_metadata({
+        **(tabela_arrow.schema.metadata or {}),
+        b"ultimo_id": str(int(ultimo)).encode()
+    })
+
+    os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+    temporario = _caminho(tabela) + ".tmp"
+    pq.write_table(
+        tabela_arrow,
+        temporario,
+        row_group_size=LINHAS_POR_GRUPO,
+        use_dictionary=[c for c in COLUNAS_DICIONARIO if c in df.columns],
+        write_statistics=True
+    )
+    os.replace(temporario, _caminho(tabela))
+
+
+def _compactar_em_segundo_plano(tabela):
+    try:
+        compactar(tabela)
+    except Exception:
+        # O snapshot antigo continua valendo; a próxima leitura tenta de novo
+        pass
+    finally:
+        _trava.release()
+
+
+def _atualizar(tabela):
+    caminho = _caminho(tabela)
+    if not os.path.exists(caminho):
+        with _trava:
+            if not os.path.exists(caminho):
+                compactar(tabela)
+        return
+
+    if (
+        time.time() - os.path.getmtime(caminho) > _intervalo() * 60
+        and _trava.acquire(blocking=False)
+    ):
+        threading.Thread(
+            target=_compactar_em_segundo_plano,
+            args=(tabela,),
+            name=f"snapshot-{tabela}",
+            daemon=True
+        ).start()
+
+
+def _filtros_arrow(filtros, entre):
+    condicoes = []
+    for coluna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set)):
+            condicoes.append((coluna, "in", list(valor)))
+        else:
+            condicoes.append((coluna, "=", valor))
+    for coluna, (inicio, fim) in entre.items():
+        if inicio is not None:
+            condicoes.append((coluna, ">=", inicio))
+        if fim is not None:
+            condicoes.append((coluna, "<=", fim))
+    return condicoes or None
+
+
+def _filtrar_pandas(df, filtros, entre):
+    for coluna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set)):
+            df = df[df[coluna].isin(list(valor))]
+        else:
+            df = df[df[coluna] == valor]
+    for coluna, (inicio, fim) in entre.items():
+        valores = pd.to_numeric(df[coluna], errors="coerce")
+        mascara = valores.notna()
+        if inicio is not None:
+            mascara &= valores >= inicio
+        if fim is not None:
+            mascara &= valores <= fim
+        df = df[mascara]
+    return df
+
+
+def ler(tabela, colunas_lidas=None, entre=None, **filtros):
+    """
+    Lê uma tabela do snapshot: só `colunas_lidas` (todas se None) e
+    só as linhas que passam nos filtros. filtros como em consultar()
+    (valor ou lista); entre={coluna: (inicio, fim)} para intervalos,
+    como datas em _ms.
+    """
+    entre = entre or {}
+    _atualizar(tabela)
+
+    usadas = None
+    if colunas_lidas is not None:
+        usadas = list(dict.fromkeys(
+            list(colunas_lidas) + list(filtros) + list(entre)
+        ))
+
+    # Metadados e linhas do mesmo arquivo aberto: uma compactação que
+    # termine no meio da leitura não troca o snapshot por baixo
+    with open(_caminho(tabela), "rb") as aberto:
+        ultimo_id = int(pq.ParquetFile(aberto).schema_arrow.metadata[b"ultimo_id"])
+        aberto.seek(0)
+        df = pq.read_table(
+            aberto,
+            columns=usadas,
+            filters=_filtros_arrow(filtros, entre)
+        ).to_pandas()
+    for coluna in df.columns:
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype("string")
+
+    # Linhas gravadas depois do snapshot
+    novos = obter_armazenamento().posteriores(tabela, ultimo_id)
+    if not novos.empty:
+        novos = _filtrar_pandas(_tipar(novos, tabela), filtros, entre)
+        if usadas is not None:
+            novos = novos[usadas]
+        df = pd.concat([df, novos], ignore_index=True)
+
+    if colunas_lidas is not None:
+        df = df[list(colunas_lidas)]
+    return df.reset_index(drop=True)
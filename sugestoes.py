@@ -0,0 +1,215 @@
+import streamlit as st
+import pandas as pd
+import bisect
+import itertools
+import re
+import threading
+from busca import normalizar
+from armazenamento import obter_armazenamento
+
+# =====================================================
+# SUGESTÕES (AUTOCOMPLETAR)
+# =====================================================
+# Cada catálogo é um vetor ordenado de chaves normalizadas (minúsculas,
+# sem acentos), uma para cada início de palavra do rótulo: "Diretoria
+# de Planejamento" é encontrada por "dir", "plan" ou "de plan". Uma
+# busca é uma bisseção e devolve no máximo TOP_K valores, então os
+# widgets recebem só essas opções e não a tabela inteira.
+TOP_K = 10
+
+# Chaves examinadas no máximo por busca (prefixos muito curtos casam
+# com quase tudo)
+LIMITE_VARREDURA = 2000
+
+# Até quantas chaves novas são inseridas uma a uma (numa cópia do
+# vetor); acima disso o vetor é reordenado de uma vez
+INSERCAO_DIRETA = 200
+
+_INICIO_PALAVRA = re.compile(r"[0-9a-z]+")
+
+
+class Catalogo:
+    # O catálogo é compartilhado entre sessões: acrescentar monta
+    # vetores novos e os troca numa única atribuição de _indice, então
+    # sugerir, lendo sem trava, vê o índice antigo ou o novo, nunca um
+    # pela metade. rotulos só ganha chaves, antes da troca.
+
+    def __init__(self, itens=()):
+        self.rotulos = {}
+        self._normalizados = {}
+        # (chaves, inicio, valores, ordem):
+        #   inicio[i]: a chave começa no início do rótulo?
+        #   ordem: valores em ordem alfabética do rótulo
+        self._indice = ([], [], [], [])
+        self.acrescentar(itens)
+
+    def acrescentar(self, itens):
+        """itens: pares (valor, rótulo). Valores repetidos são ignorados."""
+        novas = []
+        for valor, rotulo in itens:
+            if valor in self.rotulos:
+                continue
+            rotulo = str(rotulo)
+            self.rotulos[valor] = rotulo
+            texto = normalizar(rotulo)
+            self._normalizados[valor] = texto
+            for m in _INICIO_PALAVRA.finditer(texto):
+                novas.append((texto[m.start():], m.start() == 0, valor))
+
+        if not novas:
+            return
+
+        chaves, inicios, valores, _ = self._indice
+        if len(novas) <= INSERCAO_DIRETA:
+            chaves, inicios, valores = list(chaves), list(inicios), list(valores)
+            for chave, inicio, valor in novas:
+                i = bisect.bisect_right(chaves, chave)
+                chaves.insert(i, chave)
+                inicios.insert(i, inicio)
+                valores.insert(i, valor)
+        else:
+            entradas = list(zip(chaves, inicios, valores)) + novas
+            entradas.sort(key=lambda e: e[0])
+            chaves = [e[0] for e in entradas]
+            inicios = [e[1] for e in entradas]
+            valores = [e[2] for e in entradas]
+
+        ordem = sorted(self.rotulos, key=self._normalizados.get)
+        self._indice = (chaves, inicios, valores, ordem)
+
+    def sugerir(self, texto, k=TOP_K, entre=None):
+        """
+        Até k valores cujo rótulo tem uma palavra começando com o
+        texto; os que começam pelo texto vêm primeiro. Texto vazio
+        devolve os primeiros em ordem alfabética. entre restringe aos
+        valores desse conjunto.
+        """
+        prefixo = normalizar(texto).strip()
+        chaves, inicios, valores, ordem = self._indice
+
+        if not prefixo:
+            primeiros = ordem if entre is None else (v for v in ordem if v in entre)
+            return list(itertools.islice(primeiros, k))
+
+        no_inicio, no_meio, vistos = [], [], set()
+        i = bisect.bisect_left(chaves, prefixo)
+        fim = min(len(chaves), i + LIMITE_VARREDURA)
+        while (
+            i < fim
+            and chaves[i].startswith(prefixo)
+            and len(no_inicio) < k
+        ):
+            valor = valores[i]
+            if valor not in vistos and (entre is None or valor in entre):
+                vistos.add(valor)
+                (no_inicio if inicios[i] else no_meio).append(valor)
+            i += 1
+        return (no_inicio + no_meio)[:k]
+
+
+# =====================================================
+# CATÁLOGOS
+# =====================================================
+class _CatalogosProcessos:
+    """
+    Protocolos e referências, atualizados só com os processos gravados
+    depois da última consulta.
+    """
+
+    def __init__(self):
+        self.protocolos = Catalogo()
+        self.referencias = Catalogo()
+        self.ultimo_processo = 0
+        self._trava = threading.Lock()
+
+    def atualizar(self):
+        with self._trava:
+            novos = obter_armazenamento().posteriores("processos", self.ultimo_processo)
+            novos = novos.dropna(subset=["id_processo"])
+            if novos.empty:
+                return
+            ids = novos["id_processo"].astype(int)
+            self.protocolos.acrescentar(zip(
+                ids,
+                novos["numero_protocolo"].astype(str) + " - " + novos["assunto"].astype(str)
+            ))
+            referencias = novos["numero_referencia"].dropna().astype(str)
+            self.referencias.acrescentar(zip(referencias, referencias))
+            self.ultimo_processo = max(self.ultimo_processo, int(ids.max()))
+
+
+@st.cache_resource(show_spinner=False)
+def _processos():
+    return _CatalogosProcessos()
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _catalogo_de_setores(tabela, coluna, assinatura):
+    # assinatura muda quando a tabela muda: o catálogo é refeito
+    df = obter_armazenamento().carregar(tabela)
+    nomes = df[df["ativo"] == 1][coluna].dropna().astype(str)
+    return Catalogo(zip(nomes, nomes))
+
+
+def _assinatura(tabela):
+    df = obter_armazenamento().carregar(tabela)
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+def protocolos():
+    """id_processo -> "número - assunto"."""
+    catalogos = _processos()
+    catalogos.atualizar()
+    return catalogos.protocolos
+
+
+def referencias():
+    catalogos = _processos()
+    catalogos.atualizar()
+    return catalogos.referencias
+
+
+def setores():
+    """Setores internos ativos."""
+    return _catalogo_de_setores("setores", "setor", _assinatura("setores"))
+
+
+def setores_destino():
+    """Setores de destino externo ativos."""
+    return _catalogo_de_setores(
+        "setores_destinos", "setor_destino", _assinatura("setores_destinos")
+    )
+
+
+# =====================================================
+# WIDGETS
+# =====================================================
+def escolher(rotulo, catalogo, chave, entre=None, primeira_opcao=None, format_func=None):
+    """
+    Campo de texto + selectbox com até TOP_K sugestões. primeira_opcao
+    (ex.: "Todos") fica sempre no topo. Devolve o valor escolhido, ou
+    None se nada casar com o texto.
+    """
+    texto = st.text_input(f"{rotulo} — digite para buscar", key=f"{chave}_texto")
+    opcoes = catalogo.sugerir(texto, entre=entre)
+    if primeira_opcao is not None:
+        opcoes = [primeira_opcao] + opcoes
+    if not opcoes:
+        st.caption("Nenhuma opção encontrada.")
+        return None
+
+    rotulos = format_func or (lambda v: catalogo.rotulos.get(v, v))
+    return st.selectbox(rotulo, opcoes, format_func=rotulos, key=chave)
+
+
+def escolher_varios(rotulo, catalogo, chave, entre=None, format_func=None):
+    """
+    Campo de texto + multiselect com até TOP_K sugestões, além dos já
+    escolhidos (que continuam valendo quando o texto muda).
+    """
+    texto = st.text_input(f"{rotulo} — digite para buscar", key=f"{chave}_texto")
+    escolhidos = st.session_state.get(chave, [])
+    opcoes = list(dict.fromkeys(escolhidos + catalogo.sugerir(texto, entre=entre)))
+
+    rotulos = format_func or (lambda v: catalogo.rotulos.get(v, v))
+    return st.multiselect(rotulo, opcoes, format_func=rotulos, key=chave)
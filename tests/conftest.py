@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+# Os módulos do app ficam na raiz do repositório
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def pasta_vazia(tmp_path, monkeypatch):
+    """Diretório de trabalho sem data/: nada é importado dos CSVs."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def sqlite(pasta_vazia):
+    from armazenamento import ArmazenamentoSQLite
+    return ArmazenamentoSQLite(str(pasta_vazia / "teste.db"))
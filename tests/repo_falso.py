@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import itertools
+from collections import Counter
+from types import SimpleNamespace
+from github import GithubException, UnknownObjectException
+
+
+class RepoFalso:
+    """Repositório em memória com a parte da API usada por github_utils."""
+
+    def __init__(self, arquivos=None):
+        self.chamadas = Counter()
+        self.blobs = {}
+        self.arvores = {}
+        self.commits = {}
+        self._seq = itertools.count(1)
+        self.conflitos_pendentes = 0
+        self.ponta = self._commit({
+            caminho: self._blob(texto.encode("utf-8"))
+            for caminho, texto in (arquivos or {}).items()
+        }, [])
+
+    def _blob(self, conteudo):
+        sha = hashlib.sha1(f"blob {len(conteudo)}\0".encode() + conteudo).hexdigest()
+        self.blobs[sha] = conteudo
+        return sha
+
+    def _commit(self, arvore, pais):
+        sha_arvore = f"arvore{next(self._seq)}"
+        self.arvores[sha_arvore] = dict(arvore)
+        sha = f"commit{next(self._seq)}"
+        self.commits[sha] = SimpleNamespace(sha=sha, tree=SimpleNamespace(sha=sha_arvore), pais=pais)
+        return sha
+
+    def gravar_direto(self, caminho, texto):
+        """Outro usuário gravando na branch."""
+        arvore = dict(self.arvores[self.commits[self.ponta].tree.sha])
+        arvore[caminho] = self._blob(texto.encode("utf-8"))
+        self.ponta = self._commit(arvore, [self.ponta])
+
+    # ---- API ----
+    def get_git_ref(self, nome):
+        self.chamadas["get_git_ref"] += 1
+        return _Ref(self)
+
+    def get_git_commit(self, sha):
+        self.chamadas["get_git_commit"] += 1
+        return self.commits[sha]
+
+    def get_git_tree(self, sha, recursive=False):
+        self.chamadas["get_git_tree"] += 1
+        return SimpleNamespace(tree=[
+            SimpleNamespace(path=caminho, sha=blob, type="blob")
+            for caminho, blob in self.arvores[sha].items()
+        ])
+
+    def get_git_blob(self, sha):
+        self.chamadas["get_git_blob"] += 1
+        return SimpleNamespace(content=base64.b64encode(self.blobs[sha]).decode())
+
+    def get_contents(self, caminho, ref=None):
+        self.chamadas["get_contents"] += 1
+        sha = self.arvores[self.commits[self.ponta].tree.sha].get(caminho)
+        if sha is None:
+            raise UnknownObjectException(404, {"message": "Not Found"})
+        return _Conteudo(self, caminho, sha)
+
+    def create_git_tree(self, elementos, base_tree):
+        self.chamadas["create_git_tree"] += 1
+        arvore = dict(self.arvores[base_tree.sha])
+        for e in elementos:
+            item = e._identity
+            arvore[item["path"]] = self._blob(item["content"].encode("utf-8"))
+        sha = f"arvore{next(self._seq)}"
+        self.arvores[sha] = arvore
+        return SimpleNamespace(sha=sha)
+
+    def create_git_commit(self, mensagem, arvore, pais):
+        self.chamadas["create_git_commit"] += 1
+        sha = f"commit{next(self._seq)}"
+        self.commits[sha] = SimpleNamespace(
+            sha=sha, tree=SimpleNamespace(sha=arvore.sha), pais=[p.sha for p in pais]
+        )
+        return self.commits[sha]
+
+
+class _Ref:
+    def __init__(self, repo):
+        self.repo = repo
+        self.object = SimpleNamespace(sha=repo.ponta)
+
+    def update(self):
+        self.repo.chamadas["ref.update"] += 1
+        mudou = self.object.sha != self.repo.ponta
+        self.object = SimpleNamespace(sha=self.repo.ponta)
+        return mudou
+
+    def edit(self, sha):
+        self.repo.chamadas["ref.edit"] += 1
+        if self.repo.conflitos_pendentes:
+            self.repo.conflitos_pendentes -= 1
+            self.repo.gravar_direto("data/outro.csv", "a\n1\n")
+        if self.repo.commits[sha].pais != [self.repo.ponta]:
+            raise GithubException(422, {"message": "Update is not a fast forward"})
+        self.repo.ponta = sha
+
+
+class _Conteudo:
+    def __init__(self, repo, caminho, sha):
+        self.repo = repo
+        self.caminho = caminho
+        self.sha = sha
+        self.encoding = "base64"
+        self.decoded_content = repo.blobs[sha]
+
+    def update(self):
+        self.repo.chamadas["conteudo.update"] += 1
+        sha = self.repo.arvores[self.repo.commits[self.repo.ponta].tree.sha].get(self.caminho)
+        if sha == self.sha:
+            return False
+        self.sha = sha
+        self.decoded_content = self.repo.blobs[sha]
+        return True
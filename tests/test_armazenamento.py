@@ -0,0 +1,232 @@
+import pytest
+import armazenamento
+import contadores
+import datas
+from armazenamento import Anexar, Atualizar, contar
+
+# =====================================================
+# OPERAÇÕES (como as páginas gravam)
+# =====================================================
+def protocolar(armazenamento, setor="Protocolo", servidor="ana", quantidade=1):
+    ids = []
+
+    def operacao(t):
+        primeiro_id = t.proximo_id("processos", quantidade)
+        primeiro_andamento = t.proximo_id("andamentos", quantidade)
+        primeiro_numero = t.reservar("protocolo_2026", quantidade)
+        processos, andamentos = [], []
+        for i in range(quantidade):
+            processos.append({
+                "id_processo": primeiro_id + i,
+                "numero_protocolo": f"{primeiro_numero + i:03d}/2026",
+                **datas.carimbo("data_entrada"),
+                "assunto": "Assunto",
+                "setor_atual": setor,
+                "status": "Em Trâmite"
+            })
+            andamentos.append({
+                "id_andamento": primeiro_andamento + i,
+                "id_processo": primeiro_id + i,
+                **datas.carimbo("data"),
+                "servidor": servidor,
+                "acao": "Protocolo Inicial",
+                "setor_origem": "Externo",
+                "setor_destino": setor
+            })
+        ids.extend(p["id_processo"] for p in processos)
+        return {"processos": Anexar(processos), "andamentos": Anexar(andamentos)}
+
+    armazenamento.gravar(operacao, "Protocolo")
+    return ids
+
+
+def tramitar(armazenamento, ids, origem, destino, servidor="ana"):
+    def operacao(t):
+        primeiro = t.proximo_id("andamentos", len(ids))
+        return {
+            "andamentos": Anexar([{
+                "id_andamento": primeiro + i,
+                "id_processo": id_processo,
+                **datas.carimbo("data"),
+                "servidor": servidor,
+                "acao": "Encaminhamento",
+                "setor_origem": origem,
+                "setor_destino": destino
+            } for i, id_processo in enumerate(ids)]),
+            "processos": Atualizar("id_processo", ids, {
+                "setor_atual": destino,
+                "status": "Em Trâmite"
+            })
+        }
+
+    armazenamento.gravar(operacao, "Tramitação")
+
+
+def arquivar(armazenamento, id_processo):
+    armazenamento.gravar(
+        lambda t: {"processos": Atualizar("id_processo", [id_processo], {
+            "status": "Arquivado",
+            "acao": "Arquivado / Destinado"
+        })},
+        "Arquivamento"
+    )
+
+
+def desarquivar(armazenamento, id_processo):
+    armazenamento.gravar(
+        lambda t: {"processos": Atualizar("id_processo", [id_processo], {
+            "status": "Em Trâmite",
+            "acao": "Desarquivado"
+        })},
+        "Desarquivamento"
+    )
+
+
+def caixa(armazenamento, setor):
+    return sorted(armazenamento.consultar("caixas", setor=setor)["id_processo"].tolist())
+
+
+def setor_de(armazenamento, id_processo):
+    local = armazenamento.consultar("localizacao", id_processo=id_processo)
+    return local["setor"].iloc[0]
+
+
+def contadores_gravados(armazenamento):
+    df = armazenamento.carregar("contadores")
+    return dict(zip(df["contador"], df["valor"].astype(int)))
+
+
+def contadores_recalculados(armazenamento):
+    df = contar(armazenamento.carregar("processos"), armazenamento.carregar("andamentos"))
+    return dict(zip(df["contador"], df["valor"].astype(int)))
+
+
+# =====================================================
+# SEQUÊNCIAS
+# =====================================================
+def test_ids_e_numeros_seguidos_sem_repeticao(sqlite):
+    assert protocolar(sqlite, quantidade=3) == [1, 2, 3]
+    assert protocolar(sqlite) == [4]
+
+    processos = sqlite.carregar("processos")
+    assert processos["numero_protocolo"].tolist() == [
+        "001/2026", "002/2026", "003/2026", "004/2026"
+    ]
+    assert sqlite.carregar("andamentos")["id_andamento"].tolist() == [1, 2, 3, 4]
+
+    sequencias = sqlite.carregar("sequencias").set_index("nome")["valor"]
+    assert sequencias["id_processos"] == 4
+    assert sequencias["protocolo_2026"] == 4
+
+
+def test_sequencia_nova_comeca_do_maior_id(sqlite):
+    sqlite.gravar(
+        lambda t: {"destinacoes": Anexar([{"id_destinacao": 41, "id_processo": 1}])},
+        "Linha antiga"
+    )
+    # A sequência id_destinacoes ainda não existia: parte do maior id
+    sqlite.gravar(
+        lambda t: {"destinacoes": Anexar([{
+            "id_destinacao": t.proximo_id("destinacoes"), "id_processo": 2
+        }])},
+        "Linha nova"
+    )
+    assert sqlite.carregar("destinacoes")["id_destinacao"].tolist() == [41, 42]
+
+
+def test_operacao_com_erro_nao_consome_numero(sqlite):
+    def falha(t):
+        t.proximo_id("processos")
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        sqlite.gravar(falha, "Falha")
+
+    assert protocolar(sqlite) == [1]
+
+
+# =====================================================
+# ÍNDICES DERIVADOS
+# =====================================================
+def test_tramitacao_move_processo_de_caixa(sqlite):
+    ids = protocolar(sqlite, quantidade=2)
+    tramitar(sqlite, [ids[0]], "Protocolo", "Gabinete")
+
+    assert caixa(sqlite, "Protocolo") == [ids[1]]
+    assert caixa(sqlite, "Gabinete") == [ids[0]]
+    assert setor_de(sqlite, ids[0]) == "Gabinete"
+
+    gravados = contadores_gravados(sqlite)
+    assert gravados["setor:Gabinete"] == 1
+    assert gravados["setor:Protocolo"] == 1
+    assert gravados["servidor:ana"] == 3
+    assert gravados == contadores_recalculados(sqlite)
+
+
+def test_arquivamento_tira_da_caixa(sqlite):
+    ids = protocolar(sqlite, quantidade=2)
+    arquivar(sqlite, ids[0])
+
+    assert caixa(sqlite, "Protocolo") == [ids[1]]
+    # A localização não muda: o processo continua no último setor
+    assert setor_de(sqlite, ids[0]) == "Protocolo"
+
+    gravados = contadores_gravados(sqlite)
+    assert gravados["status:Arquivado"] == 1
+    assert gravados["status:Em Trâmite"] == 1
+    assert gravados == contadores_recalculados(sqlite)
+
+
+def test_desarquivamento_devolve_ao_setor_em_que_estava(sqlite):
+    ids = protocolar(sqlite)
+    tramitar(sqlite, ids, "Protocolo", "Gabinete")
+    arquivar(sqlite, ids[0])
+    assert caixa(sqlite, "Gabinete") == []
+
+    desarquivar(sqlite, ids[0])
+
+    assert caixa(sqlite, "Gabinete") == ids
+    assert caixa(sqlite, "Protocolo") == []
+    gravados = contadores_gravados(sqlite)
+    assert "status:Arquivado" not in gravados  # zerado: removido
+    assert gravados["status:Em Trâmite"] == 1
+    assert gravados == contadores_recalculados(sqlite)
+
+
+def test_verificar_e_reconstruir_contadores(sqlite, monkeypatch):
+    monkeypatch.setattr(contadores, "obter_armazenamento", lambda: sqlite)
+    ids = protocolar(sqlite, quantidade=3)
+    tramitar(sqlite, ids[:2], "Protocolo", "Gabinete")
+    arquivar(sqlite, ids[2])
+    assert contadores.verificar().empty
+
+    sqlite.gravar(
+        lambda t: {"contadores": Atualizar("contador", ["status:Arquivado"], {"valor": 7})},
+        "Contador corrompido"
+    )
+    diferencas = contadores.verificar()
+    assert diferencas["contador"].tolist() == ["status:Arquivado"]
+    assert diferencas[["gravado", "recalculado"]].values.tolist() == [[7, 1]]
+
+    contadores.reconstruir()
+    assert contadores.verificar().empty
+    assert contadores.valor("status", "Arquivado") == 1
+
+
+# =====================================================
+# BACKEND EM USO
+# =====================================================
+class _SemSecrets:
+    def get(self, chave, padrao=None):
+        raise FileNotFoundError("secrets.toml")
+
+
+def test_sem_secrets_nao_usa_banco_local(pasta_vazia, monkeypatch):
+    monkeypatch.setattr(armazenamento.st, "secrets", _SemSecrets())
+    armazenamento.obter_armazenamento.clear()
+    try:
+        with pytest.raises(RuntimeError):
+            armazenamento.obter_armazenamento()
+    finally:
+        armazenamento.obter_armazenamento.clear()
+    assert not (pasta_vazia / "data").exists()
@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+from github import GithubException
+import github_utils
+from armazenamento import Anexar, ArmazenamentoGitHub
+from repo_falso import RepoFalso
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    repo = RepoFalso({"data/a.csv": "x,y\n1,2\n"})
+    monkeypatch.setattr(github_utils, "obter_repo", lambda: repo)
+    monkeypatch.setattr(github_utils, "ESPERA_BASE", 0)
+    github_utils._cache.clear()
+    github_utils._ultimo_commit.clear()
+    github_utils._ref_branch.clear()
+    return repo
+
+
+def expirar_cache(monkeypatch):
+    monkeypatch.setattr(github_utils, "TTL_LEITURA", 0)
+
+
+def ler(caminho):
+    return github_utils.carregar_csv_github(caminho)
+
+
+# =====================================================
+# LEITURA
+# =====================================================
+def test_leitura_dentro_do_ttl_nao_chama_a_api(repo):
+    assert ler("data/a.csv")["x"].tolist() == [1]
+    repo.chamadas.clear()
+
+    ler("data/a.csv")
+    assert sum(repo.chamadas.values()) == 0
+
+
+def test_arquivo_ausente_fica_em_cache(repo, monkeypatch):
+    assert ler("data/nao_existe.csv").empty
+    assert ler("data/nao_existe.csv").empty
+    assert repo.chamadas["get_contents"] == 1
+
+    # Depois do TTL: revalidado pela árvore da branch, sem novo 404
+    expirar_cache(monkeypatch)
+    repo.chamadas.clear()
+    assert ler("data/nao_existe.csv").empty
+    assert repo.chamadas["get_contents"] == 0
+
+    repo.gravar_direto("data/nao_existe.csv", "z\n5\n")
+    assert ler("data/nao_existe.csv")["z"].tolist() == [5]
+
+
+def test_arquivo_gravado_revalida_sem_baixar(repo, monkeypatch):
+    github_utils.gravar_github(
+        lambda ler_base: {"data/a.csv": pd.concat([ler_base("data/a.csv"), pd.DataFrame({"x": [3], "y": [4]})])},
+        "Linha nova"
+    )
+    expirar_cache(monkeypatch)
+    repo.chamadas.clear()
+
+    assert ler("data/a.csv")["x"].tolist() == [1, 3]
+    assert repo.chamadas["get_contents"] == 0
+    assert repo.chamadas["get_git_blob"] == 0
+
+    repo.gravar_direto("data/a.csv", "x,y\n9,9\n")
+    assert ler("data/a.csv")["x"].tolist() == [9]
+    assert repo.chamadas["get_git_blob"] == 1
+
+
+# =====================================================
+# GRAVAÇÃO
+# =====================================================
+def test_conflito_refaz_a_operacao_sobre_os_dados_novos(repo):
+    execucoes = []
+
+    def operacao(ler_base):
+        df = ler_base("data/a.csv")
+        execucoes.append(df["x"].tolist())
+        if len(execucoes) == 1:
+            # Outro usuário grava entre a leitura e o commit
+            repo.gravar_direto("data/a.csv", "x,y\n1,2\n2,3\n")
+        return {"data/a.csv": pd.concat([df, pd.DataFrame({"x": [10], "y": [0]})])}
+
+    github_utils.gravar_github(operacao, "Linha nova")
+
+    assert execucoes == [[1], [1, 2]]
+    assert ler("data/a.csv")["x"].tolist() == [1, 2, 10]
+    assert repo.chamadas["ref.edit"] == 2
+
+
+def test_conflitos_demais_desistem(repo, monkeypatch):
+    monkeypatch.setattr(github_utils, "TENTATIVAS_GRAVACAO", 2)
+    repo.conflitos_pendentes = 5
+
+    with pytest.raises(GithubException):
+        github_utils.gravar_github(lambda ler_base: {"data/b.csv": pd.DataFrame({"z": [1]})}, "x")
+    assert repo.chamadas["ref.edit"] == 2
+
+
+def test_numeros_reservados_no_conflito_nao_se_repetem(repo):
+    armazenamento = ArmazenamentoGitHub()
+    tentativas = []
+
+    def protocolar(t):
+        numero = t.reservar("protocolo_2026")
+        tentativas.append(numero)
+        if len(tentativas) == 1:
+            # Outro protocolo gravado no meio: a reserva é refeita
+            repo.gravar_direto("data/sequencias.csv", "nome,valor\nprotocolo_2026,1\n")
+        return {"processos": Anexar([{
+            "id_processo": numero,
+            "numero_protocolo": f"{numero:03d}/2026",
+            "setor_atual": "Protocolo",
+            "status": "Em Trâmite"
+        }])}
+
+    armazenamento.gravar(protocolar, "Protocolo")
+
+    assert tentativas == [1, 2]
+    sequencias = armazenamento.carregar("sequencias").set_index("nome")["valor"]
+    assert sequencias["protocolo_2026"] == 2